@@ -8,4 +8,141 @@ class Config:
     BOT_TOKEN = os.getenv('BOT_TOKEN', 'YOUR_BOT_TOKEN_HERE')
     DB_NAME = 'parser_bot.db'
     CHECK_INTERVAL = 20  
-    ADMIN_IDS = [7166331865, 415709200]  
\ No newline at end of file
+    ADMIN_IDS = [7166331865, 415709200]
+
+    LISTING_DELAY = 2
+    SEND_DELAY = 3
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 20))
+    PIPELINE_WORKERS = {
+        'listing_fetch': int(os.getenv('WORKERS_LISTING_FETCH', 2)),
+        'extract': int(os.getenv('WORKERS_EXTRACT', 1)),
+        'novelty': int(os.getenv('WORKERS_NOVELTY', 1)),
+        'detail_fetch': int(os.getenv('WORKERS_DETAIL_FETCH', 3)),
+        'detail_parse': int(os.getenv('WORKERS_DETAIL_PARSE', 2)),
+        'preflight': int(os.getenv('WORKERS_PREFLIGHT', 2)),
+        'format': int(os.getenv('WORKERS_FORMAT', 1)),
+        'deliver': int(os.getenv('WORKERS_DELIVER', 1)),
+        'enrich_fetch': int(os.getenv('WORKERS_ENRICH_FETCH', 1)),
+        'revalidate_fetch': int(os.getenv('WORKERS_REVALIDATE_FETCH', 1)),
+    }
+
+    FILE_ID_MEMORY_SIZE = 5000
+    FILE_ID_MAX_AGE_DAYS = 30
+    FILE_ID_MAX_ROWS = 100000
+    FILE_ID_EVICT_INTERVAL = 3600
+
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_ERROR_RATE = 0.5
+    BREAKER_WINDOW = 20
+    BREAKER_OPEN_SECONDS = 60
+    BREAKER_MAX_OPEN_SECONDS = 900
+    AIMD_START_CONCURRENCY = 3
+    AIMD_MIN_CONCURRENCY = 1
+    AIMD_MAX_CONCURRENCY = 6
+    AIMD_MIN_SPACING = 0.2
+    AIMD_MAX_SPACING = 10.0
+    AIMD_RATE_STEP = 0.2
+    AIMD_LATENCY_TARGET = 5.0
+
+    PROXIES = [proxy.strip() for proxy in os.getenv('PROXIES', '').split(',') if proxy.strip()]
+    EGRESS_DIRECT = os.getenv('EGRESS_DIRECT', '1') == '1'
+    EGRESS_QUARANTINE_FAILURES = 3
+    EGRESS_QUARANTINE_SECONDS = 300
+
+    DEDUP_ENABLED = True
+    DEDUP_WINDOW_DAYS = 14
+    DEDUP_MAX_DISTANCE = 3
+    DEDUP_MIN_PARAMS = 3
+    DEDUP_MIN_IMAGES = 3
+    DEDUP_PRICE_CHANGE_NOTICE = True
+
+    USD_RATE = float(os.getenv('USD_RATE', 12700))
+
+    LITE_ENRICH = os.getenv('LITE_ENRICH', '0') == '1'
+    ENRICH_QUEUE_SIZE = 100
+    SHUTDOWN_DRAIN_TIMEOUT = int(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', 20))
+
+    WRITE_BATCH_ROWS = 200
+    WRITE_BATCH_DELAY = 0.005
+
+    SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', 'state.snapshot')
+    SNAPSHOT_INTERVAL = 300
+    SNAPSHOT_MAX_AGE = 86400
+
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_SAMPLE_RATES = {
+        'novelty.old_ad': 0.1,
+        'http.rejected': 0.1,
+        'olx.location': 0.05,
+    }
+    LOG_RATE_CAPS = {
+        'novelty.new_ad': 60,
+        'deliver.sent': 120,
+        'dedup.skipped': 60,
+        'detail.missing': 30,
+        'http.error': 30,
+        'olx.map_missing': 30,
+    }
+
+    HTTP_MODE = os.getenv('HTTP_MODE', 'live')
+    CASSETTE_DIR = os.getenv('CASSETTE_DIR', 'cassettes')
+    REPLAY_TIMING = os.getenv('REPLAY_TIMING', '0') == '1'
+    REPLAY_SPEED = float(os.getenv('REPLAY_SPEED', 1.0))
+
+    DIGEST_THRESHOLD = int(os.getenv('DIGEST_THRESHOLD', 8))
+    DIGEST_FULL_POSTS = 3
+    DIGEST_CHUNK_SIZE = 10
+
+    MEMORY_BUDGETS = {
+        'fetch': (3072, 64),
+        'listing_parse': (8192, 64),
+        'detail_parse': (8192, 64),
+        'format': (64, 16),
+        'send': (256, 64),
+    }
+    MEMORY_GROWTH_BUDGET = 4
+
+    BOT_MODE = os.getenv('BOT_MODE', 'polling')
+    WEB_ENABLED = os.getenv('WEB_ENABLED', '0') == '1'
+    WEB_HOST = os.getenv('WEB_HOST', '127.0.0.1')
+    WEB_PORT = int(os.getenv('WEB_PORT', 8080))
+    WEB_AUTH_TOKEN = os.getenv('WEB_AUTH_TOKEN', '')
+    WEBHOOK_BASE_URL = os.getenv('WEBHOOK_BASE_URL', '')
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+    WEB_SSL_CERT = os.getenv('WEB_SSL_CERT', '')
+    WEB_SSL_KEY = os.getenv('WEB_SSL_KEY', '')
+    WEBHOOK_SELF_SIGNED = os.getenv('WEBHOOK_SELF_SIGNED', '0') == '1'
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')
+    HEALTH_MAX_CYCLE_AGE = int(os.getenv('HEALTH_MAX_CYCLE_AGE', 300))
+
+    ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', 10))
+    ADMIN_PAGE_CACHE_SIZE = 256
+
+    TEMPLATE_CACHE_SIZE = 512
+
+    IMAGE_PREFLIGHT_ENABLED = os.getenv('IMAGE_PREFLIGHT_ENABLED', '1') == '1'
+    IMAGE_PREFLIGHT_CONCURRENCY = 6
+    IMAGE_PREFLIGHT_TTL = 6 * 3600
+    IMAGE_PREFLIGHT_CACHE_SIZE = 20000
+    IMAGE_MAX_BYTES = 5 * 1024 * 1024
+
+    REVALIDATE_ENABLED = os.getenv('REVALIDATE_ENABLED', '1') == '1'
+    REVALIDATE_NOTIFY = os.getenv('REVALIDATE_NOTIFY', 'reply')
+    REVALIDATE_FIRST_INTERVAL = 3600
+    REVALIDATE_BACKOFF = 2.0
+    REVALIDATE_MAX_INTERVAL = 48 * 3600
+    REVALIDATE_MAX_AGE = 14 * 24 * 3600
+    REVALIDATE_RETRY_INTERVAL = 900
+    REVALIDATE_BATCH = int(os.getenv('REVALIDATE_BATCH', 20))
+    REVALIDATE_QUEUE_SIZE = 50
+
+    CORPUS_ENABLED = os.getenv('CORPUS_ENABLED', '0') == '1'
+    CORPUS_DIR = os.getenv('CORPUS_DIR', 'corpus')
+    CORPUS_SEGMENT_RECORDS = 50000
+    CORPUS_MAX_BYTES = int(os.getenv('CORPUS_MAX_MB', 2048)) * 1024 * 1024
+    CORPUS_FLUSH_RECORDS = 500
+    CORPUS_MAX_PENDING = 20000
+    CORPUS_COMPRESSLEVEL = 6
+    CORPUS_EXCLUDE_FIELDS = ('phone', 'seller_name')
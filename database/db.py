@@ -1,15 +1,25 @@
 import aiosqlite
 import logging
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Set, Tuple
 from config import Config
+from database.write_batcher import WriteBatcher
+from services.metrics_service import metrics
+from services.parser_registry import registry
 
 logger = logging.getLogger(__name__)
 
+REVALIDATION_COLUMNS = (
+    'message_id', 'has_media', 'price', 'content_hash', 'body_hash', 'etag', 'last_modified',
+    'check_interval', 'next_check_at', 'ad_status',
+)
+
 
 class Database:
     
     def __init__(self):
         self.db_name = Config.DB_NAME
+        self.writer = WriteBatcher.for_db(self.db_name)
     
     def get_connection(self):
         return aiosqlite.connect(self.db_name)
@@ -30,6 +40,18 @@ class Database:
                 )
             """)
             
+            await self._ensure_columns(db, 'parsers', {
+                'filter_rules': 'TEXT',
+                'lite_mode': 'INTEGER DEFAULT 0',
+                'watermark_id': 'INTEGER',
+                'burst_threshold': 'INTEGER',
+                'template': 'TEXT',
+            })
+            
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_parsers_status_id ON parsers (status, id)"
+            )
+            
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS parsed_ads (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,17 +63,113 @@ class Database:
                 )
             """)
             
+            await self._ensure_columns(db, 'parsed_ads', {
+                'posted_at': 'REAL',
+                'posted_precise': 'INTEGER DEFAULT 0',
+                'first_seen_at': 'REAL',
+                'delivered_at': 'REAL',
+                'message_id': 'INTEGER',
+                'has_media': 'INTEGER DEFAULT 0',
+                'price': 'TEXT',
+                'content_hash': 'TEXT',
+                'body_hash': 'TEXT',
+                'etag': 'TEXT',
+                'last_modified': 'TEXT',
+                'check_interval': 'REAL',
+                'next_check_at': 'REAL',
+                'ad_status': 'TEXT',
+            })
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_parsed_ads_next_check ON parsed_ads (next_check_at)"
+            )
+            
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS ad_fingerprints (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel_id TEXT NOT NULL,
+                    href TEXT NOT NULL,
+                    simhash INTEGER NOT NULL,
+                    price TEXT,
+                    message_id INTEGER,
+                    created_at REAL NOT NULL
+                )
+            """)
+            
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ad_fingerprints_created ON ad_fingerprints (created_at)"
+            )
+            
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS telegram_files (
+                    url_key TEXT PRIMARY KEY,
+                    file_id TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
             await db.commit()
             logger.info("Database jadvallar yaratildi")
     
-    async def add_parser(self, admin_id: int, url: str, channel_id: str, site_type: str = 'olx', filter_text: Optional[str] = None) -> int:
+    async def _ensure_columns(self, db, table: str, columns: Dict[str, str]):
+        async with db.execute(f"PRAGMA table_info({table})") as cursor:
+            existing = {row[1] for row in await cursor.fetchall()}
+        for column, ddl in columns.items():
+            if column not in existing:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+                logger.info(f"{table}.{column} ustuni qo'shildi")
+    
+    async def add_parser(self, admin_id: int, url: str, channel_id: str, site_type: str = 'olx', filter_text: Optional[str] = None, status: str = 'active') -> int:
         async with self.get_connection() as db:
             cursor = await db.execute(
-                "INSERT INTO parsers (admin_id, url, channel_id, site_type, filter_text) VALUES (?, ?, ?, ?, ?)",
-                (admin_id, url, channel_id, site_type, filter_text)
+                "INSERT INTO parsers (admin_id, url, channel_id, site_type, filter_text, status) VALUES (?, ?, ?, ?, ?, ?)",
+                (admin_id, url, channel_id, site_type, filter_text, status)
             )
             await db.commit()
-            return cursor.lastrowid
+            parser_id = cursor.lastrowid
+        
+        parser = await self.get_parser(parser_id)
+        if parser and parser['status'] == 'active':
+            registry.add(parser)
+        return parser_id
+    
+    async def import_parser(self, row: Dict) -> int:
+        async with self.get_connection() as db:
+            async with db.execute("PRAGMA table_info(parsers)") as cursor:
+                columns = [column[1] for column in await cursor.fetchall() if column[1] in row]
+            cursor = await db.execute(
+                f"INSERT INTO parsers ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                tuple(row[column] for column in columns)
+            )
+            await db.commit()
+            parser_id = cursor.lastrowid
+        
+        parser = await self.get_parser(parser_id)
+        if parser and parser['status'] == 'active':
+            registry.add(parser)
+        return parser_id
+    
+    async def activate_parser(self, parser_id: int):
+        async with self.get_connection() as db:
+            await db.execute(
+                "UPDATE parsers SET status = 'active' WHERE id = ? AND status = 'priming'",
+                (parser_id,)
+            )
+            await db.commit()
+        
+        parser = await self.get_parser(parser_id)
+        if parser and parser['status'] == 'active' and not registry.is_active(parser_id):
+            registry.add(parser)
+    
+    async def get_parser(self, parser_id: int) -> Optional[Dict]:
+        async with self.get_connection() as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "SELECT * FROM parsers WHERE id = ?",
+                (parser_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
     
     async def get_user_parsers(self, admin_id: int) -> List[Dict]:
         async with self.get_connection() as db:
@@ -72,6 +190,52 @@ class Database:
                 rows = await cursor.fetchall()
                 return [dict(row) for row in rows]
     
+    async def get_priming_parsers(self) -> List[Dict]:
+        async with self.get_connection() as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "SELECT * FROM parsers WHERE status = 'priming'"
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    async def get_parsers_page(self, filters: Dict, cursor: int = 0, limit: int = 10,
+                               before: bool = False, status: str = 'active') -> Tuple[List[Dict], bool]:
+        where, params = self._parser_filters(filters, status)
+        where += " AND id < ?" if before else " AND id > ?"
+        params.append(cursor)
+        
+        async with self.get_connection() as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                f"SELECT * FROM parsers WHERE {where} ORDER BY id {'DESC' if before else 'ASC'} LIMIT ?",
+                (*params, limit + 1)
+            ) as cursor_rows:
+                rows = [dict(row) for row in await cursor_rows.fetchall()]
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before:
+            rows.reverse()
+        return rows, has_more
+    
+    async def count_parsers(self, filters: Dict, status: str = 'active') -> int:
+        where, params = self._parser_filters(filters, status)
+        async with self.get_connection() as db:
+            async with db.execute(f"SELECT COUNT(*) FROM parsers WHERE {where}", params) as cursor:
+                row = await cursor.fetchone()
+                return row[0]
+    
+    @staticmethod
+    def _parser_filters(filters: Dict, status: str) -> Tuple[str, list]:
+        conditions = ["status = ?"]
+        params = [status]
+        for column in ('site_type', 'channel_id', 'admin_id'):
+            if filters.get(column) is not None:
+                conditions.append(f"{column} = ?")
+                params.append(filters[column])
+        return ' AND '.join(conditions), params
+    
     async def delete_parser(self, parser_id: int) -> bool:
         async with self.get_connection() as db:
             await db.execute(
@@ -79,21 +243,89 @@ class Database:
                 (parser_id,)
             )
             await db.commit()
+        
+        registry.remove(parser_id)
+        return True
+    
+    async def set_filter_rules(self, parser_id: int, filter_rules: Optional[str]):
+        await self._update_parser(parser_id, "filter_rules = ?", (filter_rules,))
+    
+    async def set_lite_mode(self, parser_id: int, lite_mode: bool):
+        await self._update_parser(parser_id, "lite_mode = ?", (int(lite_mode),))
+    
+    async def set_burst_threshold(self, parser_id: int, burst_threshold: Optional[int]):
+        await self._update_parser(parser_id, "burst_threshold = ?", (burst_threshold,))
+    
+    async def set_template(self, parser_id: int, template: Optional[str]):
+        await self._update_parser(parser_id, "template = ?", (template,))
+    
+    async def _update_parser(self, parser_id: int, assignments: str, params: tuple):
+        async with self.get_connection() as db:
+            await db.execute(
+                f"UPDATE parsers SET {assignments} WHERE id = ?",
+                (*params, parser_id)
+            )
+            await db.commit()
+        
+        parser = await self.get_parser(parser_id)
+        if parser:
+            registry.update(parser)
+    
+    async def add_parsed_ad(self, parser_id: int, href: str, wait: bool = True, posted_at: Optional[float] = None,
+                            posted_precise: bool = False, first_seen_at: Optional[float] = None,
+                            delivered_at: Optional[float] = None) -> bool:
+        sql = (
+            "INSERT OR IGNORE INTO parsed_ads (parser_id, href, posted_at, posted_precise, first_seen_at, delivered_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        )
+        params = (parser_id, href, posted_at, int(posted_precise), first_seen_at, delivered_at)
+        if not wait:
+            self.writer.enqueue(sql, params)
             return True
+        return await self.writer.execute(sql, params) > 0
     
-    async def add_parsed_ad(self, parser_id: int, href: str) -> bool:
-        try:
-            async with self.get_connection() as db:
-                await db.execute(
-                    "INSERT INTO parsed_ads (parser_id, href) VALUES (?, ?)",
-                    (parser_id, href)
-                )
-                await db.commit()
-                return True
-        except aiosqlite.IntegrityError:
-            return False
+    async def set_revalidation(self, parser_id: int, href: str, values: Dict, wait: bool = False):
+        columns = [column for column in values if column in REVALIDATION_COLUMNS]
+        sql = (
+            f"UPDATE parsed_ads SET {', '.join(f'{column} = ?' for column in columns)} "
+            "WHERE parser_id = ? AND href = ?"
+        )
+        params = (*(values[column] for column in columns), parser_id, href)
+        if not wait:
+            self.writer.enqueue(sql, params)
+            return
+        await self.writer.execute(sql, params)
+    
+    async def get_due_revalidations(self, now: float, limit: int) -> List[Dict]:
+        await self.writer.flush()
+        async with self.get_connection() as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "SELECT a.id, a.parser_id, a.href, a.delivered_at, a.message_id, a.has_media, a.price, "
+                "a.content_hash, a.body_hash, a.etag, a.last_modified, a.check_interval, "
+                "p.channel_id, p.site_type, p.template "
+                "FROM parsed_ads a JOIN parsers p ON p.id = a.parser_id "
+                "WHERE a.next_check_at <= ? AND p.status = 'active' "
+                "ORDER BY a.next_check_at LIMIT ?",
+                (now, limit)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    async def bulk_add_parsed_ads(self, parser_id: int, hrefs: List[str]) -> int:
+        if not hrefs:
+            return 0
+        async with self.get_connection() as db:
+            before = db.total_changes
+            await db.executemany(
+                "INSERT OR IGNORE INTO parsed_ads (parser_id, href) VALUES (?, ?)",
+                [(parser_id, href) for href in hrefs]
+            )
+            await db.commit()
+            return db.total_changes - before
     
     async def get_parsed_ads(self, parser_id: int, limit: int = 50) -> List[str]:
+        await self.writer.flush()
         async with self.get_connection() as db:
             async with db.execute(
                 "SELECT href FROM parsed_ads WHERE parser_id = ? ORDER BY parsed_at DESC LIMIT ?",
@@ -103,6 +335,7 @@ class Database:
                 return [row[0] for row in rows]
     
     async def is_ad_parsed(self, parser_id: int, href: str) -> bool:
+        await self.writer.flush()
         async with self.get_connection() as db:
             async with db.execute(
                 "SELECT 1 FROM parsed_ads WHERE parser_id = ? AND href = ?",
@@ -111,7 +344,23 @@ class Database:
                 row = await cursor.fetchone()
                 return row is not None
     
+    async def get_parsed_hrefs(self, parser_id: int, hrefs: List[str]) -> Set[str]:
+        if not hrefs:
+            return set()
+        placeholders = ', '.join('?' for _ in hrefs)
+        await self.writer.flush()
+        started = time.monotonic()
+        async with self.get_connection() as db:
+            async with db.execute(
+                f"SELECT href FROM parsed_ads WHERE parser_id = ? AND href IN ({placeholders})",
+                (parser_id, *hrefs)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        metrics.observe('db.read_latency', time.monotonic() - started)
+        return {row[0] for row in rows}
+    
     async def get_last_known_href(self, parser_id: int) -> Optional[str]:
+        await self.writer.flush()
         async with self.get_connection() as db:
             async with db.execute(
                 "SELECT last_known_href FROM parsers WHERE id = ?",
@@ -120,10 +369,154 @@ class Database:
                 row = await cursor.fetchone()
                 return row[0] if row else None
     
-    async def set_last_known_href(self, parser_id: int, href: str):
+    async def set_last_known_href(self, parser_id: int, href: str, wait: bool = True):
+        sql = "UPDATE parsers SET last_known_href = ? WHERE id = ?"
+        if not wait:
+            self.writer.enqueue(sql, (href, parser_id))
+            return
+        await self.writer.execute(sql, (href, parser_id))
+    
+    async def get_bookmark(self, parser_id: int) -> Tuple[Optional[str], Optional[int]]:
+        await self.writer.flush()
+        async with self.get_connection() as db:
+            async with db.execute(
+                "SELECT last_known_href, watermark_id FROM parsers WHERE id = ?",
+                (parser_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return (row[0], row[1]) if row else (None, None)
+    
+    async def set_bookmark(self, parser_id: int, href: str, watermark_id: Optional[int], wait: bool = True):
+        sql = (
+            "UPDATE parsers SET last_known_href = ?, "
+            "watermark_id = COALESCE(MAX(?, watermark_id), ?, watermark_id) WHERE id = ?"
+        )
+        params = (href, watermark_id, watermark_id, parser_id)
+        if not wait:
+            self.writer.enqueue(sql, params)
+            return
+        await self.writer.execute(sql, params)
+    
+    async def flush(self):
+        await self.writer.flush()
+    
+    async def close(self):
+        await self.writer.close()
+    
+    async def get_file_ids(self, url_keys: List[str]) -> Dict[str, str]:
+        if not url_keys:
+            return {}
+        placeholders = ', '.join('?' for _ in url_keys)
+        async with self.get_connection() as db:
+            async with db.execute(
+                f"SELECT url_key, file_id FROM telegram_files WHERE url_key IN ({placeholders})",
+                url_keys
+            ) as cursor:
+                rows = await cursor.fetchall()
+            found = {row[0]: row[1] for row in rows}
+            if found:
+                await db.execute(
+                    f"UPDATE telegram_files SET last_used_at = CURRENT_TIMESTAMP "
+                    f"WHERE url_key IN ({', '.join('?' for _ in found)})",
+                    list(found)
+                )
+                await db.commit()
+            return found
+    
+    async def save_file_ids(self, file_ids: Dict[str, str]):
+        if not file_ids:
+            return
+        async with self.get_connection() as db:
+            await db.executemany(
+                "INSERT OR REPLACE INTO telegram_files (url_key, file_id) VALUES (?, ?)",
+                list(file_ids.items())
+            )
+            await db.commit()
+    
+    async def delete_file_ids(self, url_keys: List[str]):
+        if not url_keys:
+            return
         async with self.get_connection() as db:
             await db.execute(
-                "UPDATE parsers SET last_known_href = ? WHERE id = ?",
-                (href, parser_id)
+                f"DELETE FROM telegram_files WHERE url_key IN ({', '.join('?' for _ in url_keys)})",
+                url_keys
             )
-            await db.commit()
\ No newline at end of file
+            await db.commit()
+    
+    async def evict_file_ids(self, max_age_days: int, max_rows: int) -> int:
+        async with self.get_connection() as db:
+            cursor = await db.execute(
+                "DELETE FROM telegram_files WHERE last_used_at < datetime('now', ?)",
+                (f'-{max_age_days} days',)
+            )
+            removed = cursor.rowcount
+            cursor = await db.execute(
+                "DELETE FROM telegram_files WHERE url_key IN ("
+                "SELECT url_key FROM telegram_files ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (max_rows,)
+            )
+            removed += cursor.rowcount
+            await db.commit()
+            return removed
+    
+    async def add_fingerprint(self, channel_id: str, href: str, simhash: int, price: Optional[str],
+                              message_id: Optional[int], created_at: float) -> int:
+        async with self.get_connection() as db:
+            cursor = await db.execute(
+                "INSERT INTO ad_fingerprints (channel_id, href, simhash, price, message_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (channel_id, href, simhash, price, message_id, created_at)
+            )
+            await db.commit()
+            return cursor.lastrowid
+    
+    async def update_fingerprint(self, row_id: int, href: str, price: Optional[str]):
+        async with self.get_connection() as db:
+            await db.execute(
+                "UPDATE ad_fingerprints SET href = ?, price = ? WHERE id = ?",
+                (href, price, row_id)
+            )
+            await db.commit()
+    
+    async def get_recent_fingerprints(self, since: float) -> List[Dict]:
+        async with self.get_connection() as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "SELECT * FROM ad_fingerprints WHERE created_at >= ?",
+                (since,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    async def get_fingerprint_keys(self, since: float) -> List[Dict]:
+        async with self.get_connection() as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "SELECT id, href, price FROM ad_fingerprints WHERE created_at >= ?",
+                (since,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    async def get_fingerprints(self, row_ids: List[int]) -> List[Dict]:
+        results = []
+        async with self.get_connection() as db:
+            db.row_factory = aiosqlite.Row
+            for start in range(0, len(row_ids), 500):
+                chunk = row_ids[start:start + 500]
+                placeholders = ', '.join('?' for _ in chunk)
+                async with db.execute(
+                    f"SELECT * FROM ad_fingerprints WHERE id IN ({placeholders})",
+                    chunk
+                ) as cursor:
+                    results.extend(dict(row) for row in await cursor.fetchall())
+        return results
+    
+    async def delete_old_fingerprints(self, before: float) -> int:
+        async with self.get_connection() as db:
+            cursor = await db.execute(
+                "DELETE FROM ad_fingerprints WHERE created_at < ?",
+                (before,)
+            )
+            await db.commit()
+            return cursor.rowcount
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from config import Config
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBatcher:
+
+    _instances: Dict[str, 'WriteBatcher'] = {}
+
+    def __init__(self, db_name: str, max_rows: int = Config.WRITE_BATCH_ROWS, max_delay: float = Config.WRITE_BATCH_DELAY):
+        self.db_name = db_name
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        self.commits = 0
+        self.rows = 0
+
+    @classmethod
+    def for_db(cls, db_name: str) -> 'WriteBatcher':
+        if db_name not in cls._instances:
+            cls._instances[db_name] = cls(db_name)
+        return cls._instances[db_name]
+
+    def _ensure_started(self):
+        if self._task and not self._task.done():
+            return
+        if self._queue is not None:
+            self._fail_pending([], self._error or RuntimeError("DB yozuvchisi to'xtagan"))
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name=f"db-writer-{self.db_name}")
+
+    def _fail_pending(self, batch: List[Tuple[str, Tuple, asyncio.Future]], error: BaseException):
+        pending = list(batch)
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+            self._queue.task_done()
+        for _, _, future in pending:
+            if not future.done() and not future.get_loop().is_closed():
+                future.set_exception(error)
+
+    def submit(self, sql: str, params: Tuple = ()) -> asyncio.Future:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((sql, params, future))
+        return future
+
+    async def execute(self, sql: str, params: Tuple = ()) -> int:
+        return await self.submit(sql, params)
+
+    def enqueue(self, sql: str, params: Tuple = ()):
+        self.submit(sql, params).add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        if not future.cancelled() and future.exception():
+            logger.error(f"Fon yozuvida xato: {future.exception()}")
+
+    async def flush(self):
+        if self._queue and self._task and not self._task.done():
+            await self._queue.join()
+        if self._error:
+            error, self._error = self._error, None
+            raise error
+
+    async def close(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"DB yozuvchisi xato bilan yopildi: {e}")
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[str, Tuple, asyncio.Future]] = []
+        try:
+            async with aiosqlite.connect(self.db_name) as db:
+                while True:
+                    batch = [await self._queue.get()]
+                    deadline = loop.time() + self.max_delay
+                    while len(batch) < self.max_rows:
+                        if not self._queue.empty():
+                            batch.append(self._queue.get_nowait())
+                            continue
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                        except asyncio.TimeoutError:
+                            break
+
+                    await self._commit(db, batch)
+                    for _ in batch:
+                        self._queue.task_done()
+                    batch = []
+        except asyncio.CancelledError:
+            for _ in batch:
+                self._queue.task_done()
+            raise
+        except Exception as e:
+            logger.error(f"DB yozuvchisi to'xtadi, {self._queue.qsize() + len(batch)} ta yozuv bekor qilindi: {e}")
+            metrics.inc('db.writer.crashed')
+            self._error = e
+            for _ in batch:
+                self._queue.task_done()
+            self._fail_pending(batch, e)
+
+    async def _commit(self, db: aiosqlite.Connection, batch: List[Tuple[str, Tuple, asyncio.Future]]):
+        started = time.monotonic()
+        results: List[Tuple[asyncio.Future, Any]] = []
+        try:
+            for sql, params, future in batch:
+                try:
+                    cursor = await db.execute(sql, params)
+                    results.append((future, cursor.rowcount))
+                except aiosqlite.Error as e:
+                    if not future.done():
+                        future.set_exception(e)
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Guruhli commit xatosi ({len(batch)} ta yozuv): {e}")
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, rowcount in results:
+            if not future.done():
+                future.set_result(rowcount)
+
+        elapsed = time.monotonic() - started
+        self.commits += 1
+        self.rows += len(batch)
+        metrics.inc('db.writer.commits')
+        metrics.inc('db.writer.rows', len(batch))
+        metrics.observe('db.writer.batch_rows', len(batch))
+        metrics.observe('db.writer.commit_latency', elapsed)
+        metrics.set('db.writer.rows_per_commit', self.rows / self.commits)
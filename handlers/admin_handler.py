@@ -1,4 +1,9 @@
+import html
+import json
+import re
+
 from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -6,10 +11,19 @@ from aiogram.fsm.state import State, StatesGroup
 
 from keyboards.inline_keyboards import InlineKeyboards
 from database.db import Database
+from services.filter_service import RULES_HELP, format_rules, parse_rules_text
+from services.freshness_service import FreshnessTracker
+from services.metrics_service import metrics
+from services.parser_page_service import ParserPages, current_page, parse_page_callback
+from services.parser_registry import registry
+from services.perf_service import PerfReport
+from services.priming_service import PrimingService
+from services.template_service import BUILTIN_TEMPLATES, FIELDS, TEMPLATE_SAMPLE, TemplateError, compile_template, renderer
 from config import Config
 
 router = Router()
 db = Database()
+pages = ParserPages(db)
 
 
 class AddParserStates(StatesGroup):
@@ -19,6 +33,26 @@ class AddParserStates(StatesGroup):
     waiting_for_filter = State()
 
 
+class EditRulesStates(StatesGroup):
+    waiting_for_rules = State()
+
+
+async def show_page(callback: CallbackQuery, filter_key: str = '', cursor: int = 0, before: bool = False):
+    text, markup = await pages.render(filter_key, cursor, before)
+    try:
+        await callback.message.edit_text(text, reply_markup=markup, parse_mode='HTML')
+    except TelegramBadRequest:
+        pass
+
+
+def priming_text(primed, pending: bool = False) -> str:
+    if primed is None and pending:
+        return "⏳ Mavjud e'lonlarni belgilab bo'lmadi. Parser har tekshiruvda qayta urinadi va belgilangandan keyingina e'lon yuboradi."
+    if primed is None:
+        return "⚠️ Mavjud e'lonlarni belgilab bo'lmadi, birinchi tekshiruvda eski e'lonlar kelishi mumkin."
+    return f"📥 Mavjud {primed} ta e'lon belgilandi, faqat yangilari yuboriladi."
+
+
 @router.message(Command("admin"))
 async def cmd_admin(message: Message):
     user_id = message.from_user.id
@@ -169,14 +203,16 @@ async def process_channel(message: Message, state: FSMContext):
         )
         await state.set_state(AddParserStates.waiting_for_filter)
     else:
-        parser_id = await db.add_parser(admin_id, url, channel_id, site_type)
+        parser_id = await db.add_parser(admin_id, url, channel_id, site_type, status='priming')
         await state.clear()
+        primed = await PrimingService.prime_new_parser(db, parser_id)
         await message.answer(
             f"✅ <b>Parser muvaffaqiyatli qo'shildi!</b>\n\n"
             f"🆔 Parser ID: {parser_id}\n"
             f"🔗 URL: {url[:50]}...\n"
             f"📱 Kanal: {channel_id}\n"
-            f"🌐 Sayt: OLX.uz\n\n"
+            f"🌐 Sayt: OLX.uz\n"
+            f"{priming_text(primed, pending=True)}\n\n"
             f"Bot har 3 minutda yangi e'lonlarni tekshirib turadi.",
             reply_markup=InlineKeyboards.back_to_admin(),
             parse_mode='HTML'
@@ -199,17 +235,20 @@ async def process_filter(message: Message, state: FSMContext):
     site_type = data['site_type']
     channel_id = data['channel_id']
     
-    parser_id = await db.add_parser(admin_id, url, channel_id, site_type, filter_text)
+    parser_id = await db.add_parser(admin_id, url, channel_id, site_type, filter_text, status='priming')
     
     await state.clear()
     
+    primed = await PrimingService.prime_new_parser(db, parser_id)
+    
     await message.answer(
         f"✅ <b>Parser muvaffaqiyatli qo'shildi!</b>\n\n"
         f"🆔 Parser ID: {parser_id}\n"
         f"🔗 URL: {url[:50]}...\n"
         f"📱 Kanal: {channel_id}\n"
         f"🌐 Sayt: Avtoelon.uz\n"
-        f"🔍 Filter: {filter_text or 'Yoq'}\n\n"
+        f"🔍 Filter: {filter_text or 'Yoq'}\n"
+        f"{priming_text(primed, pending=True)}\n\n"
         f"Bot har 3 minutda yangi e'lonlarni tekshirib turadi.",
         reply_markup=InlineKeyboards.back_to_admin(),
         parse_mode='HTML'
@@ -223,31 +262,18 @@ async def show_parsers(callback: CallbackQuery):
         await callback.answer("❌ Admin huquqlari yo'q!", show_alert=True)
         return
 
-    parsers = await db.get_all_active_parsers()
-    
-    if not parsers:
-        await callback.message.edit_text(
-            "❌ Hozircha parser yo'q.\n\n"
-            "Yangi parser qo'shish uchun admin paneldan foydalaning.",
-            reply_markup=InlineKeyboards.back_to_admin()
-        )
-    else:
-        text = f"📋 <b>Barcha parserlar</b> ({len(parsers)} ta):\n\n"
-        for p in parsers:
-            site = 'OLX' if p['site_type'] == 'olx' else 'Avtoelon'
-            filter_info = f" | Filter: {p['filter_text']}" if p['filter_text'] else ''
-            admin_who_added = f" | Qo'shgan: {p['admin_id']}"
-            channel_id = f" | Kanal: {p['channel_id']}"
-            text += f"🆔 {p['id']}: {p['url'][:30]}... ({site}){filter_info}{admin_who_added}\n{channel_id}\n"
-
-        text += "\nParser tanlang yoki o'chirish uchun ❌ bosing:"
-        
-        await callback.message.edit_text(
-            text,
-            reply_markup=InlineKeyboards.parsers_list(parsers),
-            parse_mode='HTML'
-        )
+    await show_page(callback)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("plist:"))
+async def paginate_parsers(callback: CallbackQuery):
+    user_id = callback.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await callback.answer("❌ Admin huquqlari yo'q!", show_alert=True)
+        return
     
+    await show_page(callback, *parse_page_callback(callback.data))
     await callback.answer()
 
 
@@ -263,30 +289,283 @@ async def delete_parser(callback: CallbackQuery):
     await db.delete_parser(parser_id)
     
     await callback.answer("✅ Parser o'chirildi!", show_alert=True)
+    await show_page(callback, *current_page(callback.message.reply_markup))
+
+
+@router.callback_query(F.data.startswith("rules_"))
+async def edit_rules_start(callback: CallbackQuery, state: FSMContext):
+    user_id = callback.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await callback.answer("❌ Admin huquqlari yo'q!", show_alert=True)
+        return
+    
+    parser_id = int(callback.data.split('_')[1])
+    parser = registry.get(parser_id)
+    if not parser:
+        await callback.answer("❌ Parser topilmadi!", show_alert=True)
+        return
     
-    parsers = await db.get_all_active_parsers()
+    rules = json.loads(parser['filter_rules']) if parser.get('filter_rules') else {}
+    await state.update_data(parser_id=parser_id)
     
-    if not parsers:
-        await callback.message.edit_text(
-            "❌ Hozircha parser yo'q.\n\n"
-            "Yangi parser qo'shish uchun admin paneldan foydalaning.",
-            reply_markup=InlineKeyboards.back_to_admin()
+    await callback.message.edit_text(
+        f"⚙️ <b>Parser {parser_id} filtrlari</b>\n\n"
+        f"Joriy qoidalar:\n<code>{html.escape(format_rules(rules))}</code>\n\n"
+        f"Yangi qoidalarni yuboring (har biri alohida qatorda):\n"
+        f"<code>{html.escape(RULES_HELP)}</code>\n\n"
+        f"Narx y.e. (usd) yoki so'mda (uzs) bo'lishi mumkin.\n"
+        f"Filtrlarni o'chirish uchun <code>-</code> yuboring.",
+        reply_markup=InlineKeyboards.cancel(),
+        parse_mode='HTML'
+    )
+    await state.set_state(EditRulesStates.waiting_for_rules)
+    await callback.answer()
+
+
+@router.message(EditRulesStates.waiting_for_rules)
+async def process_rules(message: Message, state: FSMContext):
+    user_id = message.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await message.answer("❌ Admin huquqlari yo'q!")
+        await state.clear()
+        return
+    
+    text = message.text.strip()
+    data = await state.get_data()
+    parser_id = data['parser_id']
+    
+    if text == '-':
+        rules = {}
+    else:
+        try:
+            rules = parse_rules_text(text)
+        except (ValueError, re.error) as e:
+            await message.answer(
+                f"❌ Qoidalarda xato: {html.escape(str(e))}\n\n"
+                f"Namuna:\n<code>{html.escape(RULES_HELP)}</code>",
+                reply_markup=InlineKeyboards.cancel(),
+                parse_mode='HTML'
+            )
+            return
+    
+    await db.set_filter_rules(parser_id, json.dumps(rules, ensure_ascii=False) if rules else None)
+    await state.clear()
+    
+    await message.answer(
+        f"✅ <b>Parser {parser_id} filtrlari saqlandi!</b>\n\n"
+        f"<code>{html.escape(format_rules(rules))}</code>",
+        reply_markup=InlineKeyboards.back_to_admin(),
+        parse_mode='HTML'
+    )
+
+
+@router.callback_query(F.data.startswith("lite_"))
+async def toggle_lite_mode(callback: CallbackQuery):
+    user_id = callback.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await callback.answer("❌ Admin huquqlari yo'q!", show_alert=True)
+        return
+    
+    parser_id = int(callback.data.split('_')[1])
+    parser = registry.get(parser_id)
+    if not parser:
+        await callback.answer("❌ Parser topilmadi!", show_alert=True)
+        return
+    
+    lite_mode = not parser.get('lite_mode')
+    await db.set_lite_mode(parser_id, lite_mode)
+    
+    await callback.answer(
+        "⚡ Lite rejim yoqildi: e'lonlar ro'yxat kartasidan yuboriladi." if lite_mode
+        else "📄 Lite rejim o'chirildi: e'lonlar to'liq sahifadan yuboriladi.",
+        show_alert=True
+    )
+    
+    await show_page(callback, *current_page(callback.message.reply_markup))
+
+
+@router.message(Command("prime"))
+async def cmd_prime(message: Message):
+    user_id = message.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await message.answer("❌ Admin huquqlari yo'q!")
+        return
+    
+    args = message.text.split()
+    if len(args) != 2 or not args[1].isdigit():
+        await message.answer(
+            "❌ Parser ID ni kiriting.\n\n"
+            "Misol: <code>/prime 5</code>",
+            parse_mode='HTML'
         )
+        return
+    
+    parser_id = int(args[1])
+    parser = registry.get(parser_id)
+    if not parser:
+        await message.answer("❌ Parser topilmadi!")
+        return
+    
+    primed = await PrimingService.prime(db, parser)
+    await message.answer(
+        f"🆔 Parser {parser_id}\n{priming_text(primed)}",
+        reply_markup=InlineKeyboards.back_to_admin()
+    )
+
+
+@router.message(Command("parsers"))
+async def cmd_parsers(message: Message):
+    user_id = message.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await message.answer("❌ Admin huquqlari yo'q!")
+        return
+    
+    args = message.text.split()[1:]
+    if not args:
+        filter_key = ''
+    elif len(args) == 1 and args[0] in ('olx', 'avtoelon'):
+        filter_key = f"site:{args[0]}"
+    elif len(args) == 2 and args[0] in ('kanal', 'admin'):
+        filter_key = f"{'ch' if args[0] == 'kanal' else 'adm'}:{args[1]}"
+    else:
+        filter_key = None
+    
+    if filter_key is None or len(filter_key.encode()) > 40:
+        await message.answer(
+            "❌ Noto'g'ri filtr.\n\n"
+            "Misol: <code>/parsers olx</code>, <code>/parsers kanal -1001234567890</code>, "
+            "<code>/parsers admin 123456</code>",
+            parse_mode='HTML'
+        )
+        return
+    
+    text, markup = await pages.render(filter_key)
+    await message.answer(text, reply_markup=markup, parse_mode='HTML')
+
+
+@router.message(Command("template"))
+async def cmd_template(message: Message):
+    user_id = message.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await message.answer("❌ Admin huquqlari yo'q!")
+        return
+    
+    args = message.text.split(maxsplit=2)
+    if len(args) < 2 or not args[1].isdigit():
+        await message.answer(
+            "❌ Parser ID ni kiriting.\n\n"
+            "Misol: <code>/template 5 compact</code>\n"
+            f"Tayyor shablonlar: {', '.join(BUILTIN_TEMPLATES)}, default\n"
+            f"Maydonlar: {', '.join('{' + field + '}' for field in FIELDS)}\n"
+            "Shartli blok: <code>{?price}💰 {price}{/price}</code>",
+            parse_mode='HTML'
+        )
+        return
+    
+    parser_id = int(args[1])
+    parser = registry.get(parser_id)
+    if not parser:
+        await message.answer("❌ Parser topilmadi!")
+        return
+    
+    if len(args) == 2:
+        current = parser.get('template') or 'default'
+        await message.answer(
+            f"🆔 Parser {parser_id}\n🧩 Joriy shablon: <code>{html.escape(current[:1000])}</code>",
+            parse_mode='HTML'
+        )
+        return
+    
+    template = None if args[2] == 'default' else args[2]
+    if template and template not in BUILTIN_TEMPLATES:
+        try:
+            compile_template(template)
+        except TemplateError as e:
+            await message.answer(f"❌ Shablon xatosi: {html.escape(str(e))}")
+            return
+    
+    preview = renderer.render(TEMPLATE_SAMPLE, parser['site_type'], template)
+    try:
+        await message.answer(
+            f"🧩 Parser {parser_id} uchun shablon namunasi:\n\n{preview}",
+            parse_mode='HTML',
+            disable_web_page_preview=True
+        )
+    except TelegramBadRequest as e:
+        await message.answer(f"❌ Shablon Telegram HTML sifatida yaroqsiz, saqlanmadi: {html.escape(str(e))}")
+        return
+
+    await db.set_template(parser_id, template)
+    await message.answer(f"✅ Parser {parser_id} uchun shablon saqlandi.")
+
+
+@router.message(Command("burst"))
+async def cmd_burst(message: Message):
+    user_id = message.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await message.answer("❌ Admin huquqlari yo'q!")
+        return
+    
+    args = message.text.split()
+    if len(args) not in (2, 3) or not all(arg.isdigit() for arg in args[1:]):
+        await message.answer(
+            "❌ Parser ID va chegarani kiriting.\n\n"
+            "Misol: <code>/burst 5 10</code> – 10 tadan ko'p yangi e'lon jamlanma xabarda yuboriladi\n"
+            "<code>/burst 5 0</code> – jamlanma o'chiriladi\n"
+            f"<code>/burst 5</code> – standart chegara ({Config.DIGEST_THRESHOLD})",
+            parse_mode='HTML'
+        )
+        return
+    
+    parser_id = int(args[1])
+    if not registry.get(parser_id):
+        await message.answer("❌ Parser topilmadi!")
+        return
+    
+    threshold = int(args[2]) if len(args) == 3 else None
+    await db.set_burst_threshold(parser_id, threshold)
+    
+    if threshold == 0:
+        text = "📨 Jamlanma o'chirildi: barcha e'lonlar alohida yuboriladi."
     else:
-        text = f"📋 <b>Barcha parserlar</b> ({len(parsers)} ta):\n\n"
-        for p in parsers:
-            site = 'OLX' if p['site_type'] == 'olx' else 'Avtoelon'
-            filter_info = f" | Filter: {p['filter_text']}" if p['filter_text'] else ''
-            admin_who_added = f" | Qo'shgan: {p['admin_id']}"
-            channel_id = f" | Kanal: {p['channel_id']}"
-            text += f"🆔 {p['id']}: {p['url'][:30]}... ({site}){filter_info}{admin_who_added}\n{channel_id}\n"
-        text += "\nParser tanlang yoki o'chirish uchun ❌ bosing:"
-        
+        text = f"🗂 {threshold or Config.DIGEST_THRESHOLD} tadan ko'p yangi e'lon jamlanma xabarda yuboriladi."
+    await message.answer(f"🆔 Parser {parser_id}\n{text}", reply_markup=InlineKeyboards.back_to_admin())
+
+
+def perf_report() -> str:
+    return PerfReport.render(metrics.snapshot(), registry.all(), FreshnessTracker.summary())
+
+
+@router.message(Command("perf"))
+async def cmd_perf(message: Message):
+    user_id = message.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await message.answer("❌ Admin huquqlari yo'q!")
+        return
+    
+    await message.answer(
+        perf_report(),
+        reply_markup=InlineKeyboards.perf_menu(),
+        parse_mode='HTML'
+    )
+
+
+@router.callback_query(F.data == "perf")
+async def show_perf(callback: CallbackQuery):
+    user_id = callback.from_user.id
+    if user_id not in Config.ADMIN_IDS:
+        await callback.answer("❌ Admin huquqlari yo'q!", show_alert=True)
+        return
+    
+    try:
         await callback.message.edit_text(
-            text,
-            reply_markup=InlineKeyboards.parsers_list(parsers),
+            perf_report(),
+            reply_markup=InlineKeyboards.perf_menu(),
             parse_mode='HTML'
         )
+    except TelegramBadRequest:
+        pass
+    await callback.answer()
 
 
 @router.callback_query(F.data == "cancel")
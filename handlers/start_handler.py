@@ -1,4 +1,3 @@
-from asyncio.log import logger
 from urllib.parse import urljoin
 from aiogram import Router, F
 from aiogram.filters import CommandStart, Command
@@ -1,5 +1,5 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 
 class InlineKeyboards:
@@ -9,6 +9,7 @@ class InlineKeyboards:
         buttons = [
             [InlineKeyboardButton(text="➕ Yangi parser qo'shish", callback_data='add_parser')],
             [InlineKeyboardButton(text="📋 Mening parserlarim", callback_data='my_parsers')],
+            [InlineKeyboardButton(text="📊 Statistika", callback_data='perf')],
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
@@ -22,7 +23,8 @@ class InlineKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
     @staticmethod
-    def parsers_list(parsers: List[Dict]) -> InlineKeyboardMarkup:
+    def parsers_list(parsers: List[Dict], filter_key: str = '', prev_cursor: Optional[int] = None,
+                     next_cursor: Optional[int] = None) -> InlineKeyboardMarkup:
         buttons = []
         
         for parser in parsers:
@@ -38,6 +40,14 @@ class InlineKeyboards:
                     text=f"🔗 {short_name} ({site})",
                     callback_data=f"view_{parser['id']}"
                 ),
+                InlineKeyboardButton(
+                    text="⚙️",
+                    callback_data=f"rules_{parser['id']}"
+                ),
+                InlineKeyboardButton(
+                    text="⚡" if parser.get('lite_mode') else "📄",
+                    callback_data=f"lite_{parser['id']}"
+                ),
                 InlineKeyboardButton(
                     text="❌",
                     callback_data=f"delete_{parser['id']}"
@@ -47,10 +57,31 @@ class InlineKeyboards:
         if not buttons:
             buttons.append([InlineKeyboardButton(text="❌ Parserlar yo'q", callback_data='none')])
         
+        navigation = []
+        if prev_cursor is not None:
+            navigation.append(InlineKeyboardButton(text="⬅️", callback_data=f"plist:p:{prev_cursor}:{filter_key}"))
+        navigation.append(InlineKeyboardButton(text="🔄", callback_data=f"plist:n:{(parsers[0]['id'] - 1) if parsers else 0}:{filter_key}"))
+        if next_cursor is not None:
+            navigation.append(InlineKeyboardButton(text="➡️", callback_data=f"plist:n:{next_cursor}:{filter_key}"))
+        buttons.append(navigation)
+        
+        buttons.append([
+            InlineKeyboardButton(text="Hammasi", callback_data='plist:n:0:'),
+            InlineKeyboardButton(text="OLX", callback_data='plist:n:0:site:olx'),
+            InlineKeyboardButton(text="Avtoelon", callback_data='plist:n:0:site:avtoelon')
+        ])
         buttons.append([InlineKeyboardButton(text="◀️ Orqaga", callback_data='back_admin')])
         
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @staticmethod
+    def perf_menu() -> InlineKeyboardMarkup:
+        buttons = [
+            [InlineKeyboardButton(text="🔄 Yangilash", callback_data='perf')],
+            [InlineKeyboardButton(text="◀️ Admin panel", callback_data='back_admin')],
+        ]
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
     @staticmethod
     def back_to_admin() -> InlineKeyboardMarkup:
         buttons = [[InlineKeyboardButton(text="◀️ Admin panel", callback_data='back_admin')]]
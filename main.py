@@ -1,25 +1,29 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import Config
 from handlers import admin_handler, start_handler
 from database.db import Database
+from services.logging_service import setup_logging
+from services.parser_registry import registry
 from services.scheduler_service import SchedulerService
+from services.web_service import WebService
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 
 async def main():
+    log_listener = setup_logging()
     db = Database()
     await db.create_tables()
+    await registry.load(db)
     
-    bot = Bot(token=Config.BOT_TOKEN)
+    session = AiohttpSession(api=TelegramAPIServer.from_base(Config.TELEGRAM_API_URL)) if Config.TELEGRAM_API_URL else None
+    bot = Bot(token=Config.BOT_TOKEN, session=session)
     storage = MemoryStorage()
     dp = Dispatcher(storage=storage)
     
@@ -27,11 +31,36 @@ async def main():
     dp.include_router(admin_handler.router)
     
     scheduler = SchedulerService(bot, db)
-    asyncio.create_task(scheduler.start())
+    state = scheduler.snapshot.load()
+    if state:
+        try:
+            scheduler.restore_state(state)
+        except Exception as e:
+            logger.warning(f"Snapshot tiklanmadi: {e}")
+    scheduler_task = asyncio.create_task(scheduler.start())
     
-    logger.info("Bot ishga tushdi!")
+    web_service = WebService(bot, dp, scheduler) if Config.BOT_MODE == 'webhook' or Config.WEB_ENABLED else None
+    logger.info(f"Bot ishga tushdi! ({Config.BOT_MODE})")
     
-    await dp.start_polling(bot)
+    try:
+        if web_service:
+            await web_service.start()
+        if Config.BOT_MODE == 'webhook':
+            await asyncio.Event().wait()
+        else:
+            await dp.start_polling(bot)
+    finally:
+        if web_service:
+            await web_service.stop()
+        scheduler.stop()
+        try:
+            await scheduler_task
+        except Exception as e:
+            logger.error(f"Schedulerni to'xtatishda xato: {e}")
+        await scheduler.checkpoint(force=True)
+        await bot.session.close()
+        await db.close()
+        log_listener.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,171 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from config import Config
+from services.http_client import HttpClient
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CassetteStore:
+
+    def __init__(self, path: str = Config.CASSETTE_DIR):
+        self.path = path
+        self.index_path = os.path.join(path, 'index.jsonl')
+        self.entries: Dict[str, List[Dict]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, 'blobs', digest[:2], f"{digest}.gz")
+
+    def load(self) -> int:
+        self.entries = {}
+        self._cursors = {}
+        if not os.path.exists(self.index_path):
+            return 0
+        count = 0
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                self.entries.setdefault(entry['url'], []).append(entry)
+                self._seq = max(self._seq, entry.get('seq', 0))
+                count += 1
+        return count
+
+    def write_blob(self, body: bytes) -> str:
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(temp_path, 'wb', compresslevel=6) as f:
+                f.write(body)
+            os.replace(temp_path, path)
+        return digest
+
+    def read_blob(self, digest: str) -> bytes:
+        with gzip.open(self.blob_path(digest), 'rb') as f:
+            return f.read()
+
+    def record(self, url: str, status: int, headers: Dict, body: bytes, elapsed: float) -> Dict:
+        digest = self.write_blob(body)
+        with self._lock:
+            return self._append(url, status, headers, digest, len(body), elapsed)
+
+    def _append(self, url: str, status: int, headers: Dict, digest: str, size: int, elapsed: float) -> Dict:
+        self._seq += 1
+        entry = {
+            'seq': self._seq,
+            'url': url,
+            'status': status,
+            'headers': headers,
+            'body': digest,
+            'size': size,
+            'elapsed': round(elapsed, 4),
+            'recorded_at': time.time()
+        }
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.entries.setdefault(url, []).append(entry)
+        return entry
+
+    def next(self, url: str) -> Optional[Dict]:
+        recordings = self.entries.get(url)
+        if not recordings:
+            return None
+        cursor = self._cursors.get(url, 0)
+        self._cursors[url] = cursor + 1
+        return recordings[min(cursor, len(recordings) - 1)]
+
+    def rewind(self):
+        self._cursors = {}
+
+    def stats(self) -> Dict:
+        recordings = [entry for entries in self.entries.values() for entry in entries]
+        return {
+            'urls': len(self.entries),
+            'recordings': len(recordings),
+            'blobs': len({entry['body'] for entry in recordings}),
+            'bytes': sum(entry['size'] for entry in recordings)
+        }
+
+
+class RecordingClient(HttpClient):
+
+    def __init__(self, store: Optional[CassetteStore] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store or CassetteStore()
+        self.store.load()
+
+    async def fetch(self, url: str, headers: Optional[Dict] = None) -> Optional[Dict]:
+        response = await super().fetch(url, headers)
+        if response:
+            try:
+                await asyncio.to_thread(
+                    self.store.record, url, response['status'], response['headers'],
+                    response['text'].encode('utf-8'), response['elapsed']
+                )
+                metrics.inc('cassette.recorded')
+            except OSError as e:
+                logger.error(f"Kassetaga yozishda xato {url}: {e}")
+        return response
+
+
+class ReplayClient(HttpClient):
+
+    def __init__(self, store: Optional[CassetteStore] = None, emulate_timing: bool = Config.REPLAY_TIMING,
+                 speed: float = Config.REPLAY_SPEED, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store or CassetteStore()
+        self.emulate_timing = emulate_timing
+        self.speed = speed
+        logger.info(f"Replay rejimi: {self.store.load()} ta yozuv yuklandi ({self.store.path})")
+
+    async def fetch(self, url: str, headers: Optional[Dict] = None) -> Optional[Dict]:
+        host = urlsplit(url).hostname or ''
+        entry = self.store.next(url)
+        if not entry:
+            metrics.inc('cassette.miss')
+            logger.warning(f"Kassetada topilmadi: {url}")
+            return None
+
+        if self.emulate_timing and entry['elapsed']:
+            await asyncio.sleep(entry['elapsed'] / self.speed)
+        body = await asyncio.to_thread(self.store.read_blob, entry['body'])
+
+        metrics.inc('cassette.hit')
+        metrics.inc(f"http.{host}.requests")
+        metrics.inc(f"http.{host}.status.{entry['status']}")
+        metrics.observe(f"http.{host}.latency", entry['elapsed'])
+        return {
+            'url': url,
+            'status': entry['status'],
+            'headers': entry['headers'],
+            'text': body.decode('utf-8', errors='replace'),
+            'elapsed': entry['elapsed']
+        }
+
+    async def probe(self, url: str) -> Optional[Dict]:
+        return None
+
+
+def create_http_client() -> HttpClient:
+    if Config.HTTP_MODE == 'record':
+        return RecordingClient()
+    if Config.HTTP_MODE == 'replay':
+        return ReplayClient()
+    return HttpClient()
@@ -0,0 +1,296 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import time
+import zlib
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import Config
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_RE = re.compile(r'^segment-(\d{6})\.ndjson\.gz$')
+READ_CHUNK = 64 * 1024
+
+
+def overlaps(low: Optional[float], high: Optional[float], since: Optional[float], until: Optional[float]) -> bool:
+    if low is None or high is None:
+        return True
+    return (since is None or high >= since) and (until is None or low <= until)
+
+
+def read_members(f: BinaryIO, start: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    f.seek(start)
+    offset = start
+    pending = b''
+    while True:
+        data = pending or f.read(READ_CHUNK)
+        if not data:
+            return
+        decompressor = zlib.decompressobj(wbits=31)
+        parts = []
+        consumed = 0
+        while True:
+            try:
+                parts.append(decompressor.decompress(data))
+            except zlib.error:
+                return
+            if decompressor.eof:
+                consumed += len(data) - len(decompressor.unused_data)
+                pending = decompressor.unused_data
+                break
+            consumed += len(data)
+            data = f.read(READ_CHUNK)
+            if not data:
+                return
+        yield offset, consumed, b''.join(parts)
+        offset += consumed
+
+
+def empty_index(number: int) -> Dict:
+    return {
+        'segment': number, 'count': 0, 'bytes': 0,
+        'min_id': None, 'max_id': None, 'min_time': None, 'max_time': None,
+        'sites': {}, 'members': []
+    }
+
+
+def add_member(index: Dict, member: Dict, sites: Dict[str, int]):
+    index['members'].append(member)
+    index['count'] += member['count']
+    index['bytes'] = member['offset'] + member['length']
+    for key, pick in (('min_id', min), ('max_id', max), ('min_time', min), ('max_time', max)):
+        values = [value for value in (index[key], member[key]) if value is not None]
+        index[key] = pick(values) if values else None
+    for site, count in sites.items():
+        index['sites'][site] = index['sites'].get(site, 0) + count
+
+
+def member_entry(offset: int, length: int, records: Iterable[Tuple[Optional[int], float, str]]) -> Tuple[Dict, Dict]:
+    ids, times, sites = [], [], {}
+    count = 0
+    for ad_id, scraped_at, site in records:
+        count += 1
+        if ad_id is not None:
+            ids.append(ad_id)
+        times.append(scraped_at)
+        sites[site] = sites.get(site, 0) + 1
+    member = {
+        'offset': offset, 'length': length, 'count': count,
+        'min_id': min(ids) if ids else None, 'max_id': max(ids) if ids else None,
+        'min_time': min(times) if times else None, 'max_time': max(times) if times else None,
+    }
+    return member, sites
+
+
+class CorpusStore:
+
+    def __init__(self, path: str = Config.CORPUS_DIR, segment_records: int = Config.CORPUS_SEGMENT_RECORDS,
+                 compresslevel: int = Config.CORPUS_COMPRESSLEVEL, max_bytes: int = Config.CORPUS_MAX_BYTES,
+                 max_pending: int = Config.CORPUS_MAX_PENDING):
+        self.path = path
+        self.segment_records = segment_records
+        self.compresslevel = compresslevel
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self._buffer: List[Tuple[bytes, Optional[int], float, str]] = []
+        self._index: Optional[Dict] = None
+        self._lock = asyncio.Lock()
+
+    def data_path(self, number: int) -> str:
+        return os.path.join(self.path, f"segment-{number:06d}.ndjson.gz")
+
+    def index_path(self, number: int) -> str:
+        return os.path.join(self.path, f"segment-{number:06d}.idx.json")
+
+    def segments(self) -> List[int]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(int(match.group(1)) for match in map(SEGMENT_RE.match, os.listdir(self.path)) if match)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def add(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+        self._buffer.append((line, record.get('ad_id'), record['scraped_at'], record.get('site', '')))
+
+    async def flush(self) -> int:
+        async with self._lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            started = time.monotonic()
+            try:
+                size = await asyncio.to_thread(self.write_batch, batch)
+            except Exception:
+                self._buffer[:0] = batch
+                self._trim_buffer()
+                raise
+            metrics.inc('corpus.records', len(batch))
+            metrics.inc('corpus.bytes', size)
+            metrics.observe('corpus.flush_latency', time.monotonic() - started)
+            return len(batch)
+
+    def _trim_buffer(self):
+        overflow = len(self._buffer) - self.max_pending
+        if overflow > 0:
+            del self._buffer[:overflow]
+            metrics.inc('corpus.dropped', overflow)
+            logger.warning(f"Korpus navbati to'ldi, eng eski {overflow} ta yozuv tashlandi")
+
+    def write_batch(self, batch: List[Tuple[bytes, Optional[int], float, str]]) -> int:
+        index = self.current_index()
+        if index['count'] >= self.segment_records:
+            logger.info(f"Korpus segmenti {index['segment']} yopildi: {index['count']} ta e'lon")
+            index = self._index = empty_index(index['segment'] + 1)
+            self.enforce_retention()
+
+        member_bytes = gzip.compress(b''.join(line for line, _, _, _ in batch), compresslevel=self.compresslevel, mtime=0)
+        path = self.data_path(index['segment'])
+        try:
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(index['bytes'])
+                f.truncate()
+                f.write(member_bytes)
+                f.flush()
+        except OSError:
+            self.truncate(path, index['bytes'])
+            raise
+
+        member, sites = member_entry(
+            index['bytes'], len(member_bytes), ((ad_id, at, site) for _, ad_id, at, site in batch)
+        )
+        add_member(index, member, sites)
+        try:
+            self.save_index(index)
+        except OSError as e:
+            logger.warning(f"Korpus indeksi {index['segment']} saqlanmadi, keyingi o'qishda qayta quriladi: {e}")
+        return len(member_bytes)
+
+    @staticmethod
+    def truncate(path: str, size: int):
+        try:
+            if os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+        except OSError as e:
+            logger.warning(f"Korpus fayli {path} kesilmadi: {e}")
+
+    def enforce_retention(self) -> int:
+        if not self.max_bytes:
+            return 0
+        current = self._index['segment'] if self._index else None
+        sizes = []
+        for number in self.segments():
+            try:
+                sizes.append((number, os.path.getsize(self.data_path(number))))
+            except OSError:
+                continue
+        total = sum(size for _, size in sizes)
+        removed = 0
+        for number, size in sizes:
+            if total <= self.max_bytes or number == current:
+                break
+            for path in (self.data_path(number), self.index_path(number)):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= size
+            removed += 1
+            logger.info(f"Korpus segmenti {number} o'chirildi (CORPUS_MAX_MB chegarasi)")
+        return removed
+
+    def current_index(self) -> Dict:
+        if self._index is None:
+            os.makedirs(self.path, exist_ok=True)
+            numbers = self.segments()
+            self._index = self.recover(numbers[-1]) if numbers else empty_index(1)
+        return self._index
+
+    def save_index(self, index: Dict):
+        path = self.index_path(index['segment'])
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    def load_index(self, number: int) -> Dict:
+        try:
+            with open(self.index_path(number), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index['bytes'] == os.path.getsize(self.data_path(number)):
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+        return self.rebuild_index(number)
+
+    def rebuild_index(self, number: int) -> Dict:
+        index = empty_index(number)
+        with open(self.data_path(number), 'rb') as f:
+            for offset, length, payload in read_members(f):
+                try:
+                    records = [
+                        (record.get('ad_id'), float(record['scraped_at']), record.get('site', ''))
+                        for record in map(json.loads, payload.splitlines())
+                    ]
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    logger.warning(f"Korpus segmenti {number}: {offset}-baytdagi blok buzilgan, qolgani o'qilmaydi")
+                    break
+                member, sites = member_entry(offset, length, records)
+                add_member(index, member, sites)
+        return index
+
+    def recover(self, number: int) -> Dict:
+        index = self.load_index(number)
+        size = os.path.getsize(self.data_path(number))
+        if size > index['bytes']:
+            logger.warning(
+                f"Korpus segmenti {number}: oxiridagi {size - index['bytes']} bayt to'liq yozilmagan, kesib tashlandi"
+            )
+            with open(self.data_path(number), 'r+b') as f:
+                f.truncate(index['bytes'])
+        self.save_index(index)
+        return index
+
+    def scan(self, since: Optional[float] = None, until: Optional[float] = None,
+             ad_ids: Optional[Iterable[int]] = None, site: Optional[str] = None,
+             parser_id: Optional[int] = None) -> Iterator[Dict]:
+        ad_ids = set(ad_ids) if ad_ids else None
+        for number in self.segments():
+            index = self.load_index(number)
+            if not overlaps(index['min_time'], index['max_time'], since, until):
+                continue
+            if site and not index['sites'].get(site):
+                continue
+
+            with open(self.data_path(number), 'rb') as f:
+                for member in index['members']:
+                    if not overlaps(member['min_time'], member['max_time'], since, until):
+                        continue
+                    if ad_ids and member['min_id'] is not None and not any(
+                        member['min_id'] <= ad_id <= member['max_id'] for ad_id in ad_ids
+                    ):
+                        continue
+                    f.seek(member['offset'])
+                    for line in gzip.decompress(f.read(member['length'])).splitlines():
+                        record = json.loads(line)
+                        if since is not None and record['scraped_at'] < since:
+                            continue
+                        if until is not None and record['scraped_at'] > until:
+                            continue
+                        if ad_ids and record.get('ad_id') not in ad_ids:
+                            continue
+                        if site and record.get('site') != site:
+                            continue
+                        if parser_id is not None and record.get('parser_id') != parser_id:
+                            continue
+                        yield record
+
+    def stats(self) -> Dict:
+        index = self._index or {}
+        return {'segment': index.get('segment'), 'records': index.get('count', 0), 'pending': len(self._buffer)}
@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+KEY_PARAMS = {
+    'Год выпуска': 'year',
+    'Год': 'year',
+    'Пробег': 'mileage',
+    'Объем двигателя, л': 'engine',
+    'Объем двигателя': 'engine',
+    'Коробка передач': 'gearbox',
+    'Цвет': 'color',
+    'Кузов': 'body',
+    'Вид топлива': 'fuel',
+}
+
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\s+', ' ', text.lower()).strip()
+
+
+def normalize_price(price: Optional[str]) -> str:
+    if not price:
+        return ''
+    digits = re.sub(r'\D', '', price)
+    currency = 'usd' if re.search(r'y\.?e|\$|у\.?е', price, re.I) else 'sum'
+    return f"{digits}{currency}" if digits else ''
+
+
+class FingerprintIndex:
+
+    def __init__(self, window_days: int = Config.DEDUP_WINDOW_DAYS, max_distance: int = Config.DEDUP_MAX_DISTANCE):
+        self.window = window_days * 86400
+        self.max_distance = max_distance
+        self.entries: Dict[int, Dict] = {}
+        self.bands: List[Dict[int, Set[int]]] = [{} for _ in range(BANDS)]
+        self._next_id = 0
+
+    @staticmethod
+    def is_detailed(details: Dict) -> bool:
+        if details.get('lite'):
+            return False
+        params = {KEY_PARAMS[key] for key, value in (details.get('params') or {}).items() if key in KEY_PARAMS and value}
+        images = {url.split('?')[0] for url in details.get('images') or ()}
+        return len(params) >= Config.DEDUP_MIN_PARAMS and len(images) >= Config.DEDUP_MIN_IMAGES
+
+    @staticmethod
+    def features(details: Dict) -> Dict[str, int]:
+        features: Dict[str, int] = {}
+
+        for word in re.findall(r'\w+', _normalize(details.get('title', ''))):
+            features[f"t:{word}"] = 1
+
+        for key, value in details.get('params', {}).items():
+            name = KEY_PARAMS.get(key)
+            if not name or not value:
+                continue
+            value = _normalize(value)
+            if name == 'mileage':
+                digits = re.sub(r'\D', '', value)
+                value = str(int(digits) // 1000) if digits else value
+            features[f"{name}:{value}"] = 1
+
+        for url in details.get('images', []):
+            features[f"i:{'/'.join(url.split('?')[0].rsplit('/', 2)[-2:])}"] = 1
+
+        return features
+
+    @staticmethod
+    def simhash(features: Dict[str, int]) -> int:
+        vector = [0] * 64
+        for token, weight in features.items():
+            hashed = _hash64(token)
+            for bit in range(64):
+                if hashed >> bit & 1:
+                    vector[bit] += weight
+                else:
+                    vector[bit] -= weight
+        fingerprint = 0
+        for bit in range(64):
+            if vector[bit] > 0:
+                fingerprint |= 1 << bit
+        return fingerprint
+
+    def fingerprint(self, details: Dict) -> int:
+        return self.simhash(self.features(details))
+
+    def find(self, channel_id: str, fingerprint: int, now: Optional[float] = None) -> Optional[Dict]:
+        now = now or time.time()
+        best = None
+        best_distance = self.max_distance + 1
+        seen: Set[int] = set()
+
+        for band in range(BANDS):
+            key = fingerprint >> (band * BAND_BITS) & BAND_MASK
+            for entry_id in self.bands[band].get(key, ()):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                entry = self.entries[entry_id]
+                if entry['channel_id'] != channel_id or now - entry['created_at'] > self.window:
+                    continue
+                distance = (entry['simhash'] ^ fingerprint).bit_count()
+                if distance < best_distance:
+                    best, best_distance = entry, distance
+
+        return best
+
+    def add(self, channel_id: str, fingerprint: int, href: str, price: Optional[str],
+            message_id: Optional[int] = None, created_at: Optional[float] = None, row_id: Optional[int] = None) -> Dict:
+        self._next_id += 1
+        entry = {
+            'id': self._next_id,
+            'row_id': row_id,
+            'channel_id': channel_id,
+            'simhash': fingerprint,
+            'href': href,
+            'price': price,
+            'message_id': message_id,
+            'created_at': created_at or time.time()
+        }
+        self.entries[entry['id']] = entry
+        for band in range(BANDS):
+            key = fingerprint >> (band * BAND_BITS) & BAND_MASK
+            self.bands[band].setdefault(key, set()).add(entry['id'])
+        return entry
+
+    def remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id, None)
+        if not entry:
+            return
+        for band in range(BANDS):
+            key = entry['simhash'] >> (band * BAND_BITS) & BAND_MASK
+            bucket = self.bands[band].get(key)
+            if bucket:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.bands[band][key]
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        now = now or time.time()
+        expired = [entry_id for entry_id, entry in self.entries.items() if now - entry['created_at'] > self.window]
+        for entry_id in expired:
+            self.remove(entry_id)
+        return len(expired)
+
+    def _add_row(self, row: Dict) -> Dict:
+        return self.add(row['channel_id'], row['simhash'] & (2 ** 64 - 1), row['href'], row['price'],
+                        row['message_id'], row['created_at'], row['id'])
+
+    async def load(self, db):
+        rows = await db.get_recent_fingerprints(time.time() - self.window)
+        for row in rows:
+            self._add_row(row)
+        logger.info(f"Fingerprint index yuklandi: {len(rows)} ta yozuv")
+
+    def dump(self) -> List[Tuple]:
+        return [
+            (entry['row_id'], entry['channel_id'], entry['simhash'], entry['href'], entry['price'],
+             entry['message_id'], entry['created_at'])
+            for entry in self.entries.values() if entry['row_id'] is not None
+        ]
+
+    def restore(self, rows: List[Tuple]):
+        for row_id, channel_id, fingerprint, href, price, message_id, created_at in rows:
+            self.add(channel_id, fingerprint, href, price, message_id, created_at, row_id)
+
+    async def reconcile(self, db) -> Dict[str, int]:
+        now = time.time()
+        expired = self.evict_expired(now)
+        current = {row['id']: row for row in await db.get_fingerprint_keys(now - self.window)}
+        by_row = {entry['row_id']: entry for entry in list(self.entries.values()) if entry['row_id'] is not None}
+
+        removed = updated = 0
+        for row_id, entry in by_row.items():
+            row = current.get(row_id)
+            if row is None:
+                self.remove(entry['id'])
+                removed += 1
+            elif row['href'] != entry['href'] or row['price'] != entry['price']:
+                entry['href'], entry['price'] = row['href'], row['price']
+                updated += 1
+
+        missing = [row_id for row_id in current if row_id not in by_row]
+        for row in await db.get_fingerprints(missing) if missing else []:
+            self._add_row(row)
+
+        return {'expired': expired, 'removed': removed, 'updated': updated, 'added': len(missing)}
+
+
+def to_signed(fingerprint: int) -> int:
+    return fingerprint - 2 ** 64 if fingerprint >= 2 ** 63 else fingerprint
@@ -0,0 +1,159 @@
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from config import Config
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+
+HEADER_PROFILES = [
+    {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8'
+    },
+    {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                      'Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'ru-RU,ru;q=0.9,uz;q=0.8,en;q=0.7'
+    },
+    {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+                      'Version/17.1 Safari/605.1.15',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'ru-RU,ru;q=0.9'
+    },
+    {
+        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3'
+    },
+]
+
+
+class Egress:
+
+    def __init__(self, proxy: Optional[str], headers: Dict, name: Optional[str] = None):
+        self.proxy = proxy
+        self.headers = headers
+        self.name = name or Egress.label(proxy)
+        self.success_rate = 1.0
+        self.latency = 1.0
+        self.consecutive_failures = 0
+        self.quarantined_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    @staticmethod
+    def label(proxy: Optional[str]) -> str:
+        if not proxy:
+            return 'direct'
+        try:
+            parts = urlsplit(proxy if '://' in proxy else f"http://{proxy}")
+            host, port = parts.hostname, parts.port
+        except ValueError:
+            return 'proxy'
+        if not host:
+            return 'proxy'
+        if ':' in host:
+            host = f"[{host}]"
+        return f"{host}:{port}" if port else host
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.quarantined_until
+
+    def score(self) -> float:
+        return max(self.success_rate, 0.01) / (self.latency + 0.5)
+
+    def dump(self) -> Dict:
+        return {
+            'egress': self.name,
+            'success_rate': self.success_rate,
+            'latency': self.latency,
+            'quarantine_remaining': max(0.0, self.quarantined_until - time.monotonic())
+        }
+
+    def restore(self, data: Dict):
+        self.success_rate = data['success_rate']
+        self.latency = data['latency']
+        if data['quarantine_remaining'] > 0:
+            self.quarantined_until = time.monotonic() + data['quarantine_remaining']
+
+    def stats(self) -> Dict:
+        return {
+            'egress': self.name,
+            'success_rate': round(self.success_rate, 3),
+            'latency': round(self.latency, 3),
+            'requests': self.requests,
+            'failures': self.failures,
+            'quarantined': self.quarantined_until > time.monotonic()
+        }
+
+
+class EgressPool:
+
+    def __init__(self, proxies: List[Optional[str]], header_profiles: List[Dict] = HEADER_PROFILES):
+        if not proxies:
+            proxies = [None]
+        self.egresses: List[Egress] = []
+        labels: Dict[str, int] = {}
+        for i, proxy in enumerate(proxies):
+            label = Egress.label(proxy)
+            labels[label] = labels.get(label, 0) + 1
+            name = label if labels[label] == 1 else f"{label}#{labels[label]}"
+            self.egresses.append(Egress(proxy, header_profiles[i % len(header_profiles)], name))
+
+    @classmethod
+    def from_config(cls) -> 'EgressPool':
+        proxies: List[Optional[str]] = list(Config.PROXIES)
+        if Config.EGRESS_DIRECT or not proxies:
+            proxies.insert(0, None)
+        return cls(proxies)
+
+    def pick(self) -> Egress:
+        now = time.monotonic()
+        available = [egress for egress in self.egresses if egress.is_available(now)]
+        if not available:
+            return min(self.egresses, key=lambda egress: egress.quarantined_until)
+        if len(available) == 1:
+            return available[0]
+        return random.choices(available, weights=[egress.score() for egress in available])[0]
+
+    def record(self, egress: Egress, status: Optional[int], elapsed: float):
+        failed = status is None or status in (403, 407, 429)
+        egress.requests += 1
+        egress.success_rate = 0.9 * egress.success_rate + (0.0 if failed else 0.1)
+        egress.latency = 0.8 * egress.latency + 0.2 * elapsed
+
+        if not failed:
+            egress.consecutive_failures = 0
+            return
+
+        egress.failures += 1
+        egress.consecutive_failures += 1
+        metrics.inc(f"egress.{egress.name}.failures")
+        if egress.consecutive_failures >= Config.EGRESS_QUARANTINE_FAILURES:
+            egress.quarantined_until = time.monotonic() + Config.EGRESS_QUARANTINE_SECONDS
+            egress.consecutive_failures = 0
+            egress.success_rate = 0.5
+            metrics.inc(f"egress.{egress.name}.quarantined")
+            logger.warning(
+                f"Egress {egress.name}: {Config.EGRESS_QUARANTINE_SECONDS}s karantinga olindi (status={status})"
+            )
+
+    def dump(self) -> List[Dict]:
+        return [egress.dump() for egress in self.egresses]
+
+    def restore(self, data: List[Dict]):
+        by_name = {egress.name: egress for egress in self.egresses}
+        for item in data:
+            egress = by_name.get(item['egress'])
+            if egress:
+                egress.restore(item)
+
+    def stats(self) -> List[Dict]:
+        return [egress.stats() for egress in self.egresses]
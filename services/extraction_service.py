@@ -0,0 +1,125 @@
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from bs4 import BeautifulSoup, Tag
+
+AttrMatch = Union[str, bool, Callable[[Optional[str]], bool]]
+
+
+class Rule(NamedTuple):
+    name: str
+    tag: str
+    attrs: Dict[str, AttrMatch] = {}
+    within: Tuple[str, ...] = ()
+    many: bool = False
+    unless: Optional[str] = None
+
+
+def attr_matches(value, expected: AttrMatch) -> bool:
+    if expected is True:
+        return value is not None
+    if callable(expected):
+        if isinstance(value, list):
+            value = ' '.join(value)
+        return expected(value)
+    if value is None:
+        return False
+    if isinstance(value, list):
+        return expected in value or ' '.join(value) == expected
+    return value == expected
+
+
+def contains(text: str) -> Callable[[Optional[str]], bool]:
+    return lambda value: value is not None and text in value
+
+
+class Found:
+
+    def __init__(self):
+        self.matches: Dict[Tuple[str, int], List[Tag]] = defaultdict(list)
+
+    def first(self, name: str, scope: Optional[Tag] = None) -> Optional[Tag]:
+        tags = self.matches.get((name, id(scope)))
+        return tags[0] if tags else None
+
+    def all(self, name: str, scope: Optional[Tag] = None) -> List[Tag]:
+        return self.matches.get((name, id(scope)), [])
+
+
+class ExtractionPlan:
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules = list(rules)
+        names = {rule.name for rule in self.rules}
+        for rule in self.rules:
+            missing = (set(rule.within) | {rule.unless} - {None}) - names
+            if missing:
+                raise ValueError(f"{rule.name}: noma'lum scope {', '.join(sorted(missing))}")
+
+        self.by_tag: Dict[str, List[Rule]] = defaultdict(list)
+        for rule in self.rules:
+            self.by_tag[rule.tag].append(rule)
+        self.scopes = {name for rule in self.rules for name in rule.within}
+        self.roots = {rule.name for rule in self.rules if not rule.within}
+        self.fallbacks: Dict[str, List[str]] = defaultdict(list)
+        for rule in self.rules:
+            if rule.unless and not rule.within:
+                self.fallbacks[rule.unless].append(rule.name)
+        self.exhaustive = any(rule.many for rule in self.rules if not rule.within)
+
+    def run(self, soup: BeautifulSoup) -> Found:
+        found = Found()
+        matches = found.matches
+        open_scopes: Dict[str, List[Tag]] = defaultdict(list)
+        document = [None]
+        pending = set(self.roots)
+        open_count = 0
+        stack = [(soup, iter(soup.contents), [])]
+
+        while stack:
+            node = next(stack[-1][1], None)
+            if node is None:
+                closed = stack.pop()[2]
+                for name in closed:
+                    open_scopes[name].pop()
+                open_count -= len(closed)
+                if closed and not pending and not open_count and not self.exhaustive:
+                    break
+                continue
+            if not isinstance(node, Tag):
+                continue
+
+            opened = []
+            for rule in self.by_tag.get(node.name, ()):
+                if not rule.within:
+                    parents = document
+                elif len(rule.within) == 1:
+                    parents = open_scopes[rule.within[0]]
+                else:
+                    parents = list({id(tag): tag for name in rule.within for tag in open_scopes[name]}.values())
+                if not rule.many:
+                    parents = [
+                        parent for parent in parents
+                        if (rule.name, id(parent)) not in matches and (rule.unless, id(parent)) not in matches
+                    ]
+                if not parents:
+                    continue
+                if not all(attr_matches(node.get(attr), expected) for attr, expected in rule.attrs.items()):
+                    continue
+
+                for parent in parents:
+                    matches[(rule.name, id(parent))].append(node)
+                if not rule.within:
+                    pending.discard(rule.name)
+                    pending.difference_update(self.fallbacks.get(rule.name, ()))
+                if rule.name in self.scopes:
+                    opened.append(rule.name)
+
+            if node.contents:
+                for name in opened:
+                    open_scopes[name].append(node)
+                open_count += len(opened)
+                stack.append((node, iter(node.contents), opened))
+            if not pending and not open_count and not self.exhaustive:
+                break
+        return found
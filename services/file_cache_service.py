@@ -0,0 +1,128 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from aiogram.types import Message
+
+from config import Config
+from database.db import Database
+
+logger = logging.getLogger(__name__)
+
+VOLATILE_PARAMS = {'_', 't', 'ts', 'cb', 'rnd', 'rand', 'nocache', 'timestamp', 'fbclid', 'gclid', 'yclid'}
+
+
+class FileIdCache:
+
+    def __init__(self, db: Database, memory_size: int = Config.FILE_ID_MEMORY_SIZE):
+        self.db = db
+        self.memory_size = memory_size
+        self._memory: 'OrderedDict[str, str]' = OrderedDict()
+        self._last_evict = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        parts = urlsplit(url.strip())
+        host = (parts.hostname or '').lower()
+        path = re.sub(r';s=\d+x\d+', '', parts.path)
+        query = urlencode(sorted(
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in VOLATILE_PARAMS and not key.lower().startswith('utm_')
+        ))
+        return urlunsplit((parts.scheme.lower() or 'https', host, path, query, ''))
+
+    def _remember_in_memory(self, key: str, file_id: str):
+        self._memory[key] = file_id
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def resolve(self, urls: List[str]) -> List[str]:
+        keys = [self.normalize_url(url) for url in urls]
+        found: Dict[str, str] = {}
+        missing = []
+
+        for key in keys:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            try:
+                stored = await self.db.get_file_ids(missing)
+            except Exception as e:
+                logger.error(f"file_id keshini o'qishda xato: {e}")
+                stored = {}
+            for key, file_id in stored.items():
+                self._remember_in_memory(key, file_id)
+            found.update(stored)
+
+        resolved = [found.get(key, url) for key, url in zip(keys, urls)]
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return resolved
+
+    async def remember(self, urls: List[str], media: List[str], messages: Optional[List[Message]]):
+        if not messages:
+            return
+
+        new_ids: Dict[str, str] = {}
+        for url, used, message in zip(urls, media, messages):
+            if used != url or not message.photo:
+                continue
+            key = self.normalize_url(url)
+            file_id = message.photo[-1].file_id
+            self._remember_in_memory(key, file_id)
+            new_ids[key] = file_id
+
+        if new_ids:
+            try:
+                await self.db.save_file_ids(new_ids)
+            except Exception as e:
+                logger.error(f"file_id keshini saqlashda xato: {e}")
+
+        await self.maybe_evict()
+
+    async def forget(self, urls: List[str]):
+        keys = [self.normalize_url(url) for url in urls]
+        for key in keys:
+            self._memory.pop(key, None)
+        try:
+            await self.db.delete_file_ids(keys)
+        except Exception as e:
+            logger.error(f"file_id keshidan o'chirishda xato: {e}")
+
+    async def maybe_evict(self):
+        if time.monotonic() - self._last_evict < Config.FILE_ID_EVICT_INTERVAL:
+            return
+        self._last_evict = time.monotonic()
+        try:
+            removed = await self.db.evict_file_ids(Config.FILE_ID_MAX_AGE_DAYS, Config.FILE_ID_MAX_ROWS)
+            if removed:
+                logger.info(f"file_id keshidan {removed} ta eski yozuv o'chirildi")
+        except Exception as e:
+            logger.error(f"file_id keshini tozalashda xato: {e}")
+
+    def dump(self) -> List[Tuple[str, str]]:
+        return list(self._memory.items())
+
+    def restore(self, items: List[Tuple[str, str]]):
+        for key, file_id in items:
+            self._remember_in_memory(key, file_id)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._memory),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
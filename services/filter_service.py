@@ -0,0 +1,189 @@
+import json
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+NUMBER_RE = re.compile(r'\d[\d\s.,\u00a0\u202f]*')
+DECIMAL_RE = re.compile(r'[.,]\d{1,2}$')
+
+RANGE_KEYS = ('price', 'year', 'mileage')
+LIST_KEYS = ('include', 'exclude')
+
+RULES_HELP = (
+    "price: 5000-11000 usd\n"
+    "year: 2015-\n"
+    "mileage: -150000\n"
+    "include: cobalt, позиция\n"
+    "exclude: битый, газ\n"
+    "regex: \\b4 позиция\\b"
+)
+
+
+def parse_price(text: Optional[str]) -> Optional[Tuple[float, str]]:
+    if not text:
+        return None
+    number = NUMBER_RE.search(text)
+    if not number:
+        return None
+    digits = re.sub(r'\D', '', DECIMAL_RE.sub('', re.sub(r'\s', '', number.group()).rstrip('.,')))
+    lowered = text.lower()
+    if re.search(r'y\.?e|у\.?е|\$|usd', lowered):
+        currency = 'usd'
+    else:
+        currency = 'uzs'
+    return float(digits), currency
+
+
+def to_usd(amount: float, currency: str) -> float:
+    if currency == 'usd':
+        return amount
+    return amount / Config.USD_RATE
+
+
+def _parse_number(value: str) -> Optional[float]:
+    value = re.sub(r'[\s_]', '', value)
+    return float(value) if value else None
+
+
+def parse_rules_text(text: str) -> Dict:
+    rules: Dict = {}
+    for line in text.strip().splitlines():
+        if ':' not in line:
+            raise ValueError(f"Noto'g'ri qator: {line}")
+        key, value = line.split(':', 1)
+        key = key.strip().lower()
+        value = value.strip()
+
+        if key in RANGE_KEYS:
+            currency = None
+            if key == 'price':
+                currency_match = re.search(r'(usd|uzs|sum|so\'m|сум|y\.?e\.?|\$)\s*$', value, re.I)
+                if currency_match:
+                    currency = 'uzs' if currency_match.group(1).lower() in ('uzs', 'sum', "so'm", 'сум') else 'usd'
+                    value = value[:currency_match.start()].strip()
+            low, separator, high = value.partition('-')
+            rule = {'min': _parse_number(low), 'max': _parse_number(high) if separator else _parse_number(low)}
+            if currency:
+                rule['currency'] = currency
+            rules[key] = rule
+        elif key in LIST_KEYS:
+            rules[key] = [word.strip().lower() for word in value.split(',') if word.strip()]
+        elif key == 'regex':
+            re.compile(value)
+            rules[key] = value
+        else:
+            raise ValueError(f"Noma'lum qoida: {key}")
+    return rules
+
+
+def format_rules(rules: Dict) -> str:
+    if not rules:
+        return "Yo'q"
+    lines = []
+    for key in RANGE_KEYS:
+        if key in rules:
+            rule = rules[key]
+            low = '' if rule.get('min') is None else f"{rule['min']:g}"
+            high = '' if rule.get('max') is None else f"{rule['max']:g}"
+            currency = f" {rule['currency']}" if rule.get('currency') else ''
+            lines.append(f"{key}: {low}-{high}{currency}")
+    for key in LIST_KEYS:
+        if rules.get(key):
+            lines.append(f"{key}: {', '.join(rules[key])}")
+    if rules.get('regex'):
+        lines.append(f"regex: {rules['regex']}")
+    return '\n'.join(lines)
+
+
+class CompiledRules:
+
+    def __init__(self, rules: Dict, filter_text: Optional[str] = None):
+        self.checks = []
+
+        price = rules.get('price')
+        if price:
+            currency = price.get('currency', 'usd')
+            low = to_usd(price['min'], currency) if price.get('min') is not None else None
+            high = to_usd(price['max'], currency) if price.get('max') is not None else None
+            self.checks.append(self._price_check(low, high))
+
+        for key in ('year', 'mileage'):
+            rule = rules.get(key)
+            if rule:
+                self.checks.append(self._range_check(key, rule.get('min'), rule.get('max')))
+
+        include = rules.get('include') or []
+        exclude = rules.get('exclude') or []
+        if filter_text:
+            self.checks.append(lambda card, word=filter_text.lower(): word not in card['_title'])
+
+        if include:
+            self.checks.append(lambda card, words=tuple(include): any(word in card['_text'] for word in words))
+        if exclude:
+            self.checks.append(lambda card, words=tuple(exclude): not any(word in card['_text'] for word in words))
+
+        if rules.get('regex'):
+            pattern = re.compile(rules['regex'], re.I)
+            self.checks.append(lambda card: pattern.search(card['_text']) is not None)
+
+    @staticmethod
+    def _price_check(low: Optional[float], high: Optional[float]):
+        def check(card: Dict) -> bool:
+            parsed = parse_price(card.get('price'))
+            if not parsed:
+                return True
+            amount = to_usd(*parsed)
+            return (low is None or amount >= low) and (high is None or amount <= high)
+        return check
+
+    @staticmethod
+    def _range_check(key: str, low: Optional[float], high: Optional[float]):
+        def check(card: Dict) -> bool:
+            value = card.get(key)
+            if value is None:
+                return True
+            return (low is None or value >= low) and (high is None or value <= high)
+        return check
+
+    def match(self, card: Dict) -> bool:
+        if not self.checks:
+            return True
+        card['_title'] = (card.get('title') or '').lower()
+        card['_text'] = (card.get('text') or card['_title']).lower()
+        try:
+            return all(check(card) for check in self.checks)
+        finally:
+            del card['_text'], card['_title']
+
+
+class FilterEngine:
+
+    def __init__(self):
+        self._compiled: Dict[int, Tuple[Tuple, CompiledRules]] = {}
+
+    def get(self, parser: Dict) -> CompiledRules:
+        key = (parser.get('filter_rules'), parser.get('filter_text'))
+        cached = self._compiled.get(parser['id'])
+        if cached and cached[0] == key:
+            return cached[1]
+
+        try:
+            rules = json.loads(parser['filter_rules']) if parser.get('filter_rules') else {}
+        except ValueError as e:
+            logger.error(f"Parser {parser['id']}: filter qoidalari noto'g'ri: {e}")
+            rules = {}
+        compiled = CompiledRules(rules, parser.get('filter_text'))
+        self._compiled[parser['id']] = (key, compiled)
+        return compiled
+
+    def apply(self, parser: Dict, cards: List[Dict]) -> List[Dict]:
+        rules = self.get(parser)
+        return [card for card in cards if rules.match(card)]
+
+    def forget(self, parser_id: int):
+        self._compiled.pop(parser_id, None)
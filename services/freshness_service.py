@@ -0,0 +1,118 @@
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+
+TASHKENT = timezone(timedelta(hours=5))
+
+MONTHS = {
+    'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4, 'мая': 5, 'июня': 6,
+    'июля': 7, 'августа': 8, 'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12,
+    'yanvar': 1, 'fevral': 2, 'mart': 3, 'aprel': 4, 'may': 5, 'iyun': 6,
+    'iyul': 7, 'avgust': 8, 'sentabr': 9, 'oktabr': 10, 'noyabr': 11, 'dekabr': 12,
+}
+
+PREFIX_RE = re.compile(r'^(опубликовано|обновлено|размещено|e\'lon qilingan)\s*:?\s*', re.I)
+TIME_RE = re.compile(r'(\d{1,2}):(\d{2})')
+DATE_RE = re.compile(r'(\d{1,2})\s+([^\W\d_]+)\.?\s*(\d{4})?')
+NUMERIC_DATE_RE = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})')
+
+
+def parse_posted_time(text: Optional[str], now: Optional[float] = None) -> Optional[Tuple[float, bool]]:
+    if not text:
+        return None
+    text = PREFIX_RE.sub('', re.sub(r'\s+', ' ', text).strip()).lower()
+    current = datetime.fromtimestamp(now or time.time(), TASHKENT)
+
+    time_match = TIME_RE.search(text)
+    hour, minute = (int(time_match.group(1)), int(time_match.group(2))) if time_match else (0, 0)
+    precise = time_match is not None
+
+    if 'сегодня' in text or 'bugun' in text:
+        day = current.date()
+    elif 'вчера' in text or 'kecha' in text:
+        day = current.date() - timedelta(days=1)
+    else:
+        day = None
+        numeric = NUMERIC_DATE_RE.search(text)
+        if numeric:
+            try:
+                day = datetime(int(numeric.group(3)), int(numeric.group(2)), int(numeric.group(1))).date()
+            except ValueError:
+                return None
+        else:
+            for match in DATE_RE.finditer(text):
+                month = MONTHS.get(match.group(2))
+                if not month:
+                    continue
+                year = int(match.group(3)) if match.group(3) else current.year
+                try:
+                    day = datetime(year, month, int(match.group(1))).date()
+                except ValueError:
+                    return None
+                if not match.group(3) and day > current.date():
+                    day = day.replace(year=year - 1)
+                break
+        if day is None:
+            if not precise:
+                return None
+            day = current.date()
+
+    if hour > 23 or minute > 59:
+        return None
+    posted = datetime(day.year, day.month, day.day, hour, minute, tzinfo=TASHKENT)
+    return min(posted.timestamp(), current.timestamp()), precise
+
+
+class FreshnessTracker:
+
+    @staticmethod
+    def posted_at(job: Dict) -> Optional[Tuple[float, bool]]:
+        details = job.get('details') or {}
+        card = job.get('card') or {}
+        return parse_posted_time(details.get('posted_time')) or parse_posted_time(card.get('posted_time'))
+
+    @staticmethod
+    def record(job: Dict, delivered_at: float) -> Optional[float]:
+        parser = job['parser']
+        first_seen = job.get('first_seen_at')
+        if first_seen:
+            metrics.observe(f"delivery_lag.site.{parser['site_type']}", delivered_at - first_seen)
+
+        posted = job.get('posted_at')
+        if posted is None:
+            metrics.inc(f"freshness.site.{parser['site_type']}.unknown")
+            return None
+
+        freshness = max(0.0, delivered_at - posted)
+        prefix = 'freshness' if job.get('posted_precise') else 'freshness.coarse'
+        metrics.observe(f"{prefix}.site.{parser['site_type']}", freshness)
+        metrics.observe(f"{prefix}.parser.{parser['id']}", freshness)
+        if first_seen and job.get('posted_precise'):
+            metrics.observe(f"detection_lag.site.{parser['site_type']}", max(0.0, first_seen - posted))
+        return freshness
+
+    @staticmethod
+    def percentiles(values: List[float], points: Tuple[int, ...] = (50, 90, 99)) -> Dict:
+        if not values:
+            return {'count': 0}
+        ordered = sorted(values)
+        result = {'count': len(ordered)}
+        for point in points:
+            index = min(len(ordered) - 1, max(0, int(round(point / 100 * (len(ordered) - 1)))))
+            result[f"p{point}"] = ordered[index]
+        return result
+
+    @staticmethod
+    def summary() -> Dict[str, Dict]:
+        return {
+            name[len('freshness.'):]: FreshnessTracker.percentiles(list(values))
+            for name, values in sorted(metrics.samples.items())
+            if name.startswith(('freshness.site.', 'freshness.parser.'))
+        }
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from config import Config
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HostHealth:
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.open_timeout = Config.BREAKER_OPEN_SECONDS
+        self.probe_in_flight = False
+        self.outcomes = deque(maxlen=Config.BREAKER_WINDOW)
+
+        self.limit = float(Config.AIMD_START_CONCURRENCY)
+        self.spacing = Config.AIMD_MIN_SPACING
+        self.latency = 0.0
+        self.in_flight = 0
+        self.next_start = 0.0
+        self._cond = asyncio.Condition()
+        self._publish()
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.open_timeout:
+                return False
+            self._transition(self.HALF_OPEN)
+
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < max(1, int(self.limit)))
+            self.in_flight += 1
+            now = time.monotonic()
+            start_at = max(now, self.next_start)
+            self.next_start = start_at + self.spacing
+        if start_at > now:
+            try:
+                await asyncio.sleep(start_at - now)
+            except asyncio.CancelledError:
+                await self.release()
+                raise
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def cancel_probe(self):
+        self.probe_in_flight = False
+
+    def record(self, status: Optional[int], elapsed: float):
+        self.probe_in_flight = False
+        self.latency = elapsed if not self.latency else 0.8 * self.latency + 0.2 * elapsed
+
+        throttled = status in (403, 429)
+        failed = status is None or throttled or status >= 500
+        self.outcomes.append(failed)
+
+        if failed:
+            self.consecutive_failures += 1
+            self._decrease(2.0 if throttled else 1.5)
+        else:
+            self.consecutive_failures = 0
+            if elapsed > Config.AIMD_LATENCY_TARGET:
+                self._decrease(1.2)
+            else:
+                self._increase()
+
+        if self.state == self.HALF_OPEN:
+            if failed:
+                self.open_timeout = min(self.open_timeout * 2, Config.BREAKER_MAX_OPEN_SECONDS)
+                self._open(f"probe muvaffaqiyatsiz (status={status})")
+            else:
+                self.open_timeout = Config.BREAKER_OPEN_SECONDS
+                self.outcomes.clear()
+                self._transition(self.CLOSED)
+        elif self.state == self.CLOSED and failed:
+            if self.consecutive_failures >= Config.BREAKER_FAILURE_THRESHOLD:
+                self._open(f"ketma-ket {self.consecutive_failures} ta xato")
+            elif len(self.outcomes) >= Config.BREAKER_WINDOW and self.error_rate() >= Config.BREAKER_ERROR_RATE:
+                self._open(f"xato darajasi {self.error_rate():.0%}")
+
+        self._publish()
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+    def _increase(self):
+        self.limit = min(float(Config.AIMD_MAX_CONCURRENCY), self.limit + 1 / max(self.limit, 1.0))
+        rate = 1 / self.spacing + Config.AIMD_RATE_STEP
+        self.spacing = max(Config.AIMD_MIN_SPACING, 1 / rate)
+
+    def _decrease(self, factor: float):
+        self.limit = max(float(Config.AIMD_MIN_CONCURRENCY), self.limit / factor)
+        self.spacing = min(Config.AIMD_MAX_SPACING, self.spacing * factor)
+
+    def _open(self, reason: str):
+        self.opened_at = time.monotonic()
+        self._transition(self.OPEN, reason)
+        metrics.inc(f"host.{self.host}.breaker_opened")
+
+    def _transition(self, state: str, reason: str = ''):
+        if state == self.state:
+            return
+        logger.warning(
+            f"Host {self.host}: circuit {self.state} -> {state}"
+            + (f" ({reason}, {self.open_timeout:.0f}s)" if reason else '')
+        )
+        self.state = state
+        self._publish()
+
+    def _publish(self):
+        metrics.set(f"host.{self.host}.state", self.STATE_CODES[self.state])
+        metrics.set(f"host.{self.host}.concurrency", self.limit)
+        metrics.set(f"host.{self.host}.spacing", self.spacing)
+        metrics.set(f"host.{self.host}.error_rate", self.error_rate())
+
+    def dump(self) -> Dict:
+        open_remaining = 0.0
+        if self.state == self.OPEN:
+            open_remaining = max(0.0, self.open_timeout - (time.monotonic() - self.opened_at))
+        return {
+            'state': self.state,
+            'open_remaining': open_remaining,
+            'open_timeout': self.open_timeout,
+            'consecutive_failures': self.consecutive_failures,
+            'outcomes': list(self.outcomes),
+            'limit': self.limit,
+            'spacing': self.spacing,
+            'latency': self.latency
+        }
+
+    def restore(self, data: Dict):
+        self.open_timeout = data['open_timeout']
+        self.consecutive_failures = data['consecutive_failures']
+        self.outcomes.extend(data['outcomes'])
+        self.limit = data['limit']
+        self.spacing = data['spacing']
+        self.latency = data['latency']
+        if data['state'] == self.OPEN and data['open_remaining'] > 0:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic() - (self.open_timeout - data['open_remaining'])
+        elif data['state'] != self.CLOSED:
+            self.state = self.HALF_OPEN
+        self._publish()
+
+    def stats(self) -> Dict:
+        return {
+            'host': self.host,
+            'state': self.state,
+            'concurrency': round(self.limit, 2),
+            'spacing': round(self.spacing, 2),
+            'latency': round(self.latency, 3),
+            'error_rate': round(self.error_rate(), 3),
+            'in_flight': self.in_flight
+        }
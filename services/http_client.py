@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from services.egress_pool import EgressPool
+from services.host_health import HostHealth
+from services.logging_service import get_event_logger
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+events = get_event_logger(__name__)
+
+
+class HttpClient:
+
+    def __init__(self, timeout: int = 30, egress_pool: Optional[EgressPool] = None):
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.hosts: Dict[str, HostHealth] = {}
+        self.egress = egress_pool or EgressPool.from_config()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self._session
+
+    def get_host(self, host: str) -> HostHealth:
+        if host not in self.hosts:
+            self.hosts[host] = HostHealth(host)
+        return self.hosts[host]
+
+    def host_stats(self) -> List[Dict]:
+        return [health.stats() for health in self.hosts.values()]
+
+    def dump(self) -> Dict:
+        return {
+            'hosts': {host: health.dump() for host, health in self.hosts.items()},
+            'egress': self.egress.dump()
+        }
+
+    def restore(self, data: Dict):
+        for host, item in data.get('hosts', {}).items():
+            self.get_host(host).restore(item)
+        self.egress.restore(data.get('egress', []))
+
+    async def fetch(self, url: str, headers: Optional[Dict] = None) -> Optional[Dict]:
+        return await self._request(url, headers)
+
+    async def probe(self, url: str) -> Optional[Dict]:
+        response = await self._request(url, method='HEAD', read_body=False)
+        if response and response['status'] in (403, 405, 501):
+            response = await self._request(url, {'Range': 'bytes=0-0'}, read_body=False)
+        return response
+
+    async def _request(self, url: str, headers: Optional[Dict] = None, method: str = 'GET',
+                       read_body: bool = True) -> Optional[Dict]:
+        host = urlsplit(url).hostname or ''
+        health = self.get_host(host)
+        if not health.allow_request():
+            metrics.inc(f"http.{host}.rejected")
+            events.debug('http.rejected', "Host {host}: circuit ochiq, so'rov o'tkazib yuborildi: {url}", host=host, url=url)
+            return None
+
+        acquired = False
+        egress = None
+        started = time.monotonic()
+        status = None
+        try:
+            await health.acquire()
+            acquired = True
+            egress = self.egress.pick()
+            session = self.get_session()
+            started = time.monotonic()
+            request_headers = dict(egress.headers, **headers) if headers else egress.headers
+            async with session.request(method, url, headers=request_headers, proxy=egress.proxy) as response:
+                status = response.status
+                text = await response.text() if read_body else ''
+                return {
+                    'url': url,
+                    'status': response.status,
+                    'headers': dict(response.headers),
+                    'text': text,
+                    'elapsed': time.monotonic() - started
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = None
+            events.warning('http.error', "So'rov xatosi {url} ({egress}): {error}", url=url, egress=egress.name, error=repr(e))
+            return None
+        finally:
+            elapsed = time.monotonic() - started
+            if egress is None:
+                health.cancel_probe()
+            else:
+                health.record(status, elapsed)
+                self.egress.record(egress, status, elapsed)
+            if acquired:
+                await health.release()
+            if egress is not None:
+                metrics.inc(f"http.{host}.requests")
+                metrics.inc(f"http.{host}.status.{status or 'error'}")
+                if status is None or status >= 400:
+                    metrics.inc(f"http.{host}.errors")
+                metrics.observe(f"http.{host}.latency", elapsed)
+
+    async def get_text(self, url: str) -> Optional[str]:
+        response = await self.fetch(url)
+        if not response or response['status'] != 200:
+            return None
+        return response['text']
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
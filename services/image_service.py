@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from services.http_client import HttpClient
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def image_size(response: Dict) -> Optional[int]:
+    headers = {key.lower(): value for key, value in response['headers'].items()}
+    content_range = headers.get('content-range', '')
+    if '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else None
+    length = headers.get('content-length', '')
+    return int(length) if response['status'] == 200 and length.isdigit() else None
+
+
+def image_verdict(response: Optional[Dict]) -> Optional[bool]:
+    if response is None:
+        return None
+    status = response['status']
+    if status in (403, 429) or status >= 500:
+        return None
+    if status not in (200, 206):
+        return False
+
+    content_type = next(
+        (value for key, value in response['headers'].items() if key.lower() == 'content-type'), ''
+    )
+    if content_type and not content_type.startswith('image/'):
+        return False
+    size = image_size(response)
+    if size is not None and size > Config.IMAGE_MAX_BYTES:
+        return False
+    return True
+
+
+class ImagePreflight:
+
+    def __init__(self, http: HttpClient, concurrency: int = Config.IMAGE_PREFLIGHT_CONCURRENCY,
+                 ttl: float = Config.IMAGE_PREFLIGHT_TTL, cache_size: int = Config.IMAGE_PREFLIGHT_CACHE_SIZE):
+        self.http = http
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    async def filter(self, urls: List[str], known: Optional[List[str]] = None) -> Tuple[List[str], List[str]]:
+        urls = list(dict.fromkeys(urls))
+        skip = set(known or ())
+        verdicts = dict(zip(
+            [url for url in urls if url not in skip],
+            await asyncio.gather(*(self.check(url) for url in urls if url not in skip))
+        ))
+        kept = [url for url in urls if url in skip or verdicts[url] is not False]
+        verified = [url for url in urls if url in skip or verdicts[url] is True]
+
+        if len(kept) < len(urls):
+            metrics.inc('image.preflight.dropped', len(urls) - len(kept))
+            logger.info(f"Rasm tekshiruvi: {len(urls) - len(kept)} ta yaroqsiz rasm olib tashlandi")
+        return kept, verified
+
+    async def check(self, url: str) -> Optional[bool]:
+        cached = self._cache.get(url)
+        if cached and cached[1] > time.monotonic():
+            self._cache.move_to_end(url)
+            metrics.inc('image.preflight.cache_hit')
+            return cached[0]
+
+        pending = self._pending.get(url)
+        if pending:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[url] = future
+        try:
+            async with self._semaphore:
+                response = await self.http.probe(url)
+            verdict = image_verdict(response)
+            metrics.inc('image.preflight.checked')
+            if verdict is not None:
+                self._remember(url, verdict)
+            future.set_result(verdict)
+            return verdict
+        except Exception as e:
+            logger.warning(f"Rasmni tekshirishda xato {url}: {e}")
+            return None
+        finally:
+            if not future.done():
+                future.set_result(None)
+            del self._pending[url]
+
+    def _remember(self, url: str, verdict: bool):
+        self._cache[url] = (verdict, time.monotonic() + self.ttl)
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> Dict:
+        valid = sum(1 for verdict, _ in self._cache.values() if verdict)
+        return {'cached': len(self._cache), 'valid': valid, 'invalid': len(self._cache) - valid}
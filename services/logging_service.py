@@ -0,0 +1,133 @@
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+from services.metrics_service import metrics
+
+
+class EventMessage:
+
+    __slots__ = ('event', 'template', 'fields')
+
+    def __init__(self, event: str, template: str, fields: Dict[str, Any]):
+        self.event = event
+        self.template = template
+        self.fields = fields
+
+    def __str__(self) -> str:
+        try:
+            return self.template.format(**self.fields) if self.template else self.event
+        except (KeyError, IndexError, ValueError):
+            return self.template
+
+
+class EventSampler:
+
+    def __init__(self, rates: Dict[str, float], caps: Dict[str, int]):
+        self.rates = rates
+        self.caps = caps
+        self._windows: Dict[str, Tuple[float, int]] = {}
+        self.suppressed: Dict[str, int] = {}
+
+    def allow(self, event: str) -> bool:
+        rate = self.rates.get(event, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self.suppressed[event] = self.suppressed.get(event, 0) + 1
+            return False
+
+        cap = self.caps.get(event)
+        if cap is None:
+            return True
+        now = time.monotonic()
+        started, count = self._windows.get(event, (now, 0))
+        if now - started >= 60:
+            started, count = now, 0
+        if count >= cap:
+            self.suppressed[event] = self.suppressed.get(event, 0) + 1
+            self._windows[event] = (started, count)
+            return False
+        self._windows[event] = (started, count + 1)
+        return True
+
+
+sampler = EventSampler(Config.LOG_SAMPLE_RATES, Config.LOG_RATE_CAPS)
+
+
+class EventLogger:
+
+    def __init__(self, name: str):
+        self.logger = logging.getLogger(name)
+
+    def log(self, level: int, event: str, template: str = '', **fields):
+        if not self.logger.isEnabledFor(level) or not sampler.allow(event):
+            return
+        self.logger.log(level, EventMessage(event, template, fields), extra={'event': event, 'fields': fields},
+                        stacklevel=3)
+
+    def debug(self, event: str, template: str = '', **fields):
+        self.log(logging.DEBUG, event, template, **fields)
+
+    def info(self, event: str, template: str = '', **fields):
+        self.log(logging.INFO, event, template, **fields)
+
+    def warning(self, event: str, template: str = '', **fields):
+        self.log(logging.WARNING, event, template, **fields)
+
+    def error(self, event: str, template: str = '', **fields):
+        self.log(logging.ERROR, event, template, **fields)
+
+
+def get_event_logger(name: str) -> EventLogger:
+    return EventLogger(name)
+
+
+class StructuredFormatter(logging.Formatter):
+
+    def __init__(self, json_output: bool = False):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not self.json_output:
+            return super().format(record)
+
+        payload = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'message': record.getMessage()
+        }
+        payload.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: Optional[str] = None) -> QueueListener:
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(StructuredFormatter(json_output=Config.LOG_FORMAT == 'json'))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level or Config.LOG_LEVEL)
+
+    listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    listener.start()
+    metrics.register('log_suppressed', lambda: dict(sampler.suppressed))
+    return listener
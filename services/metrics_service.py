@@ -0,0 +1,72 @@
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class Metrics:
+
+    def __init__(self, sample_size: int = 1000):
+        self.sample_size = sample_size
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.gauges: Dict[str, float] = {}
+        self.samples: Dict[str, Deque[float]] = {}
+        self.totals: Dict[str, list] = {}
+        self._providers: Dict[str, Callable[[], Any]] = {}
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1):
+        self.counters[name] += value
+
+    def set(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.sample_size)
+            self.totals[name] = [0, 0.0, 0.0]
+        self.samples[name].append(value)
+        total = self.totals[name]
+        total[0] += 1
+        total[1] += value
+        total[2] = max(total[2], value)
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        values = self.samples.get(name)
+        if not values:
+            return None
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def timing(self, name: str) -> Optional[Dict]:
+        if name not in self.totals:
+            return None
+        count, total, maximum = self.totals[name]
+        return {
+            'count': count,
+            'avg': total / count if count else 0.0,
+            'max': maximum,
+            'p50': self.percentile(name, 50),
+            'p95': self.percentile(name, 95)
+        }
+
+    def register(self, name: str, provider: Callable[[], Any]):
+        self._providers[name] = provider
+
+    def snapshot(self) -> Dict:
+        provided = {}
+        for name, provider in self._providers.items():
+            try:
+                provided[name] = provider()
+            except Exception as e:
+                provided[name] = {'error': str(e)}
+        return {
+            'uptime': time.time() - self.started_at,
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'timings': {name: self.timing(name) for name in self.totals},
+            'providers': provided
+        }
+
+
+metrics = Metrics()
@@ -0,0 +1,117 @@
+import html
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+from config import Config
+from keyboards.inline_keyboards import InlineKeyboards
+from services.metrics_service import metrics
+from services.parser_registry import registry
+
+FILTER_COLUMNS = {'site': 'site_type', 'ch': 'channel_id', 'adm': 'admin_id'}
+FILTER_LABELS = {'site': 'sayt', 'ch': 'kanal', 'adm': 'admin'}
+
+
+def parse_filter_key(filter_key: str) -> Dict:
+    if not filter_key or ':' not in filter_key:
+        return {}
+    name, value = filter_key.split(':', 1)
+    column = FILTER_COLUMNS.get(name)
+    if not column or not value:
+        return {}
+    if column == 'admin_id':
+        return {column: int(value)} if value.lstrip('-').isdigit() else {}
+    return {column: value}
+
+
+def parse_page_callback(data: str) -> Tuple[str, int, bool]:
+    _, direction, cursor, filter_key = data.split(':', 3)
+    return filter_key, int(cursor), direction == 'p'
+
+
+def current_page(markup: Optional[InlineKeyboardMarkup]) -> Tuple[str, int, bool]:
+    for row in (markup.inline_keyboard if markup else []):
+        for button in row:
+            if button.text == "🔄" and (button.callback_data or '').startswith('plist:'):
+                return parse_page_callback(button.callback_data)
+    return '', 0, False
+
+
+class ParserPages:
+
+    def __init__(self, db, page_size: int = Config.ADMIN_PAGE_SIZE, max_entries: int = Config.ADMIN_PAGE_CACHE_SIZE):
+        self.db = db
+        self.page_size = page_size
+        self.max_entries = max_entries
+        self._cache: OrderedDict = OrderedDict()
+        self._version = registry.version
+
+    async def render(self, filter_key: str = '', cursor: int = 0,
+                     before: bool = False) -> Tuple[str, InlineKeyboardMarkup]:
+        if self._version != registry.version:
+            self._cache.clear()
+            self._version = registry.version
+
+        key = (filter_key, cursor, before)
+        page = self._cache.get(key)
+        if page:
+            self._cache.move_to_end(key)
+            metrics.inc('admin.page_cache.hit')
+            return page
+
+        metrics.inc('admin.page_cache.miss')
+        version = registry.version
+        page = await self._build(filter_key, cursor, before)
+        if version == registry.version:
+            self._cache[key] = page
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return page
+
+    async def _build(self, filter_key: str, cursor: int, before: bool) -> Tuple[str, InlineKeyboardMarkup]:
+        filters = parse_filter_key(filter_key)
+        parsers, has_more = await self.db.get_parsers_page(filters, cursor, self.page_size, before)
+        if before and not has_more and len(parsers) < self.page_size:
+            before = False
+            parsers, has_more = await self.db.get_parsers_page(filters, 0, self.page_size)
+
+        prev_cursor = next_cursor = None
+        if parsers:
+            first, last = parsers[0]['id'], parsers[-1]['id']
+            if before:
+                has_prev, has_next = has_more, await self._exists(filters, last, before=False)
+            else:
+                has_prev, has_next = await self._exists(filters, first, before=True), has_more
+            prev_cursor = first if has_prev else None
+            next_cursor = last if has_next else None
+
+        text = self.text(parsers, await self.db.count_parsers(filters), filter_key)
+        markup = InlineKeyboards.parsers_list(parsers, filter_key, prev_cursor, next_cursor)
+        return text, markup
+
+    async def _exists(self, filters: Dict, cursor: int, before: bool) -> bool:
+        rows, _ = await self.db.get_parsers_page(filters, cursor, 1, before)
+        return bool(rows)
+
+    @staticmethod
+    def text(parsers: list, total: int, filter_key: str = '') -> str:
+        title = "📋 <b>Barcha parserlar</b>"
+        if parse_filter_key(filter_key):
+            name, value = filter_key.split(':', 1)
+            title += f" – {FILTER_LABELS[name]}: <code>{html.escape(value)}</code>"
+        elif not parsers:
+            return "❌ Hozircha parser yo'q.\n\nYangi parser qo'shish uchun admin paneldan foydalaning."
+        if not parsers:
+            return f"{title}\n\n❌ Parser topilmadi."
+
+        text = f"{title} ({total} ta, {parsers[0]['id']}–{parsers[-1]['id']}):\n\n"
+        for p in parsers:
+            site = 'OLX' if p['site_type'] == 'olx' else 'Avtoelon'
+            filter_info = f" | Filter: {html.escape(p['filter_text'])}" if p['filter_text'] else ''
+            lite_info = " | ⚡ Lite" if p.get('lite_mode') else ''
+            admin_who_added = f" | Qo'shgan: {p['admin_id']}"
+            channel_id = f" | Kanal: {html.escape(str(p['channel_id']))}"
+            text += f"🆔 {p['id']}: {html.escape(p['url'][:30])}... ({site}){filter_info}{lite_info}{admin_who_added}\n{channel_id}\n"
+        text += "\nParser tanlang yoki o'chirish uchun ❌ bosing:\n⚙️ - filtrlar, ⚡ - lite rejim"
+        return text
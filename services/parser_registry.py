@@ -0,0 +1,58 @@
+import logging
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ParserRegistry:
+
+    def __init__(self):
+        self._parsers: Dict[int, Dict] = {}
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        self.loaded = False
+        self.version = 0
+
+    async def load(self, db):
+        parsers = await db.get_all_active_parsers()
+        self._parsers = {parser['id']: parser for parser in parsers}
+        self.loaded = True
+        self.version += 1
+        logger.info(f"Parser registry yuklandi: {len(self._parsers)} ta faol parser")
+
+    def all(self) -> List[Dict]:
+        return [self._parsers[parser_id] for parser_id in sorted(self._parsers)]
+
+    def get(self, parser_id: int) -> Optional[Dict]:
+        return self._parsers.get(parser_id)
+
+    def is_active(self, parser_id: int) -> bool:
+        return parser_id in self._parsers
+
+    def subscribe(self, listener: Callable[[str, Dict], None]):
+        self._listeners.append(listener)
+
+    def add(self, parser: Dict):
+        self._parsers[parser['id']] = parser
+        self._notify('added', parser)
+
+    def update(self, parser: Dict):
+        if parser['id'] not in self._parsers:
+            return
+        self._parsers[parser['id']] = parser
+        self._notify('updated', parser)
+
+    def remove(self, parser_id: int):
+        parser = self._parsers.pop(parser_id, None)
+        if parser:
+            self._notify('removed', parser)
+
+    def _notify(self, event: str, parser: Dict):
+        self.version += 1
+        for listener in self._listeners:
+            try:
+                listener(event, parser)
+            except Exception as e:
+                logger.error(f"Registry listener xatosi ({event}): {e}")
+
+
+registry = ParserRegistry()
@@ -1,564 +1,583 @@
-from asyncio.log import logger
+import html
 from typing import Dict, List, Optional
 from urllib.parse import urljoin
 import re
 
-import aiohttp
 from bs4 import BeautifulSoup
 
+from services.cassette_service import create_http_client
+from services.extraction_service import ExtractionPlan, Rule, contains
+from services.logging_service import get_event_logger
+from services.template_service import renderer
+
+events = get_event_logger(__name__)
+
+
+YEAR_RE = re.compile(r'\b(19[5-9]\d|20[0-4]\d)\b')
+MILEAGE_RE = re.compile(r'(\d[\d\s]*)\s*км')
+OLX_ID_RE = re.compile(r'-ID([0-9A-Za-z]+)\.html')
+AVTOELON_ID_RE = re.compile(r'/a/show/(\d+)')
+BASE62 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+OLX_IMAGE_SIZE_RE = re.compile(r's=\d+x\d+')
+OLX_PHONE_RE = re.compile(r'\+?\d{1,3}[\s-]?\(?\d{2,3}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}')
+AVTOELON_PHONE_RE = re.compile(r'\+?998\s*\d{2}\s*\d{3}\s*\d{2}\s*\d{2}')
+
+
+def olx_image(value: Optional[str]) -> bool:
+    return value is not None and 'apollo.olxcdn.com' in value and 'static' not in value
+
+
+OLX_DETAIL_PLAN = ExtractionPlan([
+    Rule('aside', 'div', {'data-testid': 'aside', 'class': 'css-6u8zs6'}),
+    Rule('title', 'h4', {'class': 'css-1au435n'}, ('aside',)),
+    Rule('offer_title', 'div', {'data-cy': 'offer_title'}, ('aside',)),
+    Rule('offer_title_h4', 'h4', {}, ('offer_title',)),
+    Rule('prices_wrapper', 'div', {'data-testid': 'prices-wrapper'}, ('aside',)),
+    Rule('price_container', 'div', {'data-testid': 'ad-price-container'}, ('prices_wrapper',)),
+    Rule('price', 'h3', {}, ('price_container',)),
+    Rule('price_yauxmy', 'h3', {'class': 'css-yauxmy'}, ('aside',)),
+    Rule('price_90xrc0', 'h3', {'class': 'css-90xrc0'}, ('aside',)),
+    Rule('seller_card', 'div', {'data-cy': 'seller_card', 'data-testid': 'seller_card'}, ('aside',)),
+    Rule('seller_name', 'h4', {'data-testid': 'user-profile-user-name'}, ('seller_card',)),
+    Rule('map', 'div', {'data-testid': 'map-aside-section'}, ('aside',)),
+    Rule('map_location', 'p', {'class': 'css-9pna1a'}, ('map',)),
+    Rule('map_region', 'p', {'class': 'css-3cz5o2'}, ('map',)),
+    Rule('map_img', 'img', {'alt': True}, ('map',)),
+    Rule('map_texts', 'p', {}, ('map',), many=True),
+    Rule('posted_wrapper', 'div', {'class': 'css-12kclhg'}, ('aside',)),
+    Rule('posted_outer', 'span', {'class': 'css-1br3d2a'}, ('posted_wrapper',)),
+    Rule('posted_inner', 'span', {'data-cy': 'ad-posted-at', 'data-testid': 'ad-posted-at'}, ('posted_outer',)),
+    Rule('posted_wrapped', 'span', {'data-cy': 'ad-posted-at'}, ('posted_wrapper',)),
+    Rule('posted', 'span', {'data-cy': 'ad-posted-at', 'data-testid': 'ad-posted-at'}),
+    Rule('page_title_h1', 'h1', {'class': 'css-1kc83jo'}),
+    Rule('page_title_h4', 'h4', {'class': 'css-1kc83jo'}),
+    Rule('page_price', 'h3', {'class': 'css-90xrc0'}),
+    Rule('gallery', 'div', {'class': 'css-1uilkl7'}),
+    Rule('gallery_images', 'img', {'src': True}, ('gallery',), many=True),
+    Rule('images', 'img', {'src': olx_image}, many=True),
+    Rule('lazy_images', 'img', {'data-src': contains('apollo.olxcdn.com')}, many=True),
+    Rule('params', 'div', {'data-testid': 'ad-parameters-container'}),
+    Rule('param_rows', 'p', {'class': 'css-13x8d99'}, ('params',), many=True),
+    Rule('phone_link', 'a', {'href': contains('tel:')}),
+    Rule('phone_button', 'button', {'data-testid': 'ad-contact-phone'}),
+    Rule('description', 'div', {'data-cy': 'ad_description'}),
+    Rule('description_text', 'div', {'class': 'css-19duwlz'}, ('description',)),
+])
+
+PRODUCT = ('product', 'product_item')
+AVTOELON_DETAIL_PLAN = ExtractionPlan([
+    Rule('product', 'div', {'itemscope': '', 'itemtype': 'http://schema.org/Product'}),
+    Rule('product_item', 'div', {'class': 'item product'}, unless='product'),
+    Rule('title', 'h1', {'class': 'a-title__text'}, PRODUCT),
+    Rule('any_title', 'h1', {}, PRODUCT),
+    Rule('price', 'span', {'class': 'a-price__text'}, PRODUCT),
+    Rule('price_block', 'div', {'class': 'a-price'}, PRODUCT),
+    Rule('f_line', 'div', {'class': 'f-line'}),
+    Rule('posted', 'div', {'class': 'col-sm-4'}, ('f_line',)),
+    Rule('dl', 'dl', {'class': 'description-params'}, PRODUCT),
+    Rule('dl_full', 'dl', {'class': 'clearfix dl-horizontal description-params'}, PRODUCT),
+    Rule('dt', 'dt', {}, ('dl', 'dl_full'), many=True),
+    Rule('dd', 'dd', {}, ('dl', 'dl_full'), many=True),
+    Rule('params_list', 'ul', {'class': 'params-block__list'}, PRODUCT),
+    Rule('params_item', 'li', {'class': 'params-block__list-item'}, ('params_list',), many=True),
+    Rule('params_heading', 'h4', {'class': 'item__heading'}, ('params_item',)),
+    Rule('params_value', 'span', {}, ('params_item',)),
+    Rule('description', 'div', {'class': 'description-text'}, PRODUCT),
+    Rule('main_photo', 'div', {'class': 'main-photo'}, PRODUCT),
+    Rule('main_link', 'a', {}, ('main_photo',)),
+    Rule('main_img', 'img', {}, ('main_photo',)),
+    Rule('thumbs', 'a', {'class': 'small-thumb'}, PRODUCT, many=True),
+])
 
 
 class ParserService:
     
+    http = create_http_client()
+    
     @staticmethod
-    async def get_listings(url: str, site_type: str = 'olx', filter_text: Optional[str] = None) -> List[str]:
+    async def get_listings(url: str, site_type: str = 'olx') -> List[Dict]:
+        html = await ParserService.http.get_text(url)
+        if not html:
+            return []
+        return ParserService.parse_listing_cards(html, site_type)
+    
+    @staticmethod
+    def parse_listing_cards(html: str, site_type: str = 'olx') -> List[Dict]:
         if site_type == 'olx':
-            return await ParserService._get_olx_listings(url)
+            return ParserService._with_soup(html, ParserService._parse_olx_listings) or []
         elif site_type == 'avtoelon':
-            return await ParserService._get_avtoelon_listings(url, filter_text)
+            return ParserService._with_soup(html, ParserService._parse_avtoelon_listings) or []
         return []
     
     @staticmethod
-    async def _get_olx_listings(url: str) -> List[str]:
+    def _with_soup(html: str, parse, *args):
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8'
-                }
-                async with session.get(url, headers=headers, timeout=30) as response:
-                    if response.status != 200:
-                        return []
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    hrefs = []
-                    
-                    listing_grid = soup.find('div', {'data-testid': 'listing-grid'})
-                    
-                    if not listing_grid:
-                        return []
-                    
-                    promoted_div = soup.find('div', id='div-gpt-liting-after-promoted')
+            soup = BeautifulSoup(html, 'html.parser')
+        except Exception as e:
+            return None
+        try:
+            return parse(soup, *args)
+        finally:
+            for tag in soup.find_all(recursive=False):
+                tag.decompose()
+            soup.decompose()
+    
+    @staticmethod
+    def ad_id(href: str, site_type: str = 'olx') -> Optional[int]:
+        if site_type == 'avtoelon':
+            match = AVTOELON_ID_RE.search(href)
+            return int(match.group(1)) if match else None
+        
+        match = OLX_ID_RE.search(href)
+        if not match:
+            return None
+        value = 0
+        for char in match.group(1):
+            value = value * 62 + BASE62.index(char)
+        return value
+    
+    @staticmethod
+    def _card_numbers(card: Dict, text: str):
+        year_match = YEAR_RE.search(text)
+        if year_match:
+            card['year'] = int(year_match.group(1))
+        mileage_match = MILEAGE_RE.search(text)
+        if mileage_match:
+            card['mileage'] = int(re.sub(r'\D', '', mileage_match.group(1)))
+    
+    @staticmethod
+    def _parse_olx_listings(soup: BeautifulSoup) -> List[Dict]:
+        try:
+            cards = []
+            hrefs = set()
+            
+            listing_grid = soup.find('div', {'data-testid': 'listing-grid'})
+            
+            if not listing_grid:
+                return []
+            
+            promoted_div = soup.find('div', id='div-gpt-liting-after-promoted')
+            
+            if promoted_div:
+                all_cards = [
+                    card for card in promoted_div.find_all_next('div', {'data-cy': 'l-card', 'data-testid': 'l-card'})
+                    if listing_grid in card.parents
+                ]
+            else:
+                all_cards = listing_grid.find_all('div', {'data-cy': 'l-card', 'data-testid': 'l-card'})
+            
+            for card in all_cards:
+                promoted_indicator = card.find(string=re.compile(r'ТОП|TOP', re.I))
+                if promoted_indicator:
+                    continue
+                
+                try:
+                    a_tag = card.find('a', href=True)
+                    if not a_tag:
+                        continue
+                    href = a_tag['href']
+                    if not (href.startswith('/d/obyavlenie/') or '/ID' in href) or href in hrefs:
+                        continue
+                    hrefs.add(href)
                     
-                    if promoted_div:
-                        next_elements = promoted_div.find_all_next('div', {'data-cy': 'l-card', 'data-testid': 'l-card'})
-                        
-                        for card in next_elements:
-                            if listing_grid in card.parents:
-                                promoted_indicator = card.find(string=re.compile(r'ТОП|TOP', re.I))
-                                if promoted_indicator:
-                                    continue
-                                
-                                try:
-                                    a_tag = card.find('a', href=True)
-                                    if a_tag:
-                                        href = a_tag['href']
-                                        if href.startswith('/d/obyavlenie/') or '/ID' in href:
-                                            if href not in hrefs:
-                                                hrefs.append(href)
-                                except Exception as e:
-                                    continue
-                        
-                    else:
-                        all_cards = listing_grid.find_all('div', {'data-cy': 'l-card', 'data-testid': 'l-card'})
-                        
-                        for card in all_cards:
-                            promoted_indicator = card.find(string=re.compile(r'ТОП|TOP', re.I))
-                            if promoted_indicator:
-                                continue
-                            
-                            try:
-                                a_tag = card.find('a', href=True)
-                                if a_tag:
-                                    href = a_tag['href']
-                                    if href.startswith('/d/obyavlenie/') or '/ID' in href:
-                                        if href not in hrefs:
-                                            hrefs.append(href)
-                            except Exception as e:
-                                continue
+                    record = {'href': href}
+                    ad_id = ParserService.ad_id(href, 'olx')
+                    if ad_id is not None:
+                        record['ad_id'] = ad_id
+                    title = card.find(['h6', 'h4'])
+                    if title:
+                        record['title'] = title.get_text(strip=True)
+                    price = card.find('p', {'data-testid': 'ad-price'})
+                    if price:
+                        record['price'] = re.sub(r'\s+', ' ', price.get_text(' ', strip=True))
+                    location_date = card.find('p', {'data-testid': 'location-date'})
+                    if location_date:
+                        location, _, posted = location_date.get_text(strip=True).rpartition(' - ')
+                        record['location'] = location or posted
+                        if location:
+                            record['posted_time'] = posted
+                    img = card.find('img', src=True)
+                    if img and 'apollo.olxcdn.com' in img['src']:
+                        record['image'] = re.sub(r's=\d+x\d+', 's=1280x1024', img['src'])
                     
-                    return hrefs
+                    text = card.get_text(' ', strip=True)
+                    ParserService._card_numbers(record, text)
+                    record['text'] = text
+                    cards.append(record)
+                except Exception as e:
+                    continue
+            
+            return cards
         except Exception as e:
             return []
     
     @staticmethod
-    async def _get_avtoelon_listings(url: str, filter_text: Optional[str]) -> List[str]:
+    def _parse_avtoelon_listings(soup: BeautifulSoup) -> List[Dict]:
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8'
-                }
-                async with session.get(url, headers=headers, timeout=30) as response:
-                    if response.status != 200:
-                        return []
+            cards = []
+            hrefs = set()
+            
+            result_block = soup.find('div', class_='result-block col-sm-8')
+            if not result_block:
+                return []
+            
+            items = result_block.find_all('div', class_='row list-item a-elem')
+            
+            for item in items:
+                try:
+                    button = item.find('button', class_='list-link js__advert-button')
+                    if not button:
+                        continue
+                    
+                    payment_corner = button.find('div', class_='payment-package-corner')
+                    if payment_corner:
+                        badge = payment_corner.find('span', class_=re.compile(r'payment-package-corner__badge--'))
+                        if badge:
+                            badge_classes = badge.get('class', [])
+                            promo_badges = [
+                                'payment-package-corner__badge--vip-sale',
+                                'payment-package-corner__badge--zor-sale',
+                                'payment-package-corner__badge--alo-sale'
+                            ]
+                            if any(promo_class in badge_classes for promo_class in promo_badges):
+                                continue
                     
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
+                    title_a = item.find('a', class_='js__advert-link')
+                    if not title_a:
+                        continue
                     
-                    hrefs = []
+                    href = title_a['href']
+                    if not href.startswith('/a/show/') or href in hrefs:
+                        continue
+                    hrefs.add(href)
                     
-                    result_block = soup.find('div', class_='result-block col-sm-8')
-                    if not result_block:
-                        return []
+                    record = {'href': href, 'title': title_a.get_text(strip=True)}
+                    ad_id = ParserService.ad_id(href, 'avtoelon')
+                    if ad_id is not None:
+                        record['ad_id'] = ad_id
+                    price = item.find('span', class_='price')
+                    if price:
+                        record['price'] = re.sub(r'\s+', ' ', price.get_text(' ', strip=True).replace('Цена:', '')).strip()
                     
-                    items = result_block.find_all('div', class_='row list-item a-elem')
+                    region = item.find('div', class_='a-info-text__region')
+                    if region:
+                        record['location'] = region.get_text(strip=True)
+                    date = item.find('span', class_='date')
+                    if date:
+                        record['posted_time'] = date.get_text(strip=True)
+                    img = item.find('img', class_='a-elem__image')
+                    if img and img.get('src'):
+                        record['image'] = re.sub(r'-\d+x\d+\.webp', '-full.webp', img['src'])
                     
-                    for item in items:
-                        try:
-                            button = item.find('button', class_='list-link js__advert-button')
-                            if not button:
-                                continue
-                            
-                            payment_corner = button.find('div', class_='payment-package-corner')
-                            if payment_corner:
-                                badge = payment_corner.find('span', class_=re.compile(r'payment-package-corner__badge--'))
-                                if badge:
-                                    badge_classes = badge.get('class', [])
-                                    promo_badges = [
-                                        'payment-package-corner__badge--vip-sale',
-                                        'payment-package-corner__badge--zor-sale',
-                                        'payment-package-corner__badge--alo-sale'
-                                    ]
-                                    if any(promo_class in badge_classes for promo_class in promo_badges):
-                                        continue
-                            
-                            title_a = item.find('a', class_='js__advert-link')
-                            if title_a:
-                                title_text = title_a.get_text(strip=True).lower()
-                                if filter_text and filter_text.lower() in title_text:
-                                    continue
-                                
-                                href = title_a['href']
-                                if href.startswith('/a/show/') and href not in hrefs:
-                                    hrefs.append(href)
-                        except Exception as e:
-                            continue
-                    return hrefs
+                    desc = item.find('div', class_='desc')
+                    desc_text = desc.get_text(' ', strip=True) if desc else ''
+                    ParserService._card_numbers(record, desc_text)
+                    record['text'] = f"{record['title']} {desc_text}"
+                    cards.append(record)
+                except Exception as e:
+                    continue
+            return cards
         except Exception as e:
             return []
     
+    @staticmethod
+    def card_details(card: Dict, site_type: str = 'olx') -> Dict:
+        details = {'url': ParserService.ad_url(card['href'], site_type), 'href': card['href'], 'lite': True}
+        for key in ('title', 'price', 'location', 'posted_time'):
+            if card.get(key):
+                details[key] = card[key]
+        
+        params = {}
+        if card.get('year'):
+            params['Год выпуска'] = str(card['year'])
+        if card.get('mileage'):
+            params['Пробег'] = f"{card['mileage']:,} км".replace(',', ' ')
+        details['params'] = params
+        
+        if card.get('image'):
+            details['images'] = [card['image']]
+        return details
+    
+    @staticmethod
+    def ad_url(href: str, site_type: str = 'olx') -> str:
+        if site_type == 'avtoelon':
+            return urljoin('https://avtoelon.uz', href)
+        return urljoin('https://www.olx.uz', href)
+    
     @staticmethod
     async def get_ad_details(href: str, site_type: str = 'olx') -> Optional[Dict]:
+        html = await ParserService.http.get_text(ParserService.ad_url(href, site_type))
+        if not html:
+            return None
+        return ParserService.parse_ad_details(html, href, site_type)
+    
+    @staticmethod
+    def parse_ad_details(html: str, href: str, site_type: str = 'olx') -> Optional[Dict]:
         if site_type == 'olx':
-            return await ParserService._get_olx_ad_details(href)
+            return ParserService._with_soup(html, ParserService._parse_olx_ad_details, html, href)
         elif site_type == 'avtoelon':
-            return await ParserService._get_avtoelon_ad_details(href)
+            return ParserService._with_soup(html, ParserService._parse_avtoelon_ad_details, html, href)
         return None
     
     @staticmethod
-    async def _get_olx_ad_details(href: str) -> Optional[Dict]:
+    def _parse_olx_ad_details(soup: BeautifulSoup, html: str, href: str) -> Optional[Dict]:
         try:
-            full_url = urljoin('https://www.olx.uz', href)
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8'
-                }
-                async with session.get(full_url, headers=headers, timeout=30) as response:
-                    if response.status != 200:
-                        return None
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    details = {'url': full_url, 'href': href}
-                    
-                    aside_div = soup.find('div', {'data-testid': 'aside', 'class': 'css-6u8zs6'})
-                    
-                    if aside_div:
-                        title_h4 = aside_div.find('h4', class_='css-1au435n')
-                        if title_h4:
-                            details['title'] = title_h4.get_text(strip=True)
-                        else:
-                            title_div = aside_div.find('div', {'data-cy': 'offer_title'})
-                            if title_div:
-                                title_h4 = title_div.find('h4')
-                                if title_h4:
-                                    details['title'] = title_h4.get_text(strip=True)
-                        
-                        prices_wrapper = aside_div.find('div', {'data-testid': 'prices-wrapper'})
-                        if prices_wrapper:
-                            price_container = prices_wrapper.find('div', {'data-testid': 'ad-price-container'})
-                            if price_container:
-                                price_h3 = price_container.find('h3')
-                                if price_h3:
-                                    details['price'] = price_h3.get_text(strip=True)
-                        
-                        if 'price' not in details:
-                            price_h3 = aside_div.find('h3', class_='css-yauxmy')
-                            if price_h3:
-                                details['price'] = price_h3.get_text(strip=True)
-                        
-                        if 'price' not in details:
-                            price_h3 = aside_div.find('h3', class_='css-90xrc0')
-                            if price_h3:
-                                details['price'] = price_h3.get_text(strip=True)
-                        
-                        seller_card = aside_div.find('div', {'data-cy': 'seller_card', 'data-testid': 'seller_card'})
-                        if seller_card:
-                            user_name = seller_card.find('h4', {'data-testid': 'user-profile-user-name'})
-                            if user_name:
-                                details['seller_name'] = user_name.get_text(strip=True)
-                        
-                        map_section = aside_div.find('div', {'data-testid': 'map-aside-section'})
-                        if map_section:
-                            print(map_section)
-                            logger.info("Map section topildi")
-                            location_found = False
-                            
-                            location_p = map_section.find('p', class_='css-9pna1a')
-                            region_p = map_section.find('p', class_='css-3cz5o2')
-                            
-                            logger.info(f"location_p: {location_p}")
-                            logger.info(f"region_p: {region_p}")
-                            
-                            if location_p or region_p:
-                                location_parts = []
-                                if location_p:
-                                    loc_text = location_p.get_text(strip=True)
-                                    if loc_text:
-                                        location_parts.append(loc_text)
-                                        logger.info(f"Location text: {loc_text}")
-                                if region_p:
-                                    reg_text = region_p.get_text(strip=True)
-                                    if reg_text:
-                                        location_parts.append(reg_text)
-                                        logger.info(f"Region text: {reg_text}")
-                                
-                                if location_parts:
-                                    details['location'] = ', '.join(location_parts)
-                                    location_found = True
-                                    logger.info(f"Location (usul 1): {details['location']}")
-                            
-                            if not location_found:
-                                map_img = map_section.find('img', alt=True)
-                                logger.info(f"Map img: {map_img}")
-                                if map_img and map_img.get('alt'):
-                                    alt_text = map_img['alt'].strip()
-                                    logger.info(f"Alt text: {alt_text}")
-                                    if alt_text and alt_text not in ['', 'map', 'static map']:
-                                        details['location'] = alt_text
-                                        location_found = True
-                                        logger.info(f"Location (usul 2): {details['location']}")
-                            
-                            if not location_found:
-                                all_p_tags = map_section.find_all('p')
-                                logger.info(f"Barcha <p> teglar soni: {len(all_p_tags)}")
-                                location_parts = []
-                                for p in all_p_tags:
-                                    text = p.get_text(strip=True)
-                                    logger.info(f"P text: {text}")
-                                    print(text)
-                                    if text and text not in ['Местоположение', 'Location']:
-                                        location_parts.append(text)
-                                
-                                if location_parts:
-                                    details['location'] = ', '.join(location_parts)
-                                    location_found = True
-                                    logger.info(f"Location (usul 3): {details['location']}")
-                        else:
-                            logger.warning("Map section topilmadi!")
-
-                        if 'location' not in details or not details['location']:
-                            logger.info("Location topilmadi, parametrlardan izlanmoqda")
-                            params = details.get('params', {})
-                            if 'Город' in params:
-                                details['location'] = params['Город']
-                                logger.info(f"Location (params): {details['location']}")
-                            elif 'Местоположение' in params:
-                                details['location'] = params['Местоположение']
-                                logger.info(f"Location (params): {details['location']}")
-                        
-                        posted_wrapper = aside_div.find('div', class_='css-12kclhg')
-                        if posted_wrapper:
-                            outer_span = posted_wrapper.find('span', class_='css-1br3d2a')
-                            if outer_span:
-                                posted_date = outer_span.find('span', {'data-cy': 'ad-posted-at', 'data-testid': 'ad-posted-at'})
-                                if posted_date:
-                                    details['posted_time'] = posted_date.get_text(strip=True)
-                                else:
-                                    details['posted_time'] = outer_span.get_text(strip=True).replace('Опубликовано ', '').strip()
-                            else:
-                                posted_date = posted_wrapper.find('span', {'data-cy': 'ad-posted-at'})
-                                if posted_date:
-                                    details['posted_time'] = posted_date.get_text(strip=True)
+            found = OLX_DETAIL_PLAN.run(soup)
+            details = {'url': ParserService.ad_url(href, 'olx'), 'href': href}
+            
+            aside_div = found.first('aside')
+            if aside_div:
+                title_h4 = found.first('title', aside_div)
+                if not title_h4:
+                    title_h4 = found.first('offer_title_h4', found.first('offer_title', aside_div))
+                if title_h4:
+                    details['title'] = title_h4.get_text(strip=True)
+                
+                price_container = found.first('price_container', found.first('prices_wrapper', aside_div))
+                price_h3 = (
+                    found.first('price', price_container)
+                    or found.first('price_yauxmy', aside_div)
+                    or found.first('price_90xrc0', aside_div)
+                )
+                if price_h3:
+                    details['price'] = price_h3.get_text(strip=True)
+                
+                user_name = found.first('seller_name', found.first('seller_card', aside_div))
+                if user_name:
+                    details['seller_name'] = user_name.get_text(strip=True)
+                
+                map_section = found.first('map', aside_div)
+                if map_section:
+                    location = ParserService._olx_location(found, map_section)
+                    if location:
+                        details['location'] = location
+                else:
+                    events.warning('olx.map_missing', "Map section topilmadi: {href}", href=href)
+                
+                if not details.get('location'):
+                    events.debug('olx.location', "Location (params): {location}", method='params',
+                                 location=details.get('location'))
+                
+                posted_wrapper = found.first('posted_wrapper', aside_div)
+                if posted_wrapper:
+                    outer_span = found.first('posted_outer', posted_wrapper)
+                    if outer_span:
+                        posted_date = found.first('posted_inner', outer_span)
+                        if posted_date:
+                            details['posted_time'] = posted_date.get_text(strip=True)
                         else:
-                            posted_date = soup.find('span', {'data-cy': 'ad-posted-at', 'data-testid': 'ad-posted-at'})
-                            if posted_date:
-                                details['posted_time'] = posted_date.get_text(strip=True)
+                            details['posted_time'] = outer_span.get_text(strip=True).replace('Опубликовано ', '').strip()
                     else:
-                        title = soup.find('h1', class_='css-1kc83jo')
-                        if not title:
-                            title = soup.find('h4', class_='css-1kc83jo')
-                        if title:
-                            details['title'] = title.get_text(strip=True)
-                        
-                        price = soup.find('h3', class_='css-90xrc0')
-                        if price:
-                            details['price'] = price.get_text(strip=True)
-                    
-                    images = []
-                    
-                    gallery = soup.find('div', class_='css-1uilkl7')
-                    if gallery:
-                        img_tags = gallery.find_all('img', src=True)
-                        for img in img_tags[:10]:
-                            src = img.get('src', '')
-                            if 'apollo.olxcdn.com' in src:
-                                if 's=' in src:
-                                    src = re.sub(r's=\d+x\d+', 's=1280x1024', src)
-                                images.append(src)
-                    
-                    if not images:
-                        all_imgs = soup.find_all('img', src=True)
-                        for img in all_imgs:
-                            src = img.get('src', '')
-                            if 'apollo.olxcdn.com' in src and 'static' not in src:
-                                if 's=' in src:
-                                    src = re.sub(r's=\d+x\d+', 's=1280x1024', src)
-                                if src not in images:
-                                    images.append(src)
-                    
-                    if not images:
-                        data_src_imgs = soup.find_all('img', attrs={'data-src': True})
-                        for img in data_src_imgs:
-                            src = img.get('data-src', '')
-                            if 'apollo.olxcdn.com' in src:
-                                if 's=' in src:
-                                    src = re.sub(r's=\d+x\d+', 's=1280x1024', src)
-                                if src not in images:
-                                    images.append(src)
-                    
-                    if images:
-                        details['images'] = images[:10]
-
-                    params_div = soup.find('div', {'data-testid': 'ad-parameters-container'})
-                    if params_div:
-                        params = {}
-                        for p in params_div.find_all('p', class_='css-13x8d99'):
-                            text = p.get_text(strip=True)
-                            if ':' in text:
-                                key, value = text.split(':', 1)
-                                params[key.strip()] = value.strip()
-                        details['params'] = params
-                    
-                    phone_link = soup.find('a', href=re.compile(r'tel:'))
-                    if phone_link:
-                        phone = phone_link['href'].replace('tel:', '').strip()
-                        details['phone'] = phone
-                    else:
-                        phone_button = soup.find('button', {'data-testid': 'ad-contact-phone'})
-                        if phone_button:
-                            phone_text = phone_button.get_text(strip=True)
-                            if phone_text and phone_text != 'Показать телефон':
-                                details['phone'] = phone_text
-                        else:
-                            phone_pattern = re.compile(r'\+?\d{1,3}[\s-]?\(?\d{2,3}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}')
-                            phone_matches = phone_pattern.findall(html)
-                            if phone_matches:
-                                details['phone'] = phone_matches[0]
-                    
-                    desc_div = soup.find('div', {'data-cy': 'ad_description'})
-                    if desc_div:
-                        desc_content = desc_div.find('div', class_='css-19duwlz')
-                        if desc_content:
-                            details['description'] = desc_content.get_text()
-                    
-                    return details
-        except Exception as e:
-            return None
-    
-    @staticmethod
-    async def _get_avtoelon_ad_details(href: str) -> Optional[Dict]:
-        try:
-            full_url = urljoin('https://avtoelon.uz', href)
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8'
-                }
-                async with session.get(full_url, headers=headers, timeout=30) as response:
-                    if response.status != 200:
-                        return None
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    details = {'url': full_url, 'href': href}
-                    
-                    product_div = soup.find('div', {'itemscope': '', 'itemtype': 'http://schema.org/Product'})
-                    if not product_div:
-                        product_div = soup.find('div', class_='item product')
-                    
-                    if product_div:
-                        title_elem = product_div.find('h1', class_='a-title__text') or product_div.find('h1')
-                        if title_elem:
-                            title_text = title_elem.get_text()
-                            title_text = re.sub(r'\s+', ' ', title_text)
-                            details['title'] = title_text
-                        
-                        price_span = product_div.find('span', class_='a-price__text') or product_div.find('div', class_='a-price')
-                        if price_span:
-                            details['price'] = price_span.get_text(strip=True)
-                        
-                        posted_div = soup.find('div', class_='f-line')
-                        if posted_div:
-                            posted_col = posted_div.find('div', class_='col-sm-4')
-                            if posted_col:
-                                posted_text = posted_col.get_text(strip=True)
-                                if 'Опубликовано' in posted_text:
-                                    details['posted_time'] = posted_text
-                        
-                        params = {}
-                        dl_params = product_div.find('dl', class_='description-params') or product_div.find('dl', class_='clearfix dl-horizontal description-params')
-                        if dl_params:
-                            dts = dl_params.find_all('dt')
-                            dds = dl_params.find_all('dd')
-                            for dt, dd in zip(dts[:len(dds)], dds):
-                                key = dt.get_text(strip=True)
-                                value = dd.get_text(strip=True)
-                                params[key] = value
-                        
-                        params_block = product_div.find('ul', class_='params-block__list')
-                        if params_block:
-                            for li in params_block.find_all('li', class_='params-block__list-item'):
-                                heading_h4 = li.find('h4', class_='item__heading')
-                                if heading_h4:
-                                    heading = heading_h4.get_text(strip=True)
-                                    span = li.find('span')
-                                    if span:
-                                        span_text = span.get_text(strip=True)
-                                        params[heading] = span_text
-                        
-                        details['params'] = params
-                        
-                        desc_div = product_div.find('div', class_='description-text')
-                        if desc_div:
-                            details['description'] = desc_div.get_text()
-                        
-                        simple_phone_pattern = re.compile(r'\+?998\s*\d{2}\s*\d{3}\s*\d{2}\s*\d{2}')
-                        phone_match = simple_phone_pattern.search(html)
-                        if phone_match:
-                            details['phone'] = re.sub(r'\s+', ' ', phone_match.group(0)).strip()
-                        
-                        if 'Город' in params:
-                            details['location'] = params['Город']
-
-                        images = []
-                        main_div = product_div.find('div', class_='main-photo')
-                        if main_div:
-                            main_a = main_div.find('a')
-                            if main_a and main_a.get('href'):
-                                images.append(main_a['href'])
-                            else:
-                                img = main_div.find('img')
-                                if img and img.get('src'):
-                                    src = img['src']
-                                    src = re.sub(r'-408x306\.webp', '-full.webp', src)
-                                    images.append(src)
-                        
-                        photo_links = product_div.find_all('a', class_='small-thumb')
-                        for a in photo_links:
-                            href_attr = a.get('href', '')
-                            if href_attr and '-full.webp' in href_attr:
-                                images.append(href_attr)
-                        
-                        details['images'] = list(set(images))[:10]
-                    
-                    return details
+                        posted_date = found.first('posted_wrapped', posted_wrapper)
+                        if posted_date:
+                            details['posted_time'] = posted_date.get_text(strip=True)
+                else:
+                    posted_date = found.first('posted')
+                    if posted_date:
+                        details['posted_time'] = posted_date.get_text(strip=True)
+            else:
+                title = found.first('page_title_h1') or found.first('page_title_h4')
+                if title:
+                    details['title'] = title.get_text(strip=True)
+                price = found.first('page_price')
+                if price:
+                    details['price'] = price.get_text(strip=True)
+            
+            images = [
+                OLX_IMAGE_SIZE_RE.sub('s=1280x1024', img['src'])
+                for img in found.all('gallery_images', found.first('gallery'))[:10]
+                if 'apollo.olxcdn.com' in img['src']
+            ]
+            if not images:
+                images = list(dict.fromkeys(OLX_IMAGE_SIZE_RE.sub('s=1280x1024', img['src']) for img in found.all('images')))
+            if not images:
+                images = list(dict.fromkeys(
+                    OLX_IMAGE_SIZE_RE.sub('s=1280x1024', img['data-src']) for img in found.all('lazy_images')
+                ))
+            if images:
+                details['images'] = images[:10]
+            
+            params_div = found.first('params')
+            if params_div:
+                params = {}
+                for p in found.all('param_rows', params_div):
+                    text = p.get_text(strip=True)
+                    if ':' in text:
+                        key, value = text.split(':', 1)
+                        params[key.strip()] = value.strip()
+                details['params'] = params
+            
+            phone_link = found.first('phone_link')
+            phone_button = found.first('phone_button')
+            if phone_link:
+                details['phone'] = phone_link['href'].replace('tel:', '').strip()
+            elif phone_button:
+                phone_text = phone_button.get_text(strip=True)
+                if phone_text and phone_text != 'Показать телефон':
+                    details['phone'] = phone_text
+            else:
+                phone_match = OLX_PHONE_RE.search(html)
+                if phone_match:
+                    details['phone'] = phone_match.group(0)
+            
+            desc_content = found.first('description_text', found.first('description'))
+            if desc_content:
+                details['description'] = desc_content.get_text()
+            
+            return details
         except Exception as e:
             return None
     
     @staticmethod
-    def format_message(details: Dict, site_type: str = 'olx') -> str:
-        title = details.get('title', 'Yangi e\'lon')
-        url = details.get('url', '')
+    def _olx_location(found, map_section) -> Optional[str]:
+        location_parts = [
+            text for text in (
+                tag.get_text(strip=True)
+                for tag in (found.first('map_location', map_section), found.first('map_region', map_section)) if tag
+            ) if text
+        ]
+        if location_parts:
+            location = ', '.join(location_parts)
+            events.debug('olx.location', "Location (usul 1): {location}", method=1, location=location)
+            return location
         
-        msg = f"🚗 <a href='{url}'><b>{title}</b></a>\n\n"
+        map_img = found.first('map_img', map_section)
+        alt_text = map_img['alt'].strip() if map_img else ''
+        if alt_text and alt_text not in ['map', 'static map']:
+            events.debug('olx.location', "Location (usul 2): {location}", method=2, location=alt_text)
+            return alt_text
         
-        if 'price' in details:
-            msg += f"💰 <b>{details['price']}</b>\n\n"
-        
-        params = details.get('params', {})
-        
-        if site_type == 'avtoelon':
-            year = params.get('Год выпуска', params.get('Год', ''))
-            location = details.get('location', params.get('Город', ''))
+        location_parts = [
+            text for text in (p.get_text(strip=True) for p in found.all('map_texts', map_section))
+            if text and text not in ['Местоположение', 'Location']
+        ]
+        if location_parts:
+            location = ', '.join(location_parts)
+            events.debug('olx.location', "Location (usul 3): {location}", method=3, location=location)
+            return location
+        return None
+    
+    @staticmethod
+    def _parse_avtoelon_ad_details(soup: BeautifulSoup, html: str, href: str) -> Optional[Dict]:
+        try:
+            found = AVTOELON_DETAIL_PLAN.run(soup)
+            details = {'url': ParserService.ad_url(href, 'avtoelon'), 'href': href}
             
-            msg += "📋 <b>Ma'lumotlar:</b>\n"
-
-            if year:
-                msg += f"▫️ Yili: {year}\n"
+            product_div = found.first('product') or found.first('product_item')
+            if not product_div:
+                return details
             
-            important_keys = [
-                'Объем двигателя, л', 'Объем двигателя', 'Пробег', 
-                'Коробка передач', 'Цвет', 'Состояние краски'
-            ]
+            title_elem = found.first('title', product_div) or found.first('any_title', product_div)
+            if title_elem:
+                details['title'] = re.sub(r'\s+', ' ', title_elem.get_text())
             
-            for key in important_keys:
-                if key in params:
-                    uz_key = {
-                        'Объем двигателя, л': 'Hajm',
-                        'Объем двигателя': 'Hajm',
-                        'Пробег': 'Probeg',
-                        'Коробка передач': 'Korobka',
-                        'Цвет': 'Rangi',
-                        'Состояние краски': 'Kraska holati'
-                    }.get(key, key)
-                    value = params[key].replace('\n', ' ').strip()
-                    msg += f"▫️ {uz_key}: {value}\n"
-
-            if location:
-                msg += f"\n📍 <b>Manzil:</b> {location}\n"
+            price_span = found.first('price', product_div) or found.first('price_block', product_div)
+            if price_span:
+                details['price'] = price_span.get_text(strip=True)
             
-            msg += "\n"
-        
-        else:
-            year = params.get('Год выпуска', params.get('Год', ''))
-            location = details.get('location', params.get('Город', ''))
+            posted_col = found.first('posted', found.first('f_line'))
+            if posted_col:
+                posted_text = posted_col.get_text(strip=True)
+                if 'Опубликовано' in posted_text:
+                    details['posted_time'] = posted_text
             
+            params = {}
+            dl_params = found.first('dl', product_div) or found.first('dl_full', product_div)
+            if dl_params:
+                dds = found.all('dd', dl_params)
+                for dt, dd in zip(found.all('dt', dl_params)[:len(dds)], dds):
+                    params[dt.get_text(strip=True)] = dd.get_text(strip=True)
             
+            for li in found.all('params_item', found.first('params_list', product_div)):
+                heading_h4 = found.first('params_heading', li)
+                span = found.first('params_value', li)
+                if heading_h4 and span:
+                    params[heading_h4.get_text(strip=True)] = span.get_text(strip=True)
             
-            if params:
-                important_keys = [
-                    'Объем двигателя, л', 'Объем двигателя', 'Пробег', 
-                    'Коробка передач', 'Цвет', 'Вид топлива', 'Кузов', 
-                    'Состояние краски', 'Привод'
-                ]
-                
-                has_other_params = any(key in params for key in important_keys)
-                
-                if has_other_params:
-                    msg += "📋 <b>Ma'lumotlar:</b>\n"
-                    if year:
-                        msg += f"▫️ <b>Yili:</b> {year}\n"
-                    
-                    for key in important_keys:
-                        if key in params:
-                            uz_key = {
-                                'Объем двигателя, л': 'Hajm',
-                                'Объем двигателя': 'Hajm',
-                                'Пробег': 'Probeg',
-                                'Коробка передач': 'Korobka',
-                                'Цвет': 'Rangi',
-                                'Состояние краски': 'Kraska holati',
-                            }.get(key, key)
-                            value = params[key].replace('\n', ' ').strip()
-                            msg += f"▫️ {uz_key}: {value}\n"
-
-                    
-                    msg += "\n"
-
+            details['params'] = params
+            
+            desc_div = found.first('description', product_div)
+            if desc_div:
+                details['description'] = desc_div.get_text()
+            
+            phone_match = AVTOELON_PHONE_RE.search(html)
+            if phone_match:
+                details['phone'] = re.sub(r'\s+', ' ', phone_match.group(0)).strip()
+            
+            if 'Город' in params:
+                details['location'] = params['Город']
+            
+            images = []
+            main_div = found.first('main_photo', product_div)
+            if main_div:
+                main_a = found.first('main_link', main_div)
+                img = found.first('main_img', main_div)
+                if main_a and main_a.get('href'):
+                    images.append(main_a['href'])
+                elif img and img.get('src'):
+                    images.append(img['src'].replace('-408x306.webp', '-full.webp'))
+            
+            for a in found.all('thumbs', product_div):
+                href_attr = a.get('href', '')
+                if href_attr and '-full.webp' in href_attr:
+                    images.append(href_attr)
+            
+            details['images'] = list(dict.fromkeys(images))[:10]
+            return details
+        except Exception as e:
+            return None
+    
+    @staticmethod
+    def format_message(details: Dict, site_type: str = 'olx', template: Optional[str] = None,
+                       version: Optional[str] = None) -> str:
+        return renderer.render(details, site_type, template, version)
+    
+    @staticmethod
+    def format_digest(items: List[Dict], site_type: str = 'olx', limit: int = 4000) -> str:
+        msg = f"🗂 <b>{len(items)} ta yangi e'lon</b>\n\n"
+        for number, details in enumerate(items, 1):
+            title = html.escape(details.get('title', "Yangi e'lon"))
+            url = html.escape(details.get('url', ''), quote=True)
+            line = f"{number}. <a href='{url}'><b>{title}</b></a>"
+            if details.get('price'):
+                line += f" — 💰 {html.escape(details['price'])}"
+            if details.get('old_price'):
+                line += f" (avval {html.escape(details['old_price'])})"
+            
+            params = details.get('params', {})
+            facts = [
+                params.get('Год выпуска', params.get('Год', '')),
+                params.get('Пробег', ''),
+                details.get('location', params.get('Город', ''))
+            ]
+            facts = [html.escape(fact) for fact in facts if fact]
+            if facts:
+                line += f"\n▫️ {' | '.join(facts)}"
+            line += "\n\n"
+            
+            if len(msg) + len(line) > limit:
+                msg += f"… va yana {len(items) - number + 1} ta"
+                break
+            msg += line
+        return msg.strip()
+    
+    @staticmethod
+    def format_price_change(details: Dict, old_price: Optional[str]) -> str:
+        title = html.escape(details.get('title', 'E\'lon'), quote=False)
+        url = html.escape(details.get('url', ''))
+        new_price = html.escape(details.get('price', '—'), quote=False)
+        old_price = html.escape(old_price, quote=False) if old_price else None
         
-        if 'description' in details:
-            desc = details['description']
-            if len(desc) > 500:
-                desc = desc[:497] + '...'
-            msg += f"📝 {desc}\n\n"
-
+        msg = f"🔁 <b>Narx o'zgardi!</b>\n\n"
+        msg += f"🚗 <a href='{url}'><b>{title}</b></a>\n\n"
+        msg += f"💰 <s>{old_price or '—'}</s> → <b>{new_price}</b>\n\n"
         msg += f"🔗 <a href='{url}'>E'lonni to'liq ko'rish</a>"
         
-        return msg
\ No newline at end of file
+        return msg
+    
+    @staticmethod
+    def format_ad_removed(url: str) -> str:
+        msg = f"🚫 <b>E'lon olib tashlandi</b>\n\n"
+        msg += f"Avtomobil sotilgan bo'lishi mumkin.\n"
+        msg += f"🔗 <a href='{html.escape(url)}'>E'lon manzili</a>"
+        return msg
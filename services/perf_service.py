@@ -0,0 +1,116 @@
+import html
+import time
+from typing import Dict, List, Optional
+
+MAX_PARSERS = 15
+
+
+def _ago(timestamp: Optional[float], now: float) -> str:
+    if not timestamp:
+        return '—'
+    return f"{_duration(now - timestamp)} oldin"
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+
+
+def _ms(timing: Optional[Dict], key: str) -> str:
+    if not timing or timing.get(key) is None:
+        return '—'
+    return f"{timing[key] * 1000:.0f}ms"
+
+
+def _ratio(part: float, total: float) -> str:
+    return f"{part / total:.0%}" if total else '—'
+
+
+class PerfReport:
+
+    @staticmethod
+    def render(snapshot: Dict, parsers: List[Dict], freshness: Optional[Dict[str, Dict]] = None) -> str:
+        now = time.time()
+        counters = snapshot['counters']
+        gauges = snapshot['gauges']
+        timings = snapshot['timings']
+        providers = snapshot['providers']
+        uptime_hours = max(snapshot['uptime'] / 3600, 1 / 60)
+        freshness = freshness or {}
+
+        cycle = timings.get('scheduler.cycle_duration')
+        lines = [
+            "📊 <b>Ish faoliyati</b>\n",
+            f"⏱ Ishlash vaqti: {_duration(snapshot['uptime'])}",
+            f"🔁 Sikllar: {counters.get('scheduler.cycles', 0):.0f} | "
+            f"davomiylik o'rt. {cycle['avg']:.1f}s, p95 {cycle['p95']:.1f}s" if cycle else "🔁 Sikllar: —",
+            f"🕒 Oxirgi sikl: {_ago(gauges.get('scheduler.last_cycle_at'), now)}",
+        ]
+
+        lines.append("\n📋 <b>Parserlar</b>")
+        for parser in parsers[:MAX_PARSERS]:
+            prefix = f"parser.{parser['id']}"
+            new_ads = counters.get(f"{prefix}.new_ads", 0)
+            checks = counters.get(f"{prefix}.checks", 0)
+            line = (
+                f"🆔 {parser['id']} ({parser['site_type']}): {_ago(gauges.get(f'{prefix}.last_check'), now)}, "
+                f"{checks:.0f} tekshiruv, {new_ads:.0f} yangi ({new_ads / uptime_hours:.1f}/soat)"
+            )
+            parser_freshness = freshness.get(prefix)
+            if parser_freshness and parser_freshness['count']:
+                line += f", yangilik p50 {_duration(parser_freshness['p50'])}, p90 {_duration(parser_freshness['p90'])}"
+            lines.append(line)
+        if len(parsers) > MAX_PARSERS:
+            lines.append(f"… yana {len(parsers) - MAX_PARSERS} ta")
+
+        hosts = providers.get('hosts') or []
+        if isinstance(hosts, list) and hosts:
+            lines.append("\n🌐 <b>Hostlar</b>")
+            for host in hosts:
+                name = host['host']
+                requests = counters.get(f"http.{name}.requests", 0)
+                errors = counters.get(f"http.{name}.errors", 0)
+                lines.append(
+                    f"{html.escape(name)}: {host['state']}, {requests:.0f} so'rov, xato {_ratio(errors, requests)}, "
+                    f"c={host['concurrency']}, p95 {_ms(timings.get(f'http.{name}.latency'), 'p95')}"
+                )
+
+        file_cache = providers.get('file_cache') or {}
+        skipped = counters.get('novelty.watermark_skipped', 0)
+        checked = counters.get('novelty.db_checked', 0)
+        lines.append("\n💾 <b>Keshlar</b>")
+        if 'hit_rate' in file_cache:
+            lines.append(
+                f"file_id: {file_cache['hit_rate']:.0%} ({file_cache['hits']}/{file_cache['hits'] + file_cache['misses']}), "
+                f"xotirada {file_cache['size']}"
+            )
+        lines.append(f"Watermark: {_ratio(skipped, skipped + checked)} e'lon DB'siz o'tkazildi")
+
+        stages = providers.get('pipeline') or []
+        if isinstance(stages, list) and stages:
+            lines.append("\n📤 <b>Navbatlar</b>")
+            lines.append(' '.join(f"{stage['name']}={stage['depth']}/{stage['maxsize']}" for stage in stages))
+
+        commit = timings.get('db.writer.commit_latency')
+        lines.append("\n🗄 <b>DB</b>")
+        lines.append(
+            f"commit p50 {_ms(commit, 'p50')}, p95 {_ms(commit, 'p95')}, "
+            f"{gauges.get('db.writer.rows_per_commit', 0):.1f} yozuv/commit"
+        )
+        lines.append(f"o'qish p95 {_ms(timings.get('db.read_latency'), 'p95')}")
+
+        sites = [(site, freshness.get(f"site.{site}")) for site in ('olx', 'avtoelon')]
+        sites = [(site, summary) for site, summary in sites if summary and summary['count']]
+        if sites:
+            lines.append("\n⏳ <b>Yangilik</b> (oxirgi yetkazishlar)")
+            for site, summary in sites:
+                lines.append(
+                    f"{site}: p50 {_duration(summary['p50'])}, p90 {_duration(summary['p90'])}, "
+                    f"p99 {_duration(summary['p99'])} ({summary['count']} ta)"
+                )
+
+        return '\n'.join(lines)
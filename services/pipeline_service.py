@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], workers: int = 1, maxsize: int = 20):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.next: Optional['Stage'] = None
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.blocked_time = 0.0
+        self.started_at = time.monotonic()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self.started_at = time.monotonic()
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"stage-{self.name}-{i}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            try:
+                started = time.monotonic()
+                result = await self.handler(item)
+                self.busy_time += time.monotonic() - started
+
+                if result is None:
+                    self.dropped += 1
+                    continue
+
+                self.processed += 1
+                if self.next is None:
+                    continue
+
+                outputs = result if isinstance(result, list) else [result]
+                for output in outputs:
+                    put_started = time.monotonic()
+                    await self.next.queue.put(output)
+                    self.blocked_time += time.monotonic() - put_started
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Stage {self.name} xatosi: {e}")
+            finally:
+                self.queue.task_done()
+                item = result = outputs = output = None
+
+    def stats(self) -> Dict:
+        uptime = max(time.monotonic() - self.started_at, 1e-9)
+        handled = self.processed + self.dropped + self.errors
+        return {
+            'name': self.name,
+            'workers': self.workers,
+            'depth': self.queue.qsize(),
+            'maxsize': self.queue.maxsize,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'throughput': handled / uptime,
+            'avg_time': self.busy_time / handled if handled else 0.0,
+            'blocked_time': self.blocked_time
+        }
+
+
+class Pipeline:
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        for current, following in zip(stages, stages[1:]):
+            current.next = following
+        self.is_running = False
+
+    def start(self):
+        if self.is_running:
+            return
+        for stage in self.stages:
+            stage.start()
+        self.is_running = True
+
+    async def stop(self):
+        for stage in self.stages:
+            await stage.stop()
+        self.is_running = False
+
+    async def submit(self, item: Any):
+        await self.stages[0].queue.put(item)
+
+    def try_submit(self, item: Any) -> bool:
+        try:
+            self.stages[0].queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def join(self):
+        for stage in self.stages:
+            await stage.queue.join()
+
+    async def drain(self, timeout: float) -> int:
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return sum(stage.queue.qsize() for stage in self.stages)
+
+    def stats(self) -> List[Dict]:
+        return [stage.stats() for stage in self.stages]
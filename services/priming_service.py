@@ -0,0 +1,62 @@
+import logging
+import time
+from typing import Dict, Optional
+
+from database.db import Database
+from services.metrics_service import metrics
+from services.parser_service import ParserService
+
+logger = logging.getLogger(__name__)
+
+
+class PrimingService:
+
+    @staticmethod
+    async def prime(db: Database, parser: Dict) -> Optional[int]:
+        parser_id = parser['id']
+        started = time.monotonic()
+
+        cards = await ParserService.get_listings(parser['url'], parser['site_type'])
+        if not cards:
+            logger.warning(f"Parser {parser_id}: priming uchun e'lonlar olinmadi")
+            return None
+
+        hrefs = [card['href'] for card in cards]
+        inserted = await db.bulk_add_parsed_ads(parser_id, hrefs)
+        ad_ids = [card['ad_id'] for card in cards if card.get('ad_id') is not None]
+        await db.set_bookmark(parser_id, hrefs[0], max(ad_ids) if ad_ids else None)
+
+        elapsed = time.monotonic() - started
+        metrics.inc('priming.runs')
+        metrics.inc('priming.hrefs', inserted)
+        metrics.observe('priming.latency', elapsed)
+        logger.info(
+            f"Parser {parser_id}: priming tugadi, {len(hrefs)} ta e'lon ko'rildi, "
+            f"{inserted} ta yangi yozildi ({elapsed:.2f}s)"
+        )
+        return inserted
+
+    @staticmethod
+    async def prime_new_parser(db: Database, parser_id: int) -> Optional[int]:
+        parser = await db.get_parser(parser_id)
+        if not parser:
+            return None
+        try:
+            primed = await PrimingService.prime(db, parser)
+        except Exception as e:
+            logger.error(f"Parser {parser_id}: priming xatosi: {e}")
+            primed = None
+        if primed is None:
+            metrics.inc('priming.failures')
+            logger.warning(f"Parser {parser_id}: priming holatida qoldi, keyingi tsiklda qayta uriniladi")
+            return None
+        await db.activate_parser(parser_id)
+        return primed
+
+    @staticmethod
+    async def prime_pending(db: Database) -> int:
+        activated = 0
+        for parser in await db.get_priming_parsers():
+            if await PrimingService.prime_new_parser(db, parser['id']) is not None:
+                activated += 1
+        return activated
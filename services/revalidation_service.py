@@ -0,0 +1,66 @@
+import hashlib
+import json
+from typing import Dict, Optional
+
+from config import Config
+from services.dedup_service import KEY_PARAMS, normalize_price
+
+REMOVED_STATUSES = (404, 410)
+
+
+def content_fingerprint(details: Dict) -> str:
+    params = details.get('params') or {}
+    fields = {
+        'price': normalize_price(details.get('price')),
+        'params': {KEY_PARAMS[key]: ' '.join(value.lower().split()) for key, value in params.items() if key in KEY_PARAMS},
+    }
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def body_fingerprint(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def validators(headers: Dict) -> Dict[str, Optional[str]]:
+    headers = {key.lower(): value for key, value in headers.items()}
+    return {'etag': headers.get('etag'), 'last_modified': headers.get('last-modified')}
+
+
+def conditional_headers(row: Dict) -> Dict[str, str]:
+    headers = {}
+    if row.get('etag'):
+        headers['If-None-Match'] = row['etag']
+    if row.get('last_modified'):
+        headers['If-Modified-Since'] = row['last_modified']
+    return headers
+
+
+class RevalidationSchedule:
+
+    @staticmethod
+    def initial(now: float) -> Dict:
+        return {'check_interval': Config.REVALIDATE_FIRST_INTERVAL, 'next_check_at': now + Config.REVALIDATE_FIRST_INTERVAL}
+
+    @staticmethod
+    def after_check(row: Dict, changed: bool, now: float) -> Dict:
+        if changed:
+            interval = Config.REVALIDATE_FIRST_INTERVAL
+        else:
+            interval = min(
+                (row.get('check_interval') or Config.REVALIDATE_FIRST_INTERVAL) * Config.REVALIDATE_BACKOFF,
+                Config.REVALIDATE_MAX_INTERVAL
+            )
+        next_check_at = now + interval
+        delivered_at = row.get('delivered_at')
+        if next_check_at - (now if delivered_at is None else delivered_at) > Config.REVALIDATE_MAX_AGE:
+            next_check_at = None
+        return {'check_interval': interval, 'next_check_at': next_check_at}
+
+    @staticmethod
+    def retry(now: float) -> Dict:
+        return {'next_check_at': now + Config.REVALIDATE_RETRY_INTERVAL}
+
+    @staticmethod
+    def stop() -> Dict:
+        return {'next_check_at': None}
@@ -1,13 +1,31 @@
 import asyncio
 import logging
+import time
 from typing import Dict, List, Optional
 from aiogram import Bot
-from aiogram.types import InputMediaPhoto
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InputMediaPhoto, Message
 from database.db import Database
+from services.corpus_service import CorpusStore
+from services.dedup_service import FingerprintIndex, normalize_price, to_signed
+from services.file_cache_service import FileIdCache
+from services.filter_service import FilterEngine
+from services.freshness_service import FreshnessTracker
+from services.image_service import ImagePreflight
+from services.logging_service import get_event_logger
+from services.metrics_service import metrics
+from services.parser_registry import registry
 from services.parser_service import ParserService
+from services.pipeline_service import Pipeline, Stage
+from services.priming_service import PrimingService
+from services.revalidation_service import (
+    REMOVED_STATUSES, RevalidationSchedule, body_fingerprint, conditional_headers, content_fingerprint, validators
+)
+from services.snapshot_service import StateSnapshot
 from config import Config
 
 logger = logging.getLogger(__name__)
+events = get_event_logger(__name__)
 
 class SchedulerService:
    
@@ -15,10 +33,43 @@ class SchedulerService:
         self.bot = bot
         self.db = db
         self.parser_service = ParserService()
+        self.file_cache = FileIdCache(db)
+        self.image_preflight = ImagePreflight(self.parser_service.http)
+        self.corpus = CorpusStore() if Config.CORPUS_ENABLED else None
+        self.dedup_index = FingerprintIndex()
+        self.filters = FilterEngine()
+        self._last_dedup_evict = 0.0
+        self.snapshot = StateSnapshot()
+        self._last_checkpoint = time.monotonic()
+        self._restored = False
+        self.pipeline = self._build_pipeline()
+        self.enrich_pipeline = self._build_enrich_pipeline()
+        self.revalidate_pipeline = self._build_revalidate_pipeline()
+        self.registry = registry
+        self.registry.subscribe(self._on_registry_change)
+        metrics.register('pipeline', self.pipeline_stats)
+        metrics.register('hosts', self.parser_service.http.host_stats)
+        metrics.register('egress', self.parser_service.http.egress.stats)
+        metrics.register('file_cache', self.file_cache.stats)
+        metrics.register('image_preflight', self.image_preflight.stats)
+        if self.corpus:
+            metrics.register('corpus', self.corpus.stats)
+        self._added_parsers: List[int] = []
+        self._wakeup = asyncio.Event()
         self.is_running = False
    
     async def start(self):
         self.is_running = True
+        if not self.registry.loaded:
+            await self.registry.load(self.db)
+        if Config.DEDUP_ENABLED:
+            if self._restored:
+                await self.reconcile_state()
+            else:
+                await self.dedup_index.load(self.db)
+        self.pipeline.start()
+        self.enrich_pipeline.start()
+        self.revalidate_pipeline.start()
        
         while self.is_running:
             try:
@@ -26,63 +77,231 @@ class SchedulerService:
             except Exception as e:
                 logger.error(f"Scheduler xatosi: {e}")
            
-            await asyncio.sleep(Config.CHECK_INTERVAL)
+            await self._wait_next_cycle()
+
+        await self.pipeline.stop()
+        await self.drain_pipeline(self.enrich_pipeline, "boyitish")
+        await self.drain_pipeline(self.revalidate_pipeline, "qayta tekshiruv")
+        await self.flush_corpus()
+
+    async def drain_pipeline(self, pipeline: Pipeline, label: str):
+        left = await pipeline.drain(Config.SHUTDOWN_DRAIN_TIMEOUT)
+        await pipeline.stop()
+        if left:
+            metrics.inc('pipeline.dropped_on_stop', left)
+            logger.warning(f"To'xtatishda {label} navbatida {left} ta vazifa bajarilmay qoldi")
+
+    def _on_registry_change(self, event: str, parser: Dict):
+        if event == 'added':
+            logger.info(f"Parser {parser['id']}: registryga qo'shildi, darhol tekshiriladi")
+            self._added_parsers.append(parser['id'])
+            self._wakeup.set()
+        elif event == 'removed':
+            logger.info(f"Parser {parser['id']}: registrydan o'chirildi")
+            self.filters.forget(parser['id'])
+
+    async def _wait_next_cycle(self):
+        deadline = asyncio.get_running_loop().time() + Config.CHECK_INTERVAL
+        while self.is_running:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return
+
+            self._wakeup.clear()
+            added, self._added_parsers = self._added_parsers, []
+            parsers = [self.registry.get(parser_id) for parser_id in added]
+            try:
+                await self.check_parsers([parser for parser in parsers if parser])
+            except Exception as e:
+                logger.error(f"Scheduler xatosi: {e}")
    
     async def check_all_parsers(self):
-        parsers = await self.db.get_all_active_parsers()
-       
+        started = time.monotonic()
+        try:
+            await PrimingService.prime_pending(self.db)
+        except Exception as e:
+            logger.error(f"Priming xatosi: {e}")
+        await self.check_parsers(self.registry.all())
+        metrics.observe('scheduler.cycle_duration', time.monotonic() - started)
+        metrics.set('scheduler.last_cycle_at', time.time())
+        metrics.inc('scheduler.cycles')
+        self.log_pipeline_stats()
+        await self.evict_fingerprints()
+        await self.schedule_revalidation()
+        await self.flush_corpus()
+        await self.checkpoint()
+
+    def capture_state(self) -> Dict:
+        return {
+            'http': self.parser_service.http.dump(),
+            'file_ids': self.file_cache.dump(),
+            'dedup': self.dedup_index.dump() if Config.DEDUP_ENABLED else [],
+            'parser_checks': {
+                name: value for name, value in metrics.gauges.items()
+                if name.startswith('parser.') and name.endswith('.last_check')
+            }
+        }
+
+    def restore_state(self, state: Dict):
+        self.parser_service.http.restore(state.get('http', {}))
+        self.file_cache.restore(state.get('file_ids', []))
+        for name, value in state.get('parser_checks', {}).items():
+            metrics.set(name, value)
+        if Config.DEDUP_ENABLED and state.get('dedup'):
+            self.dedup_index.restore(state['dedup'])
+            self._restored = True
+        logger.info(
+            f"Snapshot tiklandi: {len(state.get('http', {}).get('hosts', {}))} ta host, "
+            f"{len(state.get('file_ids', []))} ta file_id, {len(state.get('dedup', []))} ta fingerprint "
+            f"({time.time() - state['saved_at']:.0f}s oldingi)"
+        )
+
+    async def reconcile_state(self):
+        try:
+            changes = await self.dedup_index.reconcile(self.db)
+            logger.info(
+                f"Snapshot DB bilan solishtirildi: {changes['added']} qo'shildi, {changes['removed']} o'chirildi, "
+                f"{changes['updated']} yangilandi, {changes['expired']} eskirdi"
+            )
+        except Exception as e:
+            logger.error(f"Snapshotni DB bilan solishtirishda xato, indeks qayta yuklanadi: {e}")
+            self.dedup_index = FingerprintIndex()
+            await self.dedup_index.load(self.db)
+
+    async def checkpoint(self, force: bool = False):
+        if not force and time.monotonic() - self._last_checkpoint < Config.SNAPSHOT_INTERVAL:
+            return
+        self._last_checkpoint = time.monotonic()
+        started = time.monotonic()
+        try:
+            size = await asyncio.to_thread(self.snapshot.save, self.capture_state())
+            metrics.observe('snapshot.save_latency', time.monotonic() - started)
+            metrics.set('snapshot.bytes', size)
+            logger.info(f"Snapshot saqlandi: {size} bayt ({time.monotonic() - started:.2f}s)")
+        except Exception as e:
+            logger.error(f"Snapshot saqlashda xato: {e}")
+
+    async def check_parsers(self, parsers: List[Dict]):
         for parser in parsers:
             try:
-                await self.check_parser(parser)
-                await asyncio.sleep(2)
+                await self.pipeline.submit(parser)
             except Exception as e:
                 logger.error(f"Parser {parser.get('id')} xatosi: {e}")
+
+        await self.pipeline.join()
    
-    async def find_last_seen_ad(self, parser_id: int, hrefs: List[str], check_limit: int = 10) -> Optional[int]:
-        check_hrefs = hrefs[:min(check_limit, len(hrefs))]
-        
-        for i, href in enumerate(check_hrefs):
-            is_parsed = await self.db.is_ad_parsed(parser_id, href)
-            if is_parsed:
-                logger.info(f"Parser {parser_id}: Avval yuborilgan elon topildi index {i}: {href}")
-                return i
-        
-        return None
-   
+    def _build_pipeline(self) -> Pipeline:
+        workers = Config.PIPELINE_WORKERS
+        size = Config.PIPELINE_QUEUE_SIZE
+        return Pipeline([
+            Stage('listing_fetch', self.fetch_listing, workers.get('listing_fetch', 1), size),
+            Stage('extract', self.extract_listing, workers.get('extract', 1), size),
+            Stage('novelty', self.filter_new_ads, workers.get('novelty', 1), size),
+            Stage('detail_fetch', self.fetch_details, workers.get('detail_fetch', 1), size),
+            Stage('detail_parse', self.parse_details, workers.get('detail_parse', 1), size),
+            Stage('archive', self.archive_ad, 1, size),
+            Stage('dedup', self.check_duplicate, 1, size),
+            Stage('preflight', self.preflight_images, workers.get('preflight', 1), size),
+            Stage('format', self.format_ad, workers.get('format', 1), size),
+            Stage('deliver', self.deliver_ad, workers.get('deliver', 1), size),
+        ])
+
+    def _build_enrich_pipeline(self) -> Pipeline:
+        size = Config.ENRICH_QUEUE_SIZE
+        return Pipeline([
+            Stage('enrich_fetch', self.fetch_enrichment, Config.PIPELINE_WORKERS.get('enrich_fetch', 1), size),
+            Stage('enrich_edit', self.edit_enriched, 1, size),
+        ])
+
+    def _build_revalidate_pipeline(self) -> Pipeline:
+        size = Config.REVALIDATE_QUEUE_SIZE
+        return Pipeline([
+            Stage('revalidate_fetch', self.fetch_revision, Config.PIPELINE_WORKERS.get('revalidate_fetch', 1), size),
+            Stage('revalidate_apply', self.apply_revision, 1, size),
+        ])
+
     async def check_parser(self, parser: dict):
+        self.pipeline.start()
+        await self.check_parsers([parser])
+
+    async def fetch_listing(self, parser: dict) -> Optional[Dict]:
+        if not self.registry.is_active(parser['id']):
+            return None
+
+        html = await self.parser_service.http.get_text(parser['url'])
+        metrics.set(f"parser.{parser['id']}.last_check", time.time())
+        metrics.inc(f"parser.{parser['id']}.checks")
+        await asyncio.sleep(Config.LISTING_DELAY)
+
+        if not html:
+            logger.info(f"Parser {parser['id']}: Hech qanday e'lon topilmadi.")
+            return None
+
+        return {'parser': parser, 'html': html}
+
+    async def extract_listing(self, job: Dict) -> Optional[Dict]:
+        parser = job['parser']
+        cards = await asyncio.to_thread(
+            self.parser_service.parse_listing_cards, job.pop('html'), parser['site_type']
+        )
+
+        if not cards:
+            logger.info(f"Parser {parser['id']}: Hech qanday e'lon topilmadi.")
+            return None
+
+        matched = self.filters.apply(parser, cards)
+        if len(matched) != len(cards):
+            metrics.inc('filter.rejected', len(cards) - len(matched))
+            logger.info(f"Parser {parser['id']}: Filter {len(cards) - len(matched)} ta e'lonni saraladi")
+
+        for card in matched:
+            card.pop('text', None)
+
+        events.debug('listing.extracted', "Parser {parser_id}: Joriy hreflar soni: {count}", parser_id=parser['id'], count=len(matched))
+        if not matched:
+            return None
+        return {'parser': parser, 'cards': matched, 'hrefs': [card['href'] for card in matched]}
+
+    async def filter_new_ads(self, job: Dict) -> Optional[List[Dict]]:
+        parser = job['parser']
         parser_id = parser['id']
-        url = parser['url']
-        channel_id = parser['channel_id']
-        site_type = parser['site_type']
-        filter_text = parser['filter_text']
+        current_hrefs = job['hrefs']
+        cards = {card['href']: card for card in job.get('cards', [])}
 
-        current_hrefs = await self.parser_service.get_listings(url, site_type, filter_text)
+        if not self.registry.is_active(parser_id):
+            return None
 
-        if not current_hrefs:
-            logger.info(f"Parser {parser_id}: Hech qanday e'lon topilmadi.")
-            return
+        last_known_href, watermark = await self.db.get_bookmark(parser_id)
+        events.debug('novelty.bookmark', "Parser {parser_id}: Bookmark: {href} (ID {watermark})",
+                     parser_id=parser_id, href=last_known_href, watermark=watermark)
 
-        logger.info(f"Parser {parser_id}: Joriy hreflar soni: {len(current_hrefs)}")
+        ad_ids = {href: (cards.get(href) or {}).get('ad_id') for href in current_hrefs}
+        candidates = self.watermark_candidates(watermark, ad_ids, current_hrefs)
+        metrics.inc('novelty.watermark_skipped', len(current_hrefs) - len(candidates))
 
-        last_known_href = await self.db.get_last_known_href(parser_id)
-        logger.info(f"Parser {parser_id}: Bookmark (diagnostika): {last_known_href}")
+        try:
+            parsed = await self.db.get_parsed_hrefs(parser_id, list(candidates))
+        except Exception as e:
+            logger.error(f"Parser {parser_id}: parsed_ads tekshirayotganda xato: {e}")
+            parsed = set()
+        metrics.inc('novelty.db_checked', len(candidates))
 
         new_hrefs: List[str] = []
+        deferred: List[str] = []
 
         MAX_NEW = 50              
         MAX_CONSEC_OLD = 5     
         consec_old = 0
 
         for href in current_hrefs:
-            try:
-                is_parsed = await self.db.is_ad_parsed(parser_id, href)
-            except Exception as e:
-                logger.error(f"Parser {parser_id}: is_ad_parsed tekshirayotganda xato ({href}): {e}")
-                is_parsed = False
-
-            if is_parsed:
+            if href not in candidates or href in parsed:
                 consec_old += 1
-                logger.debug(f"Parser {parser_id}: Oldin yuborilgan e'lon – {href} (ketma-ket {consec_old})")
+                events.debug('novelty.old_ad', "Parser {parser_id}: Oldin yuborilgan e'lon – {href} (ketma-ket {streak})",
+                             parser_id=parser_id, href=href, streak=consec_old)
                 if consec_old >= MAX_CONSEC_OLD:
                     logger.info(
                         f"Parser {parser_id}: Ketma-ket {MAX_CONSEC_OLD} ta eski e'lon topildi, "
@@ -91,107 +310,707 @@ class SchedulerService:
                     break
                 continue
 
+            if len(new_hrefs) >= MAX_NEW:
+                deferred.append(href)
+                continue
+
             consec_old = 0
             new_hrefs.append(href)
-            logger.info(f"Parser {parser_id}: Yangi e'lon topildi: {href}")
+            events.info('novelty.new_ad', "Parser {parser_id}: Yangi e'lon topildi: {href}", parser_id=parser_id, href=href)
 
-            if len(new_hrefs) >= MAX_NEW:
-                logger.warning(
-                    f"Parser {parser_id}: {MAX_NEW} ta yangi e'lon limitiga yetdik, "
-                    f"keyingilar keyingi siklga qoldiriladi."
-                )
-                break
+        if deferred:
+            logger.warning(
+                f"Parser {parser_id}: {MAX_NEW} ta yangi e'lon limitiga yetdik, "
+                f"{len(deferred)} tasi keyingi siklga qoldiriladi."
+            )
+
+        try:
+            new_bookmark = current_hrefs[0]
+            new_watermark = self.next_watermark(watermark, ad_ids, new_hrefs + deferred)
+            await self.db.set_bookmark(parser_id, new_bookmark, new_watermark, wait=False)
+            events.debug('novelty.bookmark_saved', "Parser {parser_id}: Bookmark yangilandi: {href} (ID {watermark})",
+                         parser_id=parser_id, href=new_bookmark, watermark=new_watermark)
+        except Exception as e:
+            logger.error(f"Parser {parser_id}: Bookmark yangilashda xato: {e}")
 
         if not new_hrefs:
-            logger.info(f"Parser {parser_id}: Yangi e'lon topilmadi.")
-            try:
-                if current_hrefs:
-                    await self.db.set_last_known_href(parser_id, current_hrefs[0])
-            except Exception as e:
-                logger.error(f"Parser {parser_id}: Bookmark yangilashda xato: {e}")
-            return
+            events.debug('novelty.none', "Parser {parser_id}: Yangi e'lon topilmadi.", parser_id=parser_id)
+            return None
 
         logger.info(f"Parser {parser_id}: {len(new_hrefs)} ta yangi e'lon yuboriladi.")
+        metrics.inc(f"parser.{parser_id}.new_ads", len(new_hrefs))
+        first_seen_at = time.time()
+        jobs = [
+            {'parser': parser, 'href': href, 'card': cards.get(href), 'first_seen_at': first_seen_at}
+            for href in new_hrefs
+        ]
+        return self.batch_burst(parser, jobs)
 
-        sent_count = 0
+    def batch_burst(self, parser: Dict, jobs: List[Dict]) -> List[Dict]:
+        threshold = parser.get('burst_threshold')
+        if threshold is None:
+            threshold = Config.DIGEST_THRESHOLD
+        if not threshold or len(jobs) <= threshold:
+            return jobs
 
-        for href in new_hrefs:
-            try:
-                details = await self.parser_service.get_ad_details(href, site_type)
+        full, rest = jobs[:Config.DIGEST_FULL_POSTS], jobs[Config.DIGEST_FULL_POSTS:]
+        for job in rest:
+            job['details'] = self.parser_service.card_details(job['card'] or {'href': job['href']}, parser['site_type'])
+
+        digests = [
+            {'parser': parser, 'href': chunk[0]['href'], 'digest': chunk}
+            for chunk in (
+                rest[i:i + Config.DIGEST_CHUNK_SIZE] for i in range(0, len(rest), Config.DIGEST_CHUNK_SIZE)
+            )
+        ]
+        logger.info(
+            f"Parser {parser['id']}: {len(jobs)} ta yangi e'lon oqimi – {len(full)} tasi to'liq, "
+            f"{len(rest)} tasi {len(digests)} ta jamlanma xabarda yuboriladi."
+        )
+        return full + digests
+
+    @staticmethod
+    def watermark_candidates(watermark: Optional[int], ad_ids: Dict[str, Optional[int]], hrefs: List[str]) -> set:
+        if watermark is None:
+            return set(hrefs)
+        candidates = set()
+        below = None
+        for href in reversed(hrefs):
+            ad_id = ad_ids[href]
+            if ad_id is None:
+                candidates.add(href)
+                continue
+            if ad_id > watermark:
+                candidates.add(href)
+            elif below is not None and ad_id < below:
+                candidates.add(href)
+                metrics.inc('novelty.out_of_order')
+            below = ad_id if below is None else max(below, ad_id)
+        return candidates
+
+    @staticmethod
+    def next_watermark(watermark: Optional[int], ad_ids: Dict[str, Optional[int]], pending: List[str]) -> Optional[int]:
+        seen = [ad_id for ad_id in ad_ids.values() if ad_id is not None]
+        if not seen:
+            return watermark
+        highest = max(seen)
+        pending_ids = [
+            ad_ids[href] for href in pending
+            if ad_ids[href] is not None and (watermark is None or ad_ids[href] > watermark)
+        ]
+        if pending_ids:
+            highest = min(highest, min(pending_ids) - 1)
+        return highest if watermark is None else max(watermark, highest)
+
+    async def fetch_details(self, job: Dict) -> Optional[Dict]:
+        parser = job['parser']
+        if 'digest' in job:
+            return job
+        if parser.get('lite_mode') and job.get('card'):
+            job['details'] = self.parser_service.card_details(job['card'], parser['site_type'])
+            metrics.inc('lite.detail_skipped')
+            return job
+
+        url = self.parser_service.ad_url(job['href'], parser['site_type'])
+        response = await self.parser_service.http.fetch(url)
+
+        if not response or response['status'] != 200:
+            events.warning('detail.missing', "Parser {parser_id}: E'lon tafsilotlari olinmadi: {href}",
+                           parser_id=parser['id'], href=job['href'])
+            return None
+
+        job['html'] = response['text']
+        job['revision'] = dict(validators(response['headers']), body_hash=body_fingerprint(response['text']))
+        return job
 
-                if not details:
-                    logger.warning(f"Parser {parser_id}: E'lon tafsilotlari olinmadi: {href}")
-                    continue
+    async def parse_details(self, job: Dict) -> Optional[Dict]:
+        parser = job['parser']
+        if 'details' in job or 'digest' in job:
+            return job
 
-                await self.send_to_channel(channel_id, details, site_type)
-                await self.db.add_parsed_ad(parser_id, href)
-                sent_count += 1
-                logger.info(f"Parser {parser_id}: ✅ Yuborildi ({sent_count}/{len(new_hrefs)}): {href}")
+        details = await asyncio.to_thread(
+            self.parser_service.parse_ad_details, job.pop('html'), job['href'], parser['site_type']
+        )
 
-                await asyncio.sleep(3) 
+        if not details:
+            events.warning('detail.missing', "Parser {parser_id}: E'lon tafsilotlari olinmadi: {href}",
+                           parser_id=parser['id'], href=job['href'])
+            return None
 
+        job['details'] = details
+        return job
+
+    async def archive_ad(self, job: Dict) -> Dict:
+        if not self.corpus:
+            return job
+        scraped_at = time.time()
+        for item in job.get('digest', [job]):
+            self.corpus.add(self.corpus_record(item['parser'], item['details'], scraped_at))
+        if self.corpus.pending >= Config.CORPUS_FLUSH_RECORDS:
+            await self.flush_corpus()
+        return job
+
+    def corpus_record(self, parser: Dict, details: Dict, scraped_at: float, source: str = 'scrape') -> Dict:
+        record = {
+            'ad_id': self.parser_service.ad_id(details['href'], parser['site_type']),
+            'site': parser['site_type'],
+            'parser_id': parser['id'],
+            'scraped_at': scraped_at,
+            'source': source,
+        }
+        record.update((key, value) for key, value in details.items() if key not in Config.CORPUS_EXCLUDE_FIELDS)
+        return record
+
+    async def flush_corpus(self):
+        if not self.corpus:
+            return
+        try:
+            await self.corpus.flush()
+        except Exception as e:
+            logger.error(f"Korpusga yozishda xato: {e}")
+
+    async def check_duplicate(self, job: Dict) -> Optional[Dict]:
+        if not Config.DEDUP_ENABLED:
+            return job
+
+        if 'digest' in job:
+            items = []
+            for item in job['digest']:
+                if await self.check_duplicate(item):
+                    items.append(item)
+            job['digest'] = items
+            return job if items else None
+
+        parser = job['parser']
+        details = job['details']
+        if not self.dedup_index.is_detailed(details):
+            metrics.inc('dedup.coarse_skipped')
+            return job
+
+        fingerprint = self.dedup_index.fingerprint(details)
+        job['fingerprint'] = fingerprint
+
+        match = self.dedup_index.find(parser['channel_id'], fingerprint)
+        if not match:
+            job['fingerprint_entry'] = self.dedup_index.add(
+                parser['channel_id'], fingerprint, job['href'], details.get('price')
+            )
+            return job
+
+        price_changed = normalize_price(match['price']) != normalize_price(details.get('price'))
+        if not price_changed or not Config.DEDUP_PRICE_CHANGE_NOTICE:
+            events.info('dedup.skipped', "Parser {parser_id}: Takroriy e'lon o'tkazib yuborildi: {href} ~ {match}",
+                        parser_id=parser['id'], href=job['href'], match=match['href'])
+            await self.db.add_parsed_ad(parser['id'], job['href'], wait=False)
+            metrics.inc('dedup.skipped')
+            return None
+
+        logger.info(f"Parser {parser['id']}: Qayta joylangan e'lon narxi o'zgardi: {job['href']} ~ {match['href']}")
+        metrics.inc('dedup.price_changed')
+        job['price_change'] = match
+        job['old_price'] = match['price']
+        return job
+
+    async def evict_fingerprints(self):
+        now = time.time()
+        if not Config.DEDUP_ENABLED or now - self._last_dedup_evict < 3600:
+            return
+        self._last_dedup_evict = now
+        try:
+            self.dedup_index.evict_expired(now)
+            await self.db.delete_old_fingerprints(now - self.dedup_index.window)
+        except Exception as e:
+            logger.error(f"Fingerprint indeksini tozalashda xato: {e}")
+
+    async def preflight_images(self, job: Dict) -> Dict:
+        details = job.get('details') or {}
+        images = details.get('images')
+        if not Config.IMAGE_PREFLIGHT_ENABLED or not images or 'digest' in job or job.get('price_change'):
+            return job
+
+        images = list(dict.fromkeys(images))[:10]
+        resolved = dict(zip(images, await self.file_cache.resolve(images)))
+        known = [url for url, used in resolved.items() if used != url]
+        kept, verified = await self.image_preflight.filter(images, known)
+        details['images'] = kept
+        details['media'] = [resolved[url] for url in kept]
+        details['verified_images'] = verified
+        return job
+
+    async def format_ad(self, job: Dict) -> Dict:
+        if 'digest' in job:
+            items = []
+            for item in job['digest']:
+                details = item['details']
+                if item.get('price_change'):
+                    details = {**details, 'old_price': item['old_price']}
+                items.append(details)
+            job['message'] = self.parser_service.format_digest(items, job['parser']['site_type'])
+        elif job.get('price_change'):
+            job['message'] = self.parser_service.format_price_change(job['details'], job['old_price'])
+        else:
+            job['message'] = self.parser_service.format_message(
+                job['details'], job['parser']['site_type'], job['parser'].get('template'),
+                (job.get('revision') or {}).get('body_hash')
+            )
+        return job
+
+    async def deliver_ad(self, job: Dict) -> Optional[Dict]:
+        parser = job['parser']
+        parser_id = parser['id']
+        href = job['href']
+
+        if not self.registry.is_active(parser_id):
+            logger.info(f"Parser {parser_id}: o'chirilgan, e'lon yuborilmaydi: {href}")
+            return None
+
+        posted = FreshnessTracker.posted_at(job)
+        if posted:
+            job['posted_at'], job['posted_precise'] = posted
+
+        if 'digest' in job:
+            await self.deliver_digest(job)
+            await asyncio.sleep(Config.SEND_DELAY)
+            return job
+
+        delivered_at = None
+        if job.get('price_change'):
+            await self.send_price_change(parser['channel_id'], job)
+        else:
+            sent = await self.send_to_channel(parser['channel_id'], job['details'], parser['site_type'], job['message'])
+            if 'fingerprint_entry' in job:
+                await self.remember_fingerprint(job['fingerprint_entry'], sent)
+            if sent:
+                delivered_at = time.time()
+                FreshnessTracker.record(job, delivered_at)
+            if sent and job['details'].get('lite') and Config.LITE_ENRICH:
+                self.schedule_enrichment(job, sent[0])
+        await self.db.add_parsed_ad(
+            parser_id, href, wait=False,
+            posted_at=job.get('posted_at'),
+            posted_precise=job.get('posted_precise', False),
+            first_seen_at=job.get('first_seen_at'),
+            delivered_at=delivered_at
+        )
+        if delivered_at and Config.REVALIDATE_ENABLED and 'revision' in job:
+            await self.track_revision(job, sent, delivered_at)
+        events.info('deliver.sent', "Parser {parser_id}: ✅ Yuborildi: {href}", parser_id=parser_id, href=href)
+
+        await asyncio.sleep(Config.SEND_DELAY)
+        return job
+
+    async def deliver_digest(self, job: Dict):
+        parser = job['parser']
+        items = job['digest']
+        try:
+            sent = [await self.bot.send_message(
+                chat_id=parser['channel_id'],
+                text=job['message'],
+                parse_mode='HTML',
+                disable_web_page_preview=True
+            )]
+        except Exception as e:
+            logger.error(f"Parser {parser['id']}: jamlanma xabarni yuborishda xato: {e}")
+            sent = None
+
+        delivered_at = time.time() if sent else None
+        for item in items:
+            posted = FreshnessTracker.posted_at(item)
+            if posted:
+                item['posted_at'], item['posted_precise'] = posted
+            if 'fingerprint_entry' in item:
+                await self.remember_fingerprint(item['fingerprint_entry'], sent)
+            if item.get('price_change') and sent:
+                await self.update_price_change(item)
+            if sent:
+                FreshnessTracker.record(item, delivered_at)
+            await self.db.add_parsed_ad(
+                parser['id'], item['href'], wait=False,
+                posted_at=item.get('posted_at'),
+                posted_precise=item.get('posted_precise', False),
+                first_seen_at=item.get('first_seen_at'),
+                delivered_at=delivered_at
+            )
+
+        if sent:
+            metrics.inc('digest.messages')
+            metrics.inc('digest.ads', len(items))
+            metrics.inc('telegram.calls_saved', len(items) - 1)
+        logger.info(f"Parser {parser['id']}: ✅ Jamlanma yuborildi: {len(items)} ta e'lon")
+
+    def schedule_enrichment(self, job: Dict, sent: Message):
+        enrichment = {
+            'parser': job['parser'],
+            'href': job['href'],
+            'chat_id': job['parser']['channel_id'],
+            'message_id': sent.message_id,
+            'has_media': bool(job['details'].get('images'))
+        }
+        if not self.enrich_pipeline.try_submit(enrichment):
+            metrics.inc('lite.enrich_dropped')
+            events.debug('lite.enrich_dropped', "Parser {parser_id}: boyitish navbati to'la, o'tkazib yuborildi: {href}",
+                         parser_id=job['parser']['id'], href=job['href'])
+
+    async def fetch_enrichment(self, job: Dict) -> Optional[Dict]:
+        parser = job['parser']
+        if not self.registry.is_active(parser['id']):
+            return None
+
+        details = await self.parser_service.get_ad_details(job['href'], parser['site_type'])
+        if not details:
+            return None
+
+        job['message'] = self.parser_service.format_message(details, parser['site_type'], parser.get('template'))
+        return job
+
+    async def edit_post(self, chat_id: str, message_id: int, has_media: bool, text: str):
+        if has_media:
+            await self.bot.edit_message_caption(
+                chat_id=chat_id,
+                message_id=message_id,
+                caption=text,
+                parse_mode='HTML'
+            )
+        else:
+            await self.bot.edit_message_text(
+                chat_id=chat_id,
+                message_id=message_id,
+                text=text,
+                parse_mode='HTML',
+                disable_web_page_preview=False
+            )
+
+    async def edit_enriched(self, job: Dict) -> Optional[Dict]:
+        try:
+            await self.edit_post(job['chat_id'], job['message_id'], job['has_media'], job['message'])
+        except Exception as e:
+            logger.error(f"Parser {job['parser']['id']}: xabarni boyitishda xato {job['href']}: {e}")
+            return None
+        finally:
+            await asyncio.sleep(Config.SEND_DELAY)
+
+        metrics.inc('lite.enriched')
+        return job
+
+    async def track_revision(self, job: Dict, sent: List[Message], delivered_at: float):
+        details = job['details']
+        values = dict(
+            job['revision'],
+            message_id=sent[0].message_id,
+            has_media=int(bool(sent[0].photo)),
+            price=details.get('price'),
+            content_hash=content_fingerprint(details),
+            **RevalidationSchedule.initial(delivered_at)
+        )
+        try:
+            await self.db.set_revalidation(job['parser']['id'], job['href'], values)
+        except Exception as e:
+            logger.error(f"Parser {job['parser']['id']}: qayta tekshiruv jadvalini saqlashda xato: {e}")
+
+    async def schedule_revalidation(self):
+        if not Config.REVALIDATE_ENABLED:
+            return
+        if any(stage['depth'] for stage in self.pipeline.stats()):
+            metrics.inc('revalidate.deferred')
+            return
+
+        now = time.time()
+        try:
+            rows = await self.db.get_due_revalidations(now, Config.REVALIDATE_BATCH)
+        except Exception as e:
+            logger.error(f"Qayta tekshiriladigan e'lonlarni olishda xato: {e}")
+            return
+
+        for row in rows:
+            if not self.revalidate_pipeline.try_submit(row):
+                metrics.inc('revalidate.queue_full')
+                break
+            try:
+                await self.db.set_revalidation(row['parser_id'], row['href'], RevalidationSchedule.retry(now))
             except Exception as e:
-                logger.error(f"Parser {parser_id}: E'lon yuborishda xato {href}: {e}")
-                continue
+                logger.error(f"Parser {row['parser_id']}: qayta tekshiruv vaqtini belgilashda xato {row['href']}: {e}")
+        if rows:
+            events.debug('revalidate.scheduled', "{count} ta e'lon qayta tekshiruvga qo'yildi", count=len(rows))
+
+    async def fetch_revision(self, row: Dict) -> Optional[Dict]:
+        if not self.registry.is_active(row['parser_id']):
+            return None
+
+        url = self.parser_service.ad_url(row['href'], row['site_type'])
+        response = await self.parser_service.http.fetch(url, conditional_headers(row))
+        metrics.inc('revalidate.checked')
+        now = time.time()
+        status = response['status'] if response else None
+
+        if status is None or status in (403, 429) or status >= 500:
+            metrics.inc('revalidate.retry')
+            return None
+        if status in REMOVED_STATUSES:
+            row['change'] = 'removed'
+            return row
+        if status != 200:
+            counter = 'revalidate.not_modified' if status == 304 else 'revalidate.skipped'
+            await self._finish_revision(row, {}, changed=False, now=now, counter=counter)
+            return None
+
+        values = dict(validators(response['headers']), body_hash=body_fingerprint(response['text']))
+        if values['body_hash'] == row['body_hash']:
+            await self._finish_revision(row, values, changed=False, now=now, counter='revalidate.body_unchanged')
+            return None
+
+        details = await asyncio.to_thread(
+            self.parser_service.parse_ad_details, response.pop('text'), row['href'], row['site_type']
+        )
+        if not details or not details.get('title'):
+            await self._finish_revision(row, {}, changed=False, now=now, counter='revalidate.unparsed')
+            return None
+
+        values['content_hash'] = content_fingerprint(details)
+        if values['content_hash'] == row['content_hash']:
+            await self._finish_revision(row, values, changed=False, now=now, counter='revalidate.unchanged')
+            return None
+
+        values['price'] = details.get('price')
+        row.update(change='updated', details=details, values=values)
+        if self.corpus:
+            parser = {'id': row['parser_id'], 'site_type': row['site_type']}
+            self.corpus.add(self.corpus_record(parser, details, now, source='revalidate'))
+        return row
+
+    async def apply_revision(self, row: Dict) -> Optional[Dict]:
+        parser = self.registry.get(row['parser_id'])
+        if not parser:
+            return None
+
+        try:
+            if row['change'] == 'removed':
+                await self._reply_to_post(row, self.parser_service.format_ad_removed(
+                    self.parser_service.ad_url(row['href'], row['site_type'])
+                ))
+                await self.db.set_revalidation(
+                    row['parser_id'], row['href'], dict(RevalidationSchedule.stop(), ad_status='removed')
+                )
+                metrics.inc('revalidate.removed')
+                logger.info(f"Parser {row['parser_id']}: e'lon olib tashlangan: {row['href']}")
+                return row
 
+            details = row['details']
+            price_changed = normalize_price(row['price']) != normalize_price(details.get('price'))
+            if Config.REVALIDATE_NOTIFY == 'edit':
+                message = self.parser_service.format_message(
+                    details, row['site_type'], parser.get('template'), row['values']['body_hash']
+                )
+                await self.edit_post(row['channel_id'], row['message_id'], bool(row['has_media']), message)
+                metrics.inc('revalidate.edited')
+            elif price_changed:
+                await self._reply_to_post(row, self.parser_service.format_price_change(details, row['price']))
+                metrics.inc('revalidate.notified')
+        except TelegramBadRequest as e:
+            if 'not modified' not in str(e):
+                logger.warning(f"Parser {row['parser_id']}: e'lon xabarini yangilab bo'lmadi, kuzatuv to'xtatildi: {e}")
+                await self.db.set_revalidation(row['parser_id'], row['href'], RevalidationSchedule.stop())
+                return None
+        except Exception as e:
+            logger.error(f"Parser {row['parser_id']}: qayta tekshiruv natijasini yuborishda xato {row['href']}: {e}")
+            return None
+        finally:
+            await asyncio.sleep(Config.SEND_DELAY)
+
+        await self._finish_revision(row, row['values'], changed=True, now=time.time(), counter='revalidate.changed')
+        if price_changed:
+            logger.info(f"Parser {row['parser_id']}: narx o'zgardi {row['price']} → {details.get('price')}: {row['href']}")
+        else:
+            logger.info(f"Parser {row['parser_id']}: e'lon ma'lumotlari o'zgardi: {row['href']}")
+        return row
+
+    async def _reply_to_post(self, row: Dict, text: str):
+        await self.bot.send_message(
+            chat_id=row['channel_id'],
+            text=text,
+            parse_mode='HTML',
+            reply_to_message_id=row['message_id'],
+            allow_sending_without_reply=True
+        )
+
+    async def _finish_revision(self, row: Dict, values: Dict, changed: bool, now: float, counter: str):
+        metrics.inc(counter)
+        values = dict(values, **RevalidationSchedule.after_check(row, changed, now))
         try:
-            if current_hrefs:
-                new_bookmark = current_hrefs[0]
-                await self.db.set_last_known_href(parser_id, new_bookmark)
-                logger.info(f"Parser {parser_id}: Bookmark yangilandi: {new_bookmark}")
+            await self.db.set_revalidation(row['parser_id'], row['href'], values)
         except Exception as e:
-            logger.error(f"Parser {parser_id}: Bookmark yangilashda xato: {e}")
+            logger.error(f"Parser {row['parser_id']}: qayta tekshiruv jadvalini yangilashda xato: {e}")
+
+    async def remember_fingerprint(self, entry: Dict, sent: Optional[List[Message]]):
+        if not sent:
+            self.dedup_index.remove(entry['id'])
+            return
+
+        entry['message_id'] = sent[0].message_id
+        try:
+            entry['row_id'] = await self.db.add_fingerprint(
+                entry['channel_id'], entry['href'], to_signed(entry['simhash']), entry['price'],
+                entry['message_id'], entry['created_at']
+            )
+        except Exception as e:
+            logger.error(f"Fingerprint saqlashda xato: {e}")
+
+    async def send_price_change(self, channel_id: str, job: Dict):
+        match = job['price_change']
+        try:
+            await self.bot.send_message(
+                chat_id=channel_id,
+                text=job['message'],
+                parse_mode='HTML',
+                reply_to_message_id=match['message_id'],
+                allow_sending_without_reply=True
+            )
+        except Exception as e:
+            logger.error(f"Narx o'zgarishini yuborishda xato: {e}")
+            return
+
+        await self.update_price_change(job)
+
+    async def update_price_change(self, job: Dict):
+        match = job['price_change']
+        match['href'] = job['href']
+        match['price'] = job['details'].get('price')
+        if match.get('row_id'):
+            try:
+                await self.db.update_fingerprint(match['row_id'], match['href'], match['price'])
+            except Exception as e:
+                logger.error(f"Fingerprint yangilashda xato: {e}")
+
+    def pipeline_stats(self) -> List[Dict]:
+        return self.pipeline.stats() + self.enrich_pipeline.stats() + self.revalidate_pipeline.stats()
+
+    def log_pipeline_stats(self):
+        parts = [
+            f"{s['name']}[w={s['workers']} q={s['depth']}/{s['maxsize']} ok={s['processed']} "
+            f"drop={s['dropped']} err={s['errors']} {s['throughput']:.2f}/s]"
+            for s in self.pipeline_stats()
+        ]
+        logger.info("Pipeline: " + ' '.join(parts))
+
+        hosts = [
+            f"{h['host']}[{h['state']} c={h['concurrency']} gap={h['spacing']}s err={h['error_rate']:.0%}]"
+            for h in self.parser_service.http.host_stats()
+        ]
+        if hosts:
+            logger.info("Hostlar: " + ' '.join(hosts))
 
-    async def send_to_channel(self, channel_id: str, details: Dict, site_type: str = 'olx'):
+        freshness = []
+        for site in ('olx', 'avtoelon'):
+            timing = metrics.timing(f"freshness.site.{site}")
+            if timing:
+                freshness.append(f"{site}[n={timing['count']} p50={timing['p50']:.0f}s p95={timing['p95']:.0f}s]")
+        if freshness:
+            logger.info("Yangilik (e'londan kanalgacha): " + ' '.join(freshness))
+
+    async def send_to_channel(self, channel_id: str, details: Dict, site_type: str = 'olx', message: Optional[str] = None) -> Optional[List[Message]]:
         try:
-            message = self.parser_service.format_message(details, site_type)
-            images = details.get('images', [])
+            if message is None:
+                message = self.parser_service.format_message(details, site_type)
+            images = details.get('images', [])[:10]
             
             if not images:
-                await self.bot.send_message(
+                sent = await self.bot.send_message(
                     chat_id=channel_id,
                     text=message,
                     parse_mode='HTML',
                     disable_web_page_preview=False
                 )
-            elif len(images) == 1:
-                await self.bot.send_photo(
-                    chat_id=channel_id,
-                    photo=images[0],
-                    caption=message,
-                    parse_mode='HTML'
-                )
-            else:
-                media_group = []
-                for i, img_url in enumerate(images[:10]):
-                    try:
-                        if i == 0:
-                            media_group.append(
-                                InputMediaPhoto(media=img_url, caption=message, parse_mode='HTML')
-                            )
-                        else:
-                            media_group.append(InputMediaPhoto(media=img_url))
-                    except Exception as e:
-                        logger.error(f"Rasm qo'shishda xato: {e}")
-                        continue
-               
-                if media_group:
-                    await self.bot.send_media_group(
-                        chat_id=channel_id,
-                        media=media_group
-                    )
-                else:
-                    logger.warning("Media group yaratilmadi, oddiy xabar yuborilmoqda")
-                    await self.bot.send_message(
-                        chat_id=channel_id,
-                        text=message,
-                        parse_mode='HTML',
-                        disable_web_page_preview=False
-                    )
+                return [sent]
+
+            media = details.get('media')
+            if media is None or len(media) != len(images):
+                media = await self.file_cache.resolve(images)
+            error = None
+            try:
+                sent = await self._send_photos(channel_id, media, message)
+            except TelegramBadRequest as e:
+                error = e
+            if error and media != images:
+                logger.warning(f"Keshdagi file_id rad etildi, URL bilan qayta yuborilmoqda: {error}")
+                await self.file_cache.forget(images)
+                media = images
+                try:
+                    sent = await self._send_photos(channel_id, media, message)
+                    error = None
+                except TelegramBadRequest as e:
+                    error = e
+            if error:
+                verified = [url for url in images if url in details.get('verified_images', ())]
+                images = media = verified if len(verified) < len(images) else []
+                sent = await self._repair_photos(channel_id, images, message, error)
+
+            await self.file_cache.remember(images, media, sent)
+            return sent
            
         except Exception as e:
             logger.error(f"Channelga yuborishda xato: {e}")
+            return None
+
+    async def _repair_photos(self, channel_id: str, images: List[str], message: str, error: Exception) -> List[Message]:
+        if images:
+            logger.warning(f"Media group rad etildi, {len(images)} ta tekshirilgan rasm bilan qayta yuborilmoqda: {error}")
+            try:
+                sent = await self._send_photos(channel_id, images, message)
+                metrics.inc('image.group_repaired')
+                return sent
+            except TelegramBadRequest as e:
+                error = e
+        return await self._send_without_photos(channel_id, message, error)
+
+    async def _send_without_photos(self, channel_id: str, message: str, error: Exception) -> List[Message]:
+        logger.warning(f"Rasmlar rad etildi, e'lon rasmsiz yuborilmoqda: {error}")
+        metrics.inc('image.group_failed')
+        sent = await self.bot.send_message(
+            chat_id=channel_id,
+            text=message,
+            parse_mode='HTML',
+            disable_web_page_preview=False
+        )
+        return [sent]
+
+    async def _send_photos(self, channel_id: str, media: List[str], message: str) -> List[Message]:
+        if len(media) == 1:
+            sent = await self.bot.send_photo(
+                chat_id=channel_id,
+                photo=media[0],
+                caption=message,
+                parse_mode='HTML'
+            )
+            return [sent]
+
+        media_group = []
+        for i, photo in enumerate(media):
+            try:
+                if i == 0:
+                    media_group.append(
+                        InputMediaPhoto(media=photo, caption=message, parse_mode='HTML')
+                    )
+                else:
+                    media_group.append(InputMediaPhoto(media=photo))
+            except Exception as e:
+                logger.error(f"Rasm qo'shishda xato: {e}")
+                continue
+
+        if media_group:
+            return await self.bot.send_media_group(
+                chat_id=channel_id,
+                media=media_group
+            )
+
+        logger.warning("Media group yaratilmadi, oddiy xabar yuborilmoqda")
+        sent = await self.bot.send_message(
+            chat_id=channel_id,
+            text=message,
+            parse_mode='HTML',
+            disable_web_page_preview=False
+        )
+        return [sent]
    
     def stop(self):
         self.is_running = False
+        self._wakeup.set()
         logger.info("Scheduler to'xtatildi")
\ No newline at end of file
@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+import time
+import zlib
+from typing import Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_VERSION = 2
+STATE_FIELDS = {'http': dict, 'file_ids': list, 'dedup': list, 'parser_checks': dict}
+
+
+class StateSnapshot:
+
+    def __init__(self, path: str = Config.SNAPSHOT_PATH, max_age: float = Config.SNAPSHOT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+
+    def save(self, state: Dict) -> int:
+        document = {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'state': {name: state[name] for name in STATE_FIELDS if name in state}
+        }
+        payload = zlib.compress(json.dumps(document, separators=(',', ':')).encode('utf-8'), 6)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        return len(payload)
+
+    def load(self) -> Optional[Dict]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                data = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        except Exception as e:
+            logger.warning(f"Snapshot o'qilmadi ({self.path}): {e}")
+            return None
+
+        version = data.get('version') if isinstance(data, dict) else None
+        if version != SNAPSHOT_VERSION or not isinstance(data.get('saved_at'), (int, float)):
+            logger.warning(f"Snapshot versiyasi mos emas: {version}")
+            return None
+        age = time.time() - data['saved_at']
+        if age > self.max_age:
+            logger.warning(f"Snapshot juda eski ({age:.0f}s), e'tiborsiz qoldirildi")
+            return None
+
+        raw = data.get('state') if isinstance(data.get('state'), dict) else {}
+        state = {name: raw[name] for name, kind in STATE_FIELDS.items() if isinstance(raw.get(name), kind)}
+        state['saved_at'] = data['saved_at']
+        return state
@@ -0,0 +1,188 @@
+import hashlib
+import html
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from services.metrics_service import metrics
+
+TOKEN_RE = re.compile(r'\{([?/]?)(\w+)\}')
+
+PARAM_LABELS = {
+    'Объем двигателя, л': 'Hajm',
+    'Объем двигателя': 'Hajm',
+    'Пробег': 'Probeg',
+    'Коробка передач': 'Korobka',
+    'Цвет': 'Rangi',
+    'Состояние краски': 'Kraska holati',
+}
+SPEC_KEYS = {
+    'avtoelon': (
+        'Объем двигателя, л', 'Объем двигателя', 'Пробег',
+        'Коробка передач', 'Цвет', 'Состояние краски'
+    ),
+    'olx': (
+        'Объем двигателя, л', 'Объем двигателя', 'Пробег',
+        'Коробка передач', 'Цвет', 'Вид топлива', 'Кузов',
+        'Состояние краски', 'Привод'
+    ),
+}
+FIELDS = ('title', 'url', 'price', 'year', 'mileage', 'location', 'specs', 'description', 'site')
+
+BUILTIN_TEMPLATES = {
+    'avtoelon': (
+        "🚗 <a href='{url}'><b>{title}</b></a>\n\n"
+        "{?price}💰 <b>{price}</b>\n\n{/price}"
+        "📋 <b>Ma'lumotlar:</b>\n"
+        "{?year}▫️ Yili: {year}\n{/year}"
+        "{specs}"
+        "{?location}\n📍 <b>Manzil:</b> {location}\n{/location}"
+        "\n"
+        "{?description}📝 {description}\n\n{/description}"
+        "🔗 <a href='{url}'>E'lonni to'liq ko'rish</a>"
+    ),
+    'olx': (
+        "🚗 <a href='{url}'><b>{title}</b></a>\n\n"
+        "{?price}💰 <b>{price}</b>\n\n{/price}"
+        "{?specs}📋 <b>Ma'lumotlar:</b>\n"
+        "{?year}▫️ <b>Yili:</b> {year}\n{/year}"
+        "{specs}\n{/specs}"
+        "{?description}📝 {description}\n\n{/description}"
+        "🔗 <a href='{url}'>E'lonni to'liq ko'rish</a>"
+    ),
+    'compact': (
+        "🚗 <a href='{url}'><b>{title}</b></a>"
+        "{?price} — 💰 <b>{price}</b>{/price}\n"
+        "{?year}▫️ {year}{/year}{?mileage} | {mileage}{/mileage}{?location} | 📍 {location}{/location}"
+    ),
+}
+
+TEMPLATE_SAMPLE = {
+    'title': 'Chevrolet Cobalt, 4 позиция',
+    'url': 'https://avtoelon.uz/a/show/0',
+    'price': '10 500 y.e.',
+    'location': 'Ташкент',
+    'params': {'Год выпуска': '2021', 'Пробег': '25 000 км', 'Коробка передач': 'Автомат', 'Цвет': 'Белый'},
+    'description': "Namuna e'lon matni",
+}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def compile_template(source: str) -> Callable[[Dict[str, str]], str]:
+    lines = ["def render(f):", "    out = []", "    a = out.append"]
+    stack: List[str] = []
+    position = 0
+
+    for match in TOKEN_RE.finditer(source):
+        if match.start() > position:
+            lines.append(f"{'    ' * (len(stack) + 1)}a({source[position:match.start()]!r})")
+        position = match.end()
+        kind, name = match.groups()
+        if name not in FIELDS:
+            raise TemplateError(f"Noma'lum maydon: {{{name}}}")
+
+        indent = '    ' * (len(stack) + 1)
+        if kind == '?':
+            lines.append(f"{indent}if f[{name!r}]:")
+            lines.append(f"{indent}    pass")
+            stack.append(name)
+        elif kind == '/':
+            if not stack or stack[-1] != name:
+                raise TemplateError(f"Yopilmagan yoki noto'g'ri blok: {{/{name}}}")
+            stack.pop()
+        else:
+            lines.append(f"{indent}a(f[{name!r}])")
+
+    if stack:
+        raise TemplateError(f"Blok yopilmagan: {{?{stack[-1]}}}")
+    if position < len(source):
+        lines.append(f"    a({source[position:]!r})")
+    lines.append("    return ''.join(out)")
+
+    namespace: Dict = {}
+    exec(compile('\n'.join(lines), '<template>', 'exec'), namespace)
+    return namespace['render']
+
+
+def template_fields(details: Dict, site_type: str) -> Dict[str, str]:
+    params = details.get('params') or {}
+
+    def escape(value: str) -> str:
+        return html.escape(value, quote=False)
+
+    specs = []
+    for key in SPEC_KEYS.get(site_type, SPEC_KEYS['olx']):
+        if key in params:
+            specs.append(f"▫️ {PARAM_LABELS.get(key, key)}: {escape(params[key].replace(chr(10), ' ').strip())}\n")
+
+    description = details.get('description') or ''
+    if len(description) > 500:
+        description = description[:497] + '...'
+
+    return {
+        'title': escape(details.get('title', "Yangi e'lon")),
+        'url': html.escape(details.get('url', '')),
+        'price': escape(details.get('price') or ''),
+        'year': escape(params.get('Год выпуска', params.get('Год', ''))),
+        'mileage': escape(params.get('Пробег', '')),
+        'location': escape(details.get('location', params.get('Город', ''))),
+        'specs': ''.join(specs),
+        'description': escape(description),
+        'site': 'OLX' if site_type == 'olx' else 'Avtoelon',
+    }
+
+
+class TemplateRenderer:
+
+    def __init__(self, cache_size: int = Config.TEMPLATE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._compiled: Dict[str, Callable[[Dict[str, str]], str]] = {}
+        self._rendered: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def source(template: Optional[str], site_type: str) -> Tuple[str, str]:
+        if not template:
+            template = site_type if site_type in BUILTIN_TEMPLATES else 'olx'
+        if template in BUILTIN_TEMPLATES:
+            return template, BUILTIN_TEMPLATES[template]
+        return hashlib.sha1(template.encode('utf-8')).hexdigest()[:12], template
+
+    def get(self, template: Optional[str], site_type: str) -> Tuple[str, Callable[[Dict[str, str]], str]]:
+        key, source = self.source(template, site_type)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = compile_template(source)
+            self._compiled[key] = compiled
+        return key, compiled
+
+    def render(self, details: Dict, site_type: str = 'olx', template: Optional[str] = None,
+               version: Optional[str] = None) -> str:
+        try:
+            key, compiled = self.get(template, site_type)
+        except TemplateError:
+            metrics.inc('template.invalid')
+            key, compiled = self.get(None, site_type)
+
+        if not version or not details.get('url'):
+            return compiled(template_fields(details, site_type))
+
+        cache_key = (key, details['url'], version)
+        message = self._rendered.get(cache_key)
+        if message is not None:
+            self._rendered.move_to_end(cache_key)
+            metrics.inc('template.cache_hit')
+            return message
+
+        metrics.inc('template.cache_miss')
+        message = compiled(template_fields(details, site_type))
+        self._rendered[cache_key] = message
+        if len(self._rendered) > self.cache_size:
+            self._rendered.popitem(last=False)
+        return message
+
+
+renderer = TemplateRenderer()
@@ -0,0 +1,208 @@
+import json
+import logging
+import re
+import ssl
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import FSInputFile
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import Config
+from services.metrics_service import metrics
+from services.parser_registry import registry
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAME_RE = re.compile(r'[^a-zA-Z0-9_]')
+LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+LABEL_PATTERNS = [re.compile(pattern) for pattern in (
+    r'^http\.(?P<host>.+)\.status\.(?P<status>[^.]+)$',
+    r'^(?:http|host)\.(?P<host>.+)\.[a-z_]+$',
+    r'^egress\.(?P<egress>.+)\.[a-z_]+$',
+    r'^parser\.(?P<parser>\d+)\.[a-z_]+$',
+    r'^[a-z_.]+\.site\.(?P<site>[a-z0-9_]+)(?:\.[a-z_]+)?$',
+    r'^[a-z_.]+\.parser\.(?P<parser>\d+)$',
+)]
+
+
+def metric_name(name: str) -> str:
+    return 'parser_bot_' + METRIC_NAME_RE.sub('_', name)
+
+
+def metric_series(name: str) -> Tuple[str, Dict[str, str]]:
+    for pattern in LABEL_PATTERNS:
+        match = pattern.match(name)
+        if not match:
+            continue
+        base, position = [], 0
+        for label in match.groupdict():
+            base.append(name[position:match.start(label) - 1])
+            position = match.end(label)
+        base.append(name[position:])
+        return metric_name(''.join(base)), match.groupdict()
+    return metric_name(name), {}
+
+
+def label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def label_set(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{label_value(value)}"' for key, value in labels.items()) + '}'
+
+
+def webhook_path() -> str:
+    path = Config.WEBHOOK_PATH.rstrip('/')
+    return f"{path}/{Config.WEBHOOK_SECRET}" if Config.WEBHOOK_SECRET else path
+
+
+class WebService:
+
+    def __init__(self, bot: Bot, dp: Dispatcher, scheduler=None):
+        self.bot = bot
+        self.dp = dp
+        self.scheduler = scheduler
+        self.webhook = Config.BOT_MODE == 'webhook'
+        self.internal = bool(Config.WEB_AUTH_TOKEN) or (not self.webhook and Config.WEB_HOST in LOOPBACK_HOSTS)
+        self.app = self.create_app()
+        self.runner: Optional[web.AppRunner] = None
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.auth_middleware])
+        app.router.add_get('/health', self.health)
+        if self.internal:
+            app.router.add_get('/metrics', self.prometheus)
+            app.router.add_get('/stats', self.stats)
+        else:
+            logger.warning(
+                "WEB_AUTH_TOKEN berilmagan va server tashqaridan ochiq, /metrics va /stats o'chirildi"
+            )
+
+        if self.webhook:
+            SimpleRequestHandler(
+                dispatcher=self.dp,
+                bot=self.bot,
+                secret_token=Config.WEBHOOK_SECRET or None
+            ).register(app, path=webhook_path())
+            setup_application(app, self.dp, bot=self.bot)
+            app.on_startup.append(self.set_webhook)
+            app.on_shutdown.append(self.delete_webhook)
+        return app
+
+    @web.middleware
+    async def auth_middleware(self, request: web.Request, handler):
+        if self.webhook and request.path == webhook_path():
+            return await handler(request)
+        if request.path != '/health' and Config.WEB_AUTH_TOKEN:
+            if request.headers.get('Authorization') != f"Bearer {Config.WEB_AUTH_TOKEN}":
+                raise web.HTTPUnauthorized()
+        return await handler(request)
+
+    def ssl_context(self) -> Optional[ssl.SSLContext]:
+        if not Config.WEB_SSL_CERT:
+            return None
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(Config.WEB_SSL_CERT, Config.WEB_SSL_KEY or None)
+        return context
+
+    async def set_webhook(self, app: web.Application):
+        if not Config.WEBHOOK_BASE_URL:
+            logger.warning("WEBHOOK_BASE_URL berilmagan, webhook Telegram'da ro'yxatdan o'tkazilmadi")
+            return
+        url = Config.WEBHOOK_BASE_URL.rstrip('/') + webhook_path()
+        await self.bot.set_webhook(
+            url=url,
+            secret_token=Config.WEBHOOK_SECRET or None,
+            certificate=FSInputFile(Config.WEB_SSL_CERT) if Config.WEBHOOK_SELF_SIGNED else None,
+            allowed_updates=self.dp.resolve_used_update_types(),
+            drop_pending_updates=False
+        )
+        logger.info(f"Webhook o'rnatildi: {Config.WEBHOOK_BASE_URL.rstrip('/')}{Config.WEBHOOK_PATH}/…")
+
+    async def delete_webhook(self, app: web.Application):
+        if not Config.WEBHOOK_BASE_URL:
+            return
+        try:
+            await self.bot.delete_webhook()
+        except Exception as e:
+            logger.warning(f"Webhook o'chirishda xato: {e}")
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, Config.WEB_HOST, Config.WEB_PORT, ssl_context=self.ssl_context())
+        await site.start()
+        logger.info(
+            f"Web server ishga tushdi: {Config.WEB_HOST}:{Config.WEB_PORT} "
+            f"({'webhook' if self.webhook else 'faqat ichki endpointlar'})"
+        )
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def health_status(self) -> Dict:
+        last_cycle = metrics.gauges.get('scheduler.last_cycle_at')
+        age = time.time() - last_cycle if last_cycle else None
+        running = bool(self.scheduler and self.scheduler.is_running)
+        waited = age if age is not None else time.time() - metrics.started_at
+        healthy = running and waited < Config.HEALTH_MAX_CYCLE_AGE
+        return {
+            'status': 'ok' if healthy else 'degraded',
+            'mode': Config.BOT_MODE,
+            'scheduler_running': running,
+            'last_cycle_age': round(age, 1) if age is not None else None,
+            'active_parsers': len(registry.all())
+        }
+
+    async def health(self, request: web.Request) -> web.Response:
+        status = self.health_status()
+        return web.json_response(status, status=200 if status['status'] == 'ok' else 503)
+
+    async def stats(self, request: web.Request) -> web.Response:
+        snapshot = metrics.snapshot()
+        snapshot['parsers'] = registry.all()
+        return web.json_response(snapshot, dumps=web_json)
+
+    async def prometheus(self, request: web.Request) -> web.Response:
+        return web.Response(text=render_prometheus(metrics.snapshot()), content_type='text/plain', charset='utf-8')
+
+
+def web_json(data) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def group_series(values: Dict, suffix: str = '') -> Dict[str, List[Tuple[Dict[str, str], object]]]:
+    families: Dict[str, List[Tuple[Dict[str, str], object]]] = {}
+    for name, value in sorted(values.items()):
+        family, labels = metric_series(name)
+        families.setdefault(family + suffix, []).append((labels, value))
+    return families
+
+
+def render_prometheus(snapshot: Dict) -> str:
+    lines: List[str] = [
+        "# TYPE parser_bot_uptime_seconds gauge",
+        f"parser_bot_uptime_seconds {snapshot['uptime']:.3f}"
+    ]
+    for kind, values, suffix in (('counter', snapshot['counters'], '_total'), ('gauge', snapshot['gauges'], '')):
+        for name, series in group_series(values, suffix).items():
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                lines.append(f"{name}{label_set(labels)} {value:g}")
+    timings = {name: timing for name, timing in snapshot['timings'].items() if timing}
+    for name, series in group_series(timings).items():
+        lines.append(f"# TYPE {name} summary")
+        for labels, timing in series:
+            for quantile, key in (('0.5', 'p50'), ('0.95', 'p95')):
+                if timing[key] is not None:
+                    lines.append(f"{name}{label_set(dict(labels, quantile=quantile))} {timing[key]:g}")
+            lines.append(f"{name}_sum{label_set(labels)} {timing['avg'] * timing['count']:g}")
+            lines.append(f"{name}_count{label_set(labels)} {timing['count']}")
+    return '\n'.join(lines) + '\n'
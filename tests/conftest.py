@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database.db import Database
+from services.parser_registry import registry
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DB_NAME', str(tmp_path / 'parser_bot.db'))
+    monkeypatch.setattr(registry, '_parsers', {})
+    monkeypatch.setattr(registry, '_listeners', [])
+    return Database()
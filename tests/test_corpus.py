@@ -0,0 +1,104 @@
+import asyncio
+import os
+
+import pytest
+
+from services.corpus_service import CorpusStore
+
+
+def record(ad_id, scraped_at, site='avtoelon', parser_id=1):
+    return {'ad_id': ad_id, 'site': site, 'parser_id': parser_id, 'scraped_at': scraped_at, 'title': f"Cobalt {ad_id}"}
+
+
+def disk_full(batch):
+    raise OSError(28, 'No space left on device')
+
+
+def write(store, records):
+    for item in records:
+        store.add(item)
+    return asyncio.run(store.flush())
+
+
+def test_segments_roll_over_at_the_record_limit(tmp_path):
+    store = CorpusStore(str(tmp_path), segment_records=3)
+    for start in (0, 3, 6):
+        write(store, [record(ad_id, 100.0 + ad_id) for ad_id in range(start, start + 3)])
+
+    assert store.segments() == [1, 2, 3]
+    reopened = CorpusStore(str(tmp_path), segment_records=3)
+    assert [item['ad_id'] for item in reopened.scan()] == list(range(9))
+    assert reopened.current_index()['segment'] == 3
+
+
+def test_scan_filters_by_time_id_site_and_parser(tmp_path):
+    store = CorpusStore(str(tmp_path), segment_records=4)
+    write(store, [record(1, 10.0), record(2, 20.0, site='olx'), record(3, 30.0, parser_id=2)])
+    write(store, [record(4, 40.0), record(5, 50.0, site='olx')])
+
+    def ids(**filters):
+        return [item['ad_id'] for item in store.scan(**filters)]
+
+    assert ids(since=20.0, until=40.0) == [2, 3, 4]
+    assert ids(ad_ids=[5, 1]) == [1, 5]
+    assert ids(site='olx') == [2, 5]
+    assert ids(parser_id=2) == [3]
+    assert ids(since=60.0) == []
+
+
+def test_torn_tail_is_truncated_on_reopen(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    write(store, [record(1, 10.0), record(2, 20.0)])
+    path = store.data_path(1)
+    complete = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'\x1f\x8b\x08\x00garbage')
+
+    reopened = CorpusStore(str(tmp_path))
+    write(reopened, [record(3, 30.0)])
+    assert [item['ad_id'] for item in reopened.scan()] == [1, 2, 3]
+    assert reopened.current_index()['members'][1]['offset'] == complete
+
+
+def test_missing_index_is_rebuilt_from_the_data(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    write(store, [record(1, 10.0)])
+    write(store, [record(2, 20.0)])
+    os.remove(store.index_path(1))
+
+    index = CorpusStore(str(tmp_path)).load_index(1)
+    assert index['count'] == 2 and len(index['members']) == 2
+    assert (index['min_id'], index['max_id']) == (1, 2)
+
+
+def test_failed_write_keeps_the_batch(tmp_path, monkeypatch):
+    store = CorpusStore(str(tmp_path))
+    store.add(record(1, 10.0))
+    monkeypatch.setattr(store, 'write_batch', disk_full)
+    with pytest.raises(OSError):
+        asyncio.run(store.flush())
+    assert store.pending == 1
+
+    monkeypatch.undo()
+    store.add(record(2, 20.0))
+    assert asyncio.run(store.flush()) == 2
+    assert [item['ad_id'] for item in store.scan()] == [1, 2]
+
+
+def test_pending_records_are_bounded(tmp_path, monkeypatch):
+    store = CorpusStore(str(tmp_path), max_pending=2)
+    for ad_id in range(3):
+        store.add(record(ad_id, float(ad_id)))
+    monkeypatch.setattr(store, 'write_batch', disk_full)
+    with pytest.raises(OSError):
+        asyncio.run(store.flush())
+    assert [ad_id for _, ad_id, _, _ in store._buffer] == [1, 2]
+
+
+def test_old_segments_are_removed_over_the_size_cap(tmp_path):
+    store = CorpusStore(str(tmp_path), segment_records=2, max_bytes=1)
+    for ad_id in range(0, 6, 2):
+        write(store, [record(ad_id, 1.0), record(ad_id + 1, 2.0)])
+    assert store.segments() == [3]
+    assert not os.path.exists(store.index_path(1))
+    assert [item['ad_id'] for item in store.scan()] == [4, 5]
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import random
+
+from services.dedup_service import FingerprintIndex
+from services.parser_service import ParserService
+from services.scheduler_service import SchedulerService
+from tools.bench_dedup import repost, run, same_model_pairs, synthetic_ad
+
+
+def test_repost_with_new_price_and_reordered_photos_is_found():
+    rng = random.Random(1)
+    index = FingerprintIndex()
+    ad = synthetic_ad(rng)
+    index.add('-100', index.fingerprint(ad), '/a/show/1', ad['price'])
+
+    match = index.find('-100', index.fingerprint(repost(rng, ad)))
+    assert match['href'] == '/a/show/1'
+    assert index.find('-200', index.fingerprint(repost(rng, ad))) is None
+
+
+def test_distinct_ads_of_the_same_model_are_not_matched():
+    rng = random.Random(2)
+    index = FingerprintIndex()
+    for first, second in same_model_pairs(rng, 300) + same_model_pairs(rng, 300, twins=True):
+        distance = (index.fingerprint(first) ^ index.fingerprint(second)).bit_count()
+        assert distance > index.max_distance, (first, second)
+
+
+def test_entries_expire_after_the_window():
+    index = FingerprintIndex(window_days=1)
+    ad = synthetic_ad(random.Random(3))
+    fingerprint = index.fingerprint(ad)
+    index.add('-100', fingerprint, '/a/show/1', ad['price'], created_at=1000.0)
+    assert index.find('-100', fingerprint, now=1000.0 + 3600)
+    assert index.find('-100', fingerprint, now=1000.0 + 2 * 86400) is None
+    assert index.evict_expired(now=1000.0 + 2 * 86400) == 1
+    assert not any(index.bands)
+
+
+def test_only_detail_pages_are_fingerprinted():
+    ad = synthetic_ad(random.Random(4))
+    assert FingerprintIndex.is_detailed(ad)
+    assert not FingerprintIndex.is_detailed(dict(ad, images=ad['images'][:2]))
+    assert not FingerprintIndex.is_detailed(dict(ad, params={'Год выпуска': '2020', 'Пробег': '1 км'}))
+    card = {'href': '/a/show/9', 'title': ad['title'], 'year': 2020, 'mileage': 10000, 'image': ad['images'][0]}
+    assert not FingerprintIndex.is_detailed(ParserService.card_details(card, 'avtoelon'))
+
+
+def test_lite_and_digest_items_skip_dedup(database):
+    async def scenario():
+        await database.create_tables()
+        scheduler = SchedulerService(None, database)
+        parser = {'id': 1, 'channel_id': '-100', 'site_type': 'avtoelon'}
+        card = {'href': '/a/show/1', 'title': 'Chevrolet Cobalt, 4 позиция', 'year': 2020, 'mileage': 10000}
+        details = ParserService.card_details(card, 'avtoelon')
+        first = await scheduler.check_duplicate({'parser': parser, 'href': '/a/show/1', 'details': details})
+        twin = dict(details, href='/a/show/2', url='https://avtoelon.uz/a/show/2')
+        digest = await scheduler.check_duplicate({
+            'parser': parser, 'href': '/a/show/2',
+            'digest': [{'parser': parser, 'href': '/a/show/2', 'details': twin}]
+        })
+        return first, digest, scheduler.dedup_index.entries
+
+    first, digest, entries = asyncio.run(scenario())
+    assert first is not None and 'fingerprint_entry' not in first
+    assert len(digest['digest']) == 1
+    assert not entries
+
+
+def test_query_benchmark_stays_accurate():
+    args = argparse.Namespace(entries=3000, channels=3, queries=400, pairs=300, seed=5)
+    report = run(args)
+    assert report['repost_recall'] == 1.0
+    assert report['new_ad_false_matches'] == 0
+    assert report['same_model_close_detail'] == 0
+
+
+def test_detailed_repost_is_reported_as_price_change(database):
+    async def scenario():
+        await database.create_tables()
+        scheduler = SchedulerService(None, database)
+        parser = {'id': 1, 'channel_id': '-100', 'site_type': 'avtoelon'}
+        rng = random.Random(6)
+        ad = synthetic_ad(rng)
+        first = await scheduler.check_duplicate({'parser': parser, 'href': '/a/show/1', 'details': ad})
+        same = await scheduler.check_duplicate({'parser': parser, 'href': '/a/show/2', 'details': dict(ad)})
+        cheaper = await scheduler.check_duplicate(
+            {'parser': parser, 'href': '/a/show/3', 'details': dict(repost(rng, ad), price='1 y.e.')}
+        )
+        await database.writer.flush()
+        return first, same, cheaper, await database.is_ad_parsed(1, '/a/show/2')
+
+    first, same, cheaper, skipped_recorded = asyncio.run(scenario())
+    assert 'fingerprint_entry' in first
+    assert same is None and skipped_recorded
+    assert cheaper['old_price'] == first['details']['price']
+    assert cheaper['price_change']['href'] == '/a/show/1'
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from services.file_cache_service import FileIdCache
+
+BASE = 'https://img.avtoelon.uz/images/ad/1.jpg'
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://IMG.avtoelon.uz/images/ad/1.jpg;s=800x600', BASE),
+    (f"{BASE}?utm_source=tg&_=1700000000", BASE),
+    (f"{BASE}?cb=91&ts=1700000000#top", BASE),
+    ('https://cdn.test/resize?id=7&w=800', 'https://cdn.test/resize?id=7&w=800'),
+    ('https://cdn.test/resize?w=800&id=7&t=55', 'https://cdn.test/resize?id=7&w=800'),
+])
+def test_normalize_url_drops_only_volatile_params(url, expected):
+    assert FileIdCache.normalize_url(url) == expected
+
+
+def test_images_differing_by_query_keep_separate_file_ids(database):
+    async def scenario():
+        await database.create_tables()
+        cache = FileIdCache(database)
+        await database.save_file_ids({
+            FileIdCache.normalize_url('https://cdn.test/resize?id=1'): 'file-1',
+            FileIdCache.normalize_url('https://cdn.test/resize?id=2'): 'file-2',
+        })
+        return await cache.resolve([
+            'https://cdn.test/resize?id=1&utm_campaign=x',
+            'https://cdn.test/resize?id=2',
+            'https://cdn.test/resize?id=3',
+        ])
+
+    assert asyncio.run(scenario()) == ['file-1', 'file-2', 'https://cdn.test/resize?id=3']
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from config import Config
+from services.filter_service import CompiledRules, FilterEngine, format_rules, parse_price, parse_rules_text
+
+
+def card(**fields):
+    return dict({'href': '/a/show/1', 'title': 'Chevrolet Cobalt', 'text': 'Chevrolet Cobalt'}, **fields)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('1,500,000 сум', (1500000.0, 'uzs')),
+    ('1 500 000 сум', (1500000.0, 'uzs')),
+    ('1 500 000,00 сум', (1500000.0, 'uzs')),
+    ('10 500 y.e.', (10500.0, 'usd')),
+    ('$12,500', (12500.0, 'usd')),
+    ('12.500 у.е.', (12500.0, 'usd')),
+    ('Договорная', None),
+    ('', None),
+])
+def test_parse_price_keeps_grouped_digits(text, expected):
+    assert parse_price(text) == expected
+
+
+def test_rules_text_round_trips():
+    rules = parse_rules_text("price: 5 000-11 000 usd\nyear: 2015-\nmileage: -150000\nexclude: Битый, газ\nregex: \\bLT\\b")
+    assert rules == {
+        'price': {'min': 5000.0, 'max': 11000.0, 'currency': 'usd'},
+        'year': {'min': 2015.0, 'max': None},
+        'mileage': {'min': None, 'max': 150000.0},
+        'exclude': ['битый', 'газ'],
+        'regex': '\\bLT\\b',
+    }
+    assert parse_rules_text(format_rules(rules)) == rules
+
+
+@pytest.mark.parametrize('text', ['colour: red', 'no colon', 'regex: ('])
+def test_bad_rules_are_rejected(text):
+    with pytest.raises(Exception):
+        parse_rules_text(text)
+
+
+def test_price_range_compares_in_usd(monkeypatch):
+    monkeypatch.setattr(Config, 'USD_RATE', 12500)
+    rules = CompiledRules({'price': {'min': 5000, 'max': 11000, 'currency': 'usd'}})
+    assert rules.match(card(price='10 500 y.e.'))
+    assert rules.match(card(price='125,000,000 сум'))
+    assert not rules.match(card(price='150 000 000 сум'))
+    assert not rules.match(card(price='$4,999'))
+
+
+def test_missing_card_values_never_reject():
+    rules = CompiledRules({'price': {'min': 5000, 'max': None}, 'year': {'min': 2015, 'max': None},
+                           'mileage': {'min': None, 'max': 100000}})
+    assert rules.match(card())
+    assert not rules.match(card(year=2010))
+
+
+def test_keywords_and_regex_use_the_card_text():
+    rules = CompiledRules({'include': ['cobalt'], 'exclude': ['газ'], 'regex': r'\b4 позиция\b'})
+    assert rules.match(card(text='Chevrolet Cobalt 4 позиция, автомат'))
+    assert not rules.match(card(text='Chevrolet Cobalt 4 позиция, метан газ'))
+    assert not rules.match(card(text='Chevrolet Cobalt 2 позиция'))
+
+
+def test_legacy_filter_text_matches_title_only():
+    rules = CompiledRules({}, 'Позиция')
+    assert not rules.match(card(title='Cobalt 4 позиция'))
+    checked = card(title='Cobalt', text='Cobalt, 4 позиция в описании')
+    assert rules.match(checked)
+    assert checked == card(title='Cobalt', text='Cobalt, 4 позиция в описании')
+
+
+def test_engine_recompiles_when_rules_change():
+    engine = FilterEngine()
+    parser = {'id': 1, 'filter_rules': json.dumps({'year': {'min': 2015, 'max': None}}), 'filter_text': None}
+    first = engine.get(parser)
+    assert engine.get(dict(parser)) is first
+
+    parser['filter_rules'] = json.dumps({'year': {'min': 2020, 'max': None}})
+    cards = [card(year=2018), card(year=2021)]
+    assert [item['year'] for item in engine.apply(parser, cards)] == [2021]
+    assert engine.get(parser) is not first
+
+
+def test_broken_rules_json_lets_everything_through():
+    engine = FilterEngine()
+    assert engine.apply({'id': 2, 'filter_rules': '{oops', 'filter_text': None}, [card()]) == [card()]
@@ -0,0 +1,21 @@
+from services.freshness_service import FreshnessTracker
+from services.metrics_service import Metrics
+from services.perf_service import PerfReport
+
+
+def test_perf_report_uses_in_memory_freshness(monkeypatch):
+    store = Metrics()
+    monkeypatch.setattr('services.freshness_service.metrics', store)
+    parser = {'id': 7, 'site_type': 'avtoelon'}
+    for lag in range(1, 101):
+        FreshnessTracker.record({'parser': parser, 'posted_at': 1000.0, 'posted_precise': True}, 1000.0 + lag * 60)
+    FreshnessTracker.record({'parser': parser, 'posted_at': 1000.0}, 9000.0)
+
+    summary = FreshnessTracker.summary()
+    assert set(summary) == {'site.avtoelon', 'parser.7'}
+    assert summary['parser.7']['count'] == 100
+    assert summary['site.avtoelon']['p50'] == 51 * 60
+
+    report = PerfReport.render(store.snapshot(), [parser], summary)
+    assert 'yangilik p50 51m 0s, p90 1h 30m' in report
+    assert 'avtoelon: p50 51m 0s, p90 1h 30m, p99 1h 39m (100 ta)' in report
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from config import Config
+from services.image_service import ImagePreflight, image_verdict
+
+IMAGE = {'status': 200, 'headers': {'Content-Type': 'image/jpeg', 'Content-Length': '2048'}}
+
+
+class FakeHttp:
+
+    def __init__(self, responses, delay=0.0):
+        self.responses = responses
+        self.delay = delay
+        self.calls = []
+
+    async def probe(self, url):
+        self.calls.append(url)
+        await asyncio.sleep(self.delay)
+        response = self.responses[url]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.mark.parametrize('response, verdict', [
+    (None, None),
+    ({'status': 429, 'headers': {}}, None),
+    ({'status': 502, 'headers': {}}, None),
+    ({'status': 404, 'headers': {}}, False),
+    ({'status': 200, 'headers': {'Content-Type': 'text/html'}}, False),
+    ({'status': 206, 'headers': {'Content-Type': 'image/png', 'Content-Range': 'bytes 0-0/1024'}}, True),
+    ({'status': 206, 'headers': {'Content-Range': f"bytes 0-0/{Config.IMAGE_MAX_BYTES + 1}"}}, False),
+    (IMAGE, True),
+])
+def test_image_verdict(response, verdict):
+    assert image_verdict(response) is verdict
+
+
+def test_filter_keeps_unknown_and_drops_broken_images():
+    http = FakeHttp({
+        'a.jpg': IMAGE,
+        'b.jpg': {'status': 404, 'headers': {}},
+        'c.jpg': {'status': 503, 'headers': {}},
+        'd.jpg': RuntimeError('reset'),
+    })
+    preflight = ImagePreflight(http)
+    kept, verified = asyncio.run(preflight.filter(['a.jpg', 'b.jpg', 'c.jpg', 'd.jpg', 'e.jpg'], known=['e.jpg']))
+    assert kept == ['a.jpg', 'c.jpg', 'd.jpg', 'e.jpg']
+    assert verified == ['a.jpg', 'e.jpg']
+    assert 'e.jpg' not in http.calls
+
+
+def test_definite_verdicts_are_cached_and_bounded():
+    http = FakeHttp({'a.jpg': IMAGE, 'b.jpg': {'status': 404, 'headers': {}}, 'c.jpg': {'status': 503, 'headers': {}}})
+    preflight = ImagePreflight(http, cache_size=1)
+
+    async def scenario():
+        for url in ('a.jpg', 'a.jpg', 'c.jpg', 'c.jpg', 'b.jpg'):
+            await preflight.check(url)
+
+    asyncio.run(scenario())
+    assert http.calls == ['a.jpg', 'c.jpg', 'c.jpg', 'b.jpg']
+    assert preflight.stats() == {'cached': 1, 'valid': 0, 'invalid': 1}
+
+
+def test_expired_verdicts_are_probed_again():
+    http = FakeHttp({'a.jpg': IMAGE})
+    preflight = ImagePreflight(http, ttl=0)
+
+    async def scenario():
+        await preflight.check('a.jpg')
+        await preflight.check('a.jpg')
+
+    asyncio.run(scenario())
+    assert http.calls == ['a.jpg', 'a.jpg']
+
+
+def test_concurrent_checks_share_one_probe():
+    http = FakeHttp({'a.jpg': IMAGE}, delay=0.01)
+    preflight = ImagePreflight(http)
+
+    async def scenario():
+        return await asyncio.gather(*(preflight.check('a.jpg') for _ in range(3)))
+
+    assert asyncio.run(scenario()) == [True, True, True]
+    assert http.calls == ['a.jpg']
+
+
+def test_cancelled_probe_releases_waiters():
+    http = FakeHttp({'a.jpg': IMAGE}, delay=10)
+    preflight = ImagePreflight(http)
+
+    async def scenario():
+        owner = asyncio.create_task(preflight.check('a.jpg'))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(preflight.check('a.jpg'))
+        await asyncio.sleep(0)
+        owner.cancel()
+        verdict = await asyncio.wait_for(waiter, 1)
+        return owner.cancelled(), verdict, preflight._pending
+
+    assert asyncio.run(scenario()) == (True, None, {})
@@ -0,0 +1,21 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+from config import Config
+from tools import memory_budget
+
+
+def test_stages_stay_within_memory_budgets(monkeypatch):
+    for name in ('HTTP_MODE', 'DB_NAME', 'SEND_DELAY'):
+        monkeypatch.setattr(Config, name, getattr(Config, name))
+    args = SimpleNamespace(
+        listing=os.path.join(memory_budget.ROOT, 'search.html'), detail=memory_budget.DETAIL_FIXTURE,
+        site='avtoelon', cycles=5, warmup=1, frames=1, top=0
+    )
+
+    report = asyncio.run(memory_budget.run(args))
+
+    assert {'title', 'price', 'params', 'images'} <= set(report['detail_fields'])
+    assert set(report['stages']) == set(memory_budget.STAGES)
+    assert memory_budget.check(report, Config.MEMORY_BUDGETS, Config.MEMORY_GROWTH_BUDGET) == []
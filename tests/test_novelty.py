@@ -0,0 +1,106 @@
+import asyncio
+
+from config import Config
+from services.parser_service import ParserService
+from services.scheduler_service import SchedulerService
+
+
+def olx_card(slug: str, card_id: str = '', top: bool = False) -> str:
+    badge = '<div>ТОП</div>' if top else ''
+    return (
+        f'<div data-cy="l-card" data-testid="l-card" id="{card_id}">{badge}'
+        f'<a href="/d/obyavlenie/cobalt-{slug}.html"><h6>Cobalt</h6></a></div>'
+    )
+
+
+def avtoelon_item(ad_id: int, badge: str = '') -> str:
+    corner = (
+        f'<div class="payment-package-corner"><span class="payment-package-corner__badge--{badge}"></span></div>'
+        if badge else ''
+    )
+    return (
+        f'<div class="row list-item a-elem"><button class="list-link js__advert-button">{corner}</button>'
+        f'<a class="js__advert-link" href="/a/show/{ad_id}">Cobalt</a></div>'
+    )
+
+
+def test_olx_ad_id_comes_from_slug_only():
+    html = f'<div data-testid="listing-grid">{olx_card("ID3Bxyz", card_id="900000001")}{olx_card("ID3Bxz0")}</div>'
+    cards = ParserService.parse_listing_cards(html, 'olx')
+    assert [card['ad_id'] for card in cards] == [
+        ParserService.ad_id(card['href'], 'olx') for card in cards
+    ]
+    assert cards[0]['ad_id'] < cards[1]['ad_id']
+
+
+def test_olx_top_cards_are_skipped():
+    html = f'<div data-testid="listing-grid">{olx_card("ID3Bzzz", top=True)}{olx_card("ID3Bxyz")}</div>'
+    cards = ParserService.parse_listing_cards(html, 'olx')
+    assert [card['href'] for card in cards] == ['/d/obyavlenie/cobalt-ID3Bxyz.html']
+
+
+def test_avtoelon_promoted_items_are_skipped():
+    html = (
+        '<div class="result-block col-sm-8">'
+        f'{avtoelon_item(900, "vip-sale")}{avtoelon_item(800, "top")}{avtoelon_item(700)}</div>'
+    )
+    cards = ParserService.parse_listing_cards(html, 'avtoelon')
+    assert [card['ad_id'] for card in cards] == [800, 700]
+
+
+def test_candidates_without_watermark_are_all_hrefs():
+    ad_ids = {'a': 3, 'b': 2, 'c': 1}
+    assert SchedulerService.watermark_candidates(None, ad_ids, list(ad_ids)) == {'a', 'b', 'c'}
+
+
+def test_in_order_listing_is_split_by_watermark():
+    ad_ids = {'a': 12, 'b': 11, 'c': 10, 'd': 9}
+    assert SchedulerService.watermark_candidates(10, ad_ids, list(ad_ids)) == {'a', 'b'}
+
+
+def test_bumped_and_promoted_cards_fall_back_to_db_check():
+    ad_ids = {'bumped': 5, 'new': 12, 'top': 7, 'old': 10, 'older': 9, 'unknown': None}
+    candidates = SchedulerService.watermark_candidates(11, ad_ids, list(ad_ids))
+    assert candidates == {'bumped', 'new', 'top', 'unknown'}
+
+
+class FakeDb:
+
+    def __init__(self, watermark, parsed):
+        self.watermark = watermark
+        self.parsed = set(parsed)
+        self.checked = []
+
+    async def get_bookmark(self, parser_id):
+        return None, self.watermark
+
+    async def get_parsed_hrefs(self, parser_id, hrefs):
+        self.checked.extend(hrefs)
+        return self.parsed & set(hrefs)
+
+    async def set_bookmark(self, parser_id, href, watermark, wait=True):
+        self.watermark = watermark if self.watermark is None else max(self.watermark, watermark or 0)
+
+
+class FakeRegistry:
+
+    def is_active(self, parser_id):
+        return True
+
+
+def run_novelty(db, hrefs):
+    scheduler = SchedulerService.__new__(SchedulerService)
+    scheduler.db = db
+    scheduler.registry = FakeRegistry()
+    parser = {'id': 1, 'site_type': 'avtoelon', 'burst_threshold': 0}
+    cards = [{'href': href, 'ad_id': ParserService.ad_id(href, 'avtoelon')} for href in hrefs]
+    jobs = asyncio.run(scheduler.filter_new_ads({'parser': parser, 'hrefs': hrefs, 'cards': cards}))
+    return [job['href'] for job in jobs or []]
+
+
+def test_novelty_checks_bumped_ads_against_db():
+    hrefs = ['/a/show/50', '/a/show/40', '/a/show/120', '/a/show/110', '/a/show/100', '/a/show/90']
+    db = FakeDb(watermark=110, parsed={'/a/show/50'})
+    assert run_novelty(db, hrefs) == ['/a/show/40', '/a/show/120']
+    assert set(db.checked) == {'/a/show/50', '/a/show/40', '/a/show/120'}
+    assert db.watermark == 119
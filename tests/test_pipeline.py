@@ -0,0 +1,47 @@
+import asyncio
+
+from services.pipeline_service import Pipeline, Stage
+
+
+def build(delay: float, done: list) -> Pipeline:
+    async def work(item):
+        await asyncio.sleep(delay)
+        return item
+
+    async def record(item):
+        done.append(item)
+        return item
+
+    return Pipeline([Stage('work', work, 1, 10), Stage('record', record, 1, 10)])
+
+
+def test_drain_finishes_queued_jobs():
+    done = []
+
+    async def scenario():
+        pipeline = build(0, done)
+        pipeline.start()
+        for i in range(5):
+            pipeline.try_submit(i)
+        left = await pipeline.drain(1)
+        await pipeline.stop()
+        return left
+
+    assert asyncio.run(scenario()) == 0
+    assert done == [0, 1, 2, 3, 4]
+
+
+def test_drain_reports_jobs_left_after_timeout():
+    done = []
+
+    async def scenario():
+        pipeline = build(10, done)
+        pipeline.start()
+        for i in range(4):
+            pipeline.try_submit(i)
+        left = await pipeline.drain(0.05)
+        await pipeline.stop()
+        return left
+
+    assert asyncio.run(scenario()) == 3
+    assert done == []
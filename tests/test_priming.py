@@ -0,0 +1,62 @@
+import asyncio
+
+from services.parser_registry import registry
+from services.parser_service import ParserService
+from services.priming_service import PrimingService
+
+URL = 'https://avtoelon.uz/avto/chevrolet/cobalt/'
+
+
+def listing(monkeypatch, cards):
+    async def get_listings(url, site_type='olx'):
+        if isinstance(cards, Exception):
+            raise cards
+        return cards
+    monkeypatch.setattr(ParserService, 'get_listings', get_listings)
+
+
+async def add_priming_parser(database) -> int:
+    await database.create_tables()
+    return await database.add_parser(1, URL, '-100', 'avtoelon', status='priming')
+
+
+def test_successful_prime_activates_parser(database, monkeypatch):
+    listing(monkeypatch, [{'href': '/a/show/2', 'ad_id': 2}, {'href': '/a/show/1', 'ad_id': 1}])
+
+    async def scenario():
+        parser_id = await add_priming_parser(database)
+        primed = await PrimingService.prime_new_parser(database, parser_id)
+        return primed, await database.get_parser(parser_id), await database.is_ad_parsed(parser_id, '/a/show/1')
+
+    primed, parser, seen = asyncio.run(scenario())
+    assert primed == 2
+    assert parser['status'] == 'active'
+    assert registry.is_active(parser['id'])
+    assert seen
+
+
+def test_failed_prime_keeps_parser_priming(database, monkeypatch):
+    async def scenario():
+        parser_id = await add_priming_parser(database)
+        listing(monkeypatch, [])
+        empty = await PrimingService.prime_new_parser(database, parser_id)
+        listing(monkeypatch, RuntimeError('timeout'))
+        crashed = await PrimingService.prime_new_parser(database, parser_id)
+        return empty, crashed, await database.get_parser(parser_id)
+
+    empty, crashed, parser = asyncio.run(scenario())
+    assert empty is None and crashed is None
+    assert parser['status'] == 'priming'
+    assert not registry.is_active(parser['id'])
+
+
+def test_interrupted_prime_is_resumed_after_restart(database, monkeypatch):
+    async def scenario():
+        parser_id = await add_priming_parser(database)
+        await database.create_tables()
+        after_restart = (await database.get_parser(parser_id))['status']
+        listing(monkeypatch, [{'href': '/a/show/7', 'ad_id': 7}])
+        activated = await PrimingService.prime_pending(database)
+        return after_restart, activated, (await database.get_parser(parser_id))['status']
+
+    assert asyncio.run(scenario()) == ('priming', 1, 'active')
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from config import Config
+from services.metrics_service import metrics
+from services.parser_service import ParserService
+from services.revalidation_service import RevalidationSchedule, body_fingerprint, content_fingerprint
+from services.scheduler_service import SchedulerService
+
+HOUR = 3600
+DETAILS = {'title': 'Chevrolet Cobalt', 'price': '10 500 y.e.', 'params': {'Год выпуска': '2021', 'Пробег': '25 000 км'}}
+PAGE = '<html>cobalt 10 500</html>'
+
+
+@pytest.fixture(autouse=True)
+def schedule(monkeypatch):
+    monkeypatch.setattr(Config, 'REVALIDATE_FIRST_INTERVAL', HOUR)
+    monkeypatch.setattr(Config, 'REVALIDATE_BACKOFF', 2.0)
+    monkeypatch.setattr(Config, 'REVALIDATE_MAX_INTERVAL', 8 * HOUR)
+    monkeypatch.setattr(Config, 'REVALIDATE_MAX_AGE', 24 * HOUR)
+
+
+def test_unchanged_checks_back_off_up_to_the_cap():
+    row = {'delivered_at': 0.0, 'check_interval': HOUR}
+    intervals = []
+    for _ in range(5):
+        row['check_interval'] = RevalidationSchedule.after_check(row, False, 0.0)['check_interval']
+        intervals.append(row['check_interval'] / HOUR)
+    assert intervals == [2, 4, 8, 8, 8]
+
+
+def test_a_change_resets_the_interval():
+    row = {'delivered_at': 0.0, 'check_interval': 8 * HOUR}
+    assert RevalidationSchedule.after_check(row, True, 10.0) == {'check_interval': HOUR, 'next_check_at': 10.0 + HOUR}
+
+
+def test_tracking_stops_after_max_age():
+    row = {'delivered_at': 0.0, 'check_interval': 4 * HOUR}
+    assert RevalidationSchedule.after_check(row, False, 10 * HOUR)['next_check_at'] == 18 * HOUR
+    assert RevalidationSchedule.after_check(row, False, 20 * HOUR)['next_check_at'] is None
+
+
+async def tracked_row(database) -> dict:
+    await database.create_tables()
+    parser_id = await database.add_parser(1, 'https://avtoelon.uz/avto/', '-100', 'avtoelon')
+    await database.add_parsed_ad(parser_id, '/a/show/1', delivered_at=0.0)
+    await database.set_revalidation(parser_id, '/a/show/1', dict(
+        message_id=5, price=DETAILS['price'], body_hash=body_fingerprint(PAGE),
+        content_hash=content_fingerprint(DETAILS), etag='"v1"', check_interval=HOUR, next_check_at=1.0
+    ), wait=True)
+    return (await database.get_due_revalidations(2.0, 10))[0]
+
+
+def run_revision(database, monkeypatch, response, details=DETAILS):
+    async def fetch(url, headers=None):
+        assert headers == {'If-None-Match': '"v1"'}
+        return response
+    monkeypatch.setattr(ParserService.http, 'fetch', fetch)
+    monkeypatch.setattr(ParserService, 'parse_ad_details', staticmethod(lambda html, href, site: dict(details)))
+
+    async def scenario():
+        row = await tracked_row(database)
+        scheduler = SchedulerService(None, database)
+        result = await scheduler.fetch_revision(row)
+        await database.writer.flush()
+        async with database.get_connection() as db:
+            async with db.execute("SELECT check_interval, next_check_at FROM parsed_ads") as cursor:
+                return result, await cursor.fetchone()
+
+    before = dict(metrics.counters)
+    result, stored = asyncio.run(scenario())
+    counted = {name for name, value in metrics.counters.items() if name.startswith('revalidate.') and value != before.get(name, 0)}
+    return result, stored, counted - {'revalidate.checked'}
+
+
+@pytest.mark.parametrize('response', [None, {'status': 429}, {'status': 503}])
+def test_transient_failures_are_retried_later(database, monkeypatch, response):
+    result, stored, counted = run_revision(database, monkeypatch, response)
+    assert result is None
+    assert counted == {'revalidate.retry'}
+    assert stored == (HOUR, 1.0)
+
+
+@pytest.mark.parametrize('status', [404, 410])
+def test_gone_ads_are_reported_removed(database, monkeypatch, status):
+    result, _, _ = run_revision(database, monkeypatch, {'status': status})
+    assert result['change'] == 'removed'
+
+
+@pytest.mark.parametrize('response, counter', [
+    ({'status': 304, 'headers': {}, 'text': ''}, 'revalidate.not_modified'),
+    ({'status': 301, 'headers': {}, 'text': ''}, 'revalidate.skipped'),
+    ({'status': 200, 'headers': {}, 'text': PAGE}, 'revalidate.body_unchanged'),
+    ({'status': 200, 'headers': {}, 'text': PAGE + '<!-- ad -->'}, 'revalidate.unchanged'),
+])
+def test_unchanged_ads_back_off(database, monkeypatch, response, counter):
+    result, stored, counted = run_revision(database, monkeypatch, response)
+    assert result is None
+    assert counted == {counter}
+    assert stored[0] == 2 * HOUR
+
+
+def test_price_change_is_returned_for_delivery(database, monkeypatch):
+    response = {'status': 200, 'headers': {'ETag': '"v2"'}, 'text': PAGE + 'new'}
+    result, stored, _ = run_revision(database, monkeypatch, response, dict(DETAILS, price='9 900 y.e.'))
+    assert result['change'] == 'updated'
+    assert result['values']['price'] == '9 900 y.e.'
+    assert result['values']['etag'] == '"v2"'
+    assert stored == (HOUR, 1.0)
+
+
+def test_one_failed_reschedule_does_not_stop_the_batch(database, monkeypatch):
+    monkeypatch.setattr(Config, 'REVALIDATE_ENABLED', True)
+
+    async def scenario():
+        await database.create_tables()
+        scheduler = SchedulerService(None, database)
+        rows = [{'parser_id': 1, 'href': f"/a/show/{i}"} for i in range(3)]
+
+        async def due(now, limit):
+            return rows
+
+        async def flaky(parser_id, href, values, wait=False):
+            if href == '/a/show/0':
+                raise RuntimeError('database is locked')
+        monkeypatch.setattr(database, 'get_due_revalidations', due)
+        monkeypatch.setattr(database, 'set_revalidation', flaky)
+        await scheduler.schedule_revalidation()
+        return scheduler.revalidate_pipeline.stages[0].queue.qsize()
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_default_notice_is_a_reply():
+    assert Config.REVALIDATE_NOTIFY == 'reply'
@@ -0,0 +1,53 @@
+import json
+import pickle
+import time
+import zlib
+
+from services.snapshot_service import SNAPSHOT_VERSION, StateSnapshot
+
+STATE = {
+    'http': {'hosts': {'avtoelon.uz': {'state': 'closed', 'outcomes': [True, False]}}, 'egress': [{'egress': 'direct'}]},
+    'file_ids': [['avtoelon.uz/a.jpg', 'AgAD']],
+    'dedup': [[1, '-100', 12345, '/a/show/1', '10 000', 7, 1.0]],
+    'parser_checks': {'parser.1.last_check': 2.0},
+}
+
+
+def test_snapshot_round_trips_as_compressed_json(tmp_path):
+    snapshot = StateSnapshot(str(tmp_path / 'state.snapshot'))
+    snapshot.save(dict(STATE, scratch=object()))
+
+    with open(snapshot.path, 'rb') as f:
+        document = json.loads(zlib.decompress(f.read()))
+    assert document['version'] == SNAPSHOT_VERSION
+    assert set(document['state']) == set(STATE)
+
+    state = snapshot.load()
+    assert state.pop('saved_at') <= time.time()
+    assert state == STATE
+
+
+def test_pickled_snapshot_is_not_unpickled(tmp_path):
+    snapshot = StateSnapshot(str(tmp_path / 'state.snapshot'))
+    with open(snapshot.path, 'wb') as f:
+        f.write(zlib.compress(pickle.dumps({'version': 1, 'saved_at': time.time(), 'state': STATE})))
+    assert snapshot.load() is None
+
+
+def test_unexpected_fields_and_types_are_dropped(tmp_path):
+    snapshot = StateSnapshot(str(tmp_path / 'state.snapshot'))
+    document = {'version': SNAPSHOT_VERSION, 'saved_at': time.time(),
+                'state': {'http': [], 'file_ids': STATE['file_ids'], 'extra': 1}}
+    with open(snapshot.path, 'wb') as f:
+        f.write(zlib.compress(json.dumps(document).encode('utf-8')))
+    state = snapshot.load()
+    state.pop('saved_at')
+    assert state == {'file_ids': STATE['file_ids']}
+
+
+def test_stale_snapshot_is_ignored(tmp_path):
+    snapshot = StateSnapshot(str(tmp_path / 'state.snapshot'), max_age=60)
+    document = {'version': SNAPSHOT_VERSION, 'saved_at': time.time() - 120, 'state': STATE}
+    with open(snapshot.path, 'wb') as f:
+        f.write(zlib.compress(json.dumps(document).encode('utf-8')))
+    assert snapshot.load() is None
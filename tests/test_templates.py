@@ -0,0 +1,52 @@
+import pytest
+
+from services.template_service import TEMPLATE_SAMPLE, TemplateError, TemplateRenderer, compile_template
+
+AD = dict(TEMPLATE_SAMPLE, url='https://avtoelon.uz/a/show/42')
+
+
+def test_scraped_fields_are_escaped():
+    details = dict(AD, title='<b>Cobalt</b> & Co', url="https://x.uz/a?b=1&c='2'")
+    message = TemplateRenderer().render(details, 'avtoelon', 'compact')
+    assert '&lt;b&gt;Cobalt&lt;/b&gt; &amp; Co' in message
+    assert "href='https://x.uz/a?b=1&amp;c=&#x27;2&#x27;'" in message
+
+
+def test_optional_blocks_are_dropped_for_empty_fields():
+    render = compile_template("{title}{?price} — {price}{/price}")
+    assert render({'title': 'Cobalt', 'price': ''}) == 'Cobalt'
+    assert render({'title': 'Cobalt', 'price': '10'}) == 'Cobalt — 10'
+
+
+@pytest.mark.parametrize('source', ['{nope}', '{?price}open', '{?price}{/year}'])
+def test_invalid_templates_are_rejected(source):
+    with pytest.raises(TemplateError):
+        compile_template(source)
+
+
+def test_invalid_template_falls_back_to_site_layout():
+    renderer = TemplateRenderer()
+    assert renderer.render(AD, 'avtoelon', '{nope}') == renderer.render(AD, 'avtoelon')
+
+
+def test_render_cache_is_keyed_on_template_ad_and_version():
+    renderer = TemplateRenderer()
+    first = renderer.render(AD, 'avtoelon', 'compact', 'v1')
+    assert renderer.render(dict(AD, price='1 y.e.'), 'avtoelon', 'compact', 'v1') == first
+    assert '9 900 y.e.' in renderer.render(dict(AD, price='9 900 y.e.'), 'avtoelon', 'compact', 'v2')
+    assert renderer.render(AD, 'avtoelon', None, 'v1') != first
+    assert len(renderer._rendered) == 3
+
+
+def test_unversioned_renders_are_not_cached():
+    renderer = TemplateRenderer()
+    renderer.render(AD, 'avtoelon')
+    assert '9 900 y.e.' in renderer.render(dict(AD, price='9 900 y.e.'), 'avtoelon')
+    assert not renderer._rendered
+
+
+def test_render_cache_is_bounded():
+    renderer = TemplateRenderer(cache_size=2)
+    for version in ('a', 'b', 'c'):
+        renderer.render(AD, 'avtoelon', None, version)
+    assert [key[2] for key in renderer._rendered] == ['b', 'c']
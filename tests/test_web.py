@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from config import Config
+from services.web_service import WebService, metric_series, render_prometheus
+
+
+async def get_status(service: WebService, paths, token: str = ''):
+    headers = {'Authorization': f"Bearer {token}"} if token else {}
+    async with TestClient(TestServer(service.app)) as client:
+        return [(await client.get(path, headers=headers)).status for path in paths]
+
+
+@pytest.mark.parametrize('mode, host, token, expected', [
+    ('polling', '127.0.0.1', '', 200),
+    ('polling', '0.0.0.0', '', 404),
+    ('polling', '0.0.0.0', 'secret', 200),
+])
+def test_internal_endpoints_need_a_token_when_exposed(monkeypatch, mode, host, token, expected):
+    monkeypatch.setattr(Config, 'BOT_MODE', mode)
+    monkeypatch.setattr(Config, 'WEB_HOST', host)
+    monkeypatch.setattr(Config, 'WEB_AUTH_TOKEN', token)
+    stats, prometheus, health = asyncio.run(get_status(WebService(None, None), ['/stats', '/metrics', '/health'], token))
+    assert stats == prometheus == expected
+    assert health in (200, 503)
+
+
+def test_webhook_mode_hides_internal_endpoints_without_token(monkeypatch):
+    monkeypatch.setattr(Config, 'BOT_MODE', 'webhook')
+    monkeypatch.setattr(Config, 'WEB_HOST', '127.0.0.1')
+    monkeypatch.setattr(Config, 'WEB_AUTH_TOKEN', '')
+    monkeypatch.setattr(WebService, 'create_app', lambda self: None)
+    assert not WebService(None, None).internal
+    monkeypatch.setattr(Config, 'WEB_AUTH_TOKEN', 'secret')
+    assert WebService(None, None).internal
+
+
+def test_wrong_token_is_rejected(monkeypatch):
+    monkeypatch.setattr(Config, 'BOT_MODE', 'polling')
+    monkeypatch.setattr(Config, 'WEB_AUTH_TOKEN', 'secret')
+    assert asyncio.run(get_status(WebService(None, None), ['/stats'], 'guess')) == [401]
+
+
+@pytest.mark.parametrize('name, family, labels', [
+    ('http.www.olx.uz.requests', 'parser_bot_http_requests', {'host': 'www.olx.uz'}),
+    ('http.avtoelon.uz.status.429', 'parser_bot_http_status', {'host': 'avtoelon.uz', 'status': '429'}),
+    ('egress.10.0.0.1:8080.quarantined', 'parser_bot_egress_quarantined', {'egress': '10.0.0.1:8080'}),
+    ('parser.7.new_ads', 'parser_bot_parser_new_ads', {'parser': '7'}),
+    ('freshness.coarse.site.olx', 'parser_bot_freshness_coarse_site', {'site': 'olx'}),
+    ('freshness.parser.7', 'parser_bot_freshness_parser', {'parser': '7'}),
+    ('scheduler.cycles', 'parser_bot_scheduler_cycles', {}),
+])
+def test_variable_parts_become_labels(name, family, labels):
+    assert metric_series(name) == (family, labels)
+
+
+def test_prometheus_output_has_one_family_per_metric():
+    text = render_prometheus({
+        'uptime': 5,
+        'counters': {'http.olx.uz.requests': 3, 'http.avtoelon.uz.requests': 4},
+        'gauges': {},
+        'timings': {'http.olx.uz.latency': {'count': 2, 'avg': 0.5, 'p50': 0.4, 'p95': 0.6, 'max': 0.6}},
+    })
+    assert text.count('# TYPE parser_bot_http_requests_total counter') == 1
+    assert 'parser_bot_http_requests_total{host="avtoelon.uz"} 4' in text
+    assert 'parser_bot_http_latency{host="olx.uz",quantile="0.95"} 0.6' in text
+    assert 'parser_bot_http_latency_count{host="olx.uz"} 2' in text
@@ -0,0 +1,80 @@
+import asyncio
+import sqlite3
+
+import aiosqlite
+import pytest
+
+from database.write_batcher import WriteBatcher
+
+
+@pytest.fixture
+def db_name(tmp_path):
+    name = str(tmp_path / 'writes.db')
+    with sqlite3.connect(name) as db:
+        db.execute("CREATE TABLE ads (href TEXT PRIMARY KEY)")
+    return name
+
+
+def stored(db_name):
+    with sqlite3.connect(db_name) as db:
+        return [row[0] for row in db.execute("SELECT href FROM ads ORDER BY href")]
+
+
+def test_concurrent_writes_share_one_commit(db_name):
+    writer = WriteBatcher(db_name, max_rows=100, max_delay=0.05)
+
+    async def scenario():
+        counts = await asyncio.gather(*(
+            writer.execute("INSERT OR IGNORE INTO ads VALUES (?)", (f"/a/{i}",)) for i in range(20)
+        ))
+        await writer.close()
+        return counts
+
+    assert asyncio.run(scenario()) == [1] * 20
+    assert writer.commits == 1 and writer.rows == 20
+    assert len(stored(db_name)) == 20
+
+
+def test_batches_are_capped_by_row_count(db_name):
+    writer = WriteBatcher(db_name, max_rows=4, max_delay=0.05)
+
+    async def scenario():
+        for i in range(10):
+            writer.enqueue("INSERT INTO ads VALUES (?)", (f"/a/{i}",))
+        await writer.flush()
+        await writer.close()
+
+    asyncio.run(scenario())
+    assert writer.commits == 3
+    assert len(stored(db_name)) == 10
+
+
+def test_a_failing_statement_fails_only_its_caller(db_name):
+    writer = WriteBatcher(db_name, max_rows=100, max_delay=0.05)
+
+    async def scenario():
+        results = await asyncio.gather(
+            writer.execute("INSERT INTO ads VALUES (?)", ('/a/1',)),
+            writer.execute("INSERT INTO ads VALUES (?)", ('/a/1',)),
+            writer.execute("INSERT INTO ads VALUES (?)", ('/a/2',)),
+            return_exceptions=True
+        )
+        await writer.close()
+        return results
+
+    first, duplicate, second = asyncio.run(scenario())
+    assert (first, second) == (1, 1)
+    assert isinstance(duplicate, aiosqlite.IntegrityError)
+    assert stored(db_name) == ['/a/1', '/a/2']
+
+
+def test_pending_writes_fail_when_the_writer_cannot_start(tmp_path):
+    writer = WriteBatcher(str(tmp_path / 'missing' / 'writes.db'), max_rows=10, max_delay=0.01)
+
+    async def scenario():
+        with pytest.raises(Exception):
+            await asyncio.wait_for(writer.execute("INSERT INTO ads VALUES (?)", ('/a/1',)), 2)
+        with pytest.raises(Exception):
+            await writer.flush()
+
+    asyncio.run(scenario())
@@ -0,0 +1,137 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.dedup_service import FingerprintIndex
+
+MODELS = ('Chevrolet Cobalt', 'Chevrolet Nexia 3', 'Chevrolet Gentra', 'Chevrolet Spark', 'Chevrolet Malibu 2')
+COLORS = ('Белый', 'Черный', 'Серый', 'Мокрый асфальт', 'Серебристый', 'Синий')
+
+
+def synthetic_ad(rng: random.Random, model: str = '') -> Dict:
+    model = model or rng.choice(MODELS)
+    return {
+        'title': f"{model}, {rng.choice(('2', '3', '4'))} позиция",
+        'price': f"{rng.randrange(60, 200) * 100} y.e.",
+        'params': {
+            'Год выпуска': str(rng.randrange(2012, 2025)),
+            'Пробег': f"{rng.randrange(0, 250) * 1000} км",
+            'Объем двигателя, л': rng.choice(('1.2', '1.5', '1.6')),
+            'Коробка передач': rng.choice(('Механика', 'Автомат')),
+            'Цвет': rng.choice(COLORS),
+            'Кузов': 'Седан',
+            'Вид топлива': rng.choice(('Бензин', 'Метан', 'Пропан')),
+        },
+        'images': [f"https://img.avtoelon.uz/{rng.getrandbits(40):x}/{i}.jpg" for i in range(rng.randrange(3, 9))],
+        'description': "Holati a'lo",
+    }
+
+
+def repost(rng: random.Random, ad: Dict) -> Dict:
+    images = [f"{url}?v={rng.randrange(100)}" for url in ad['images']]
+    rng.shuffle(images)
+    return dict(ad, price=f"{rng.randrange(60, 200) * 100} y.e.", images=images)
+
+
+def same_model_pairs(rng: random.Random, count: int, twins: bool = False) -> List:
+    pairs = []
+    for _ in range(count):
+        first = synthetic_ad(rng)
+        second = synthetic_ad(rng, first['title'].split(',')[0])
+        second['title'] = first['title']
+        if twins:
+            second['params'] = dict(first['params'])
+        pairs.append((first, second))
+    return pairs
+
+
+def close_pairs(index: FingerprintIndex, pairs: List) -> int:
+    return sum(
+        (index.fingerprint(first) ^ index.fingerprint(second)).bit_count() <= index.max_distance
+        for first, second in pairs
+    )
+
+
+def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    index = FingerprintIndex()
+    channels = [f"-100{i}" for i in range(args.channels)]
+    ads = [synthetic_ad(rng) for _ in range(args.entries)]
+    for i, ad in enumerate(ads):
+        index.add(channels[i % len(channels)], index.fingerprint(ad), f"/a/show/{i}", ad['price'])
+
+    queries = []
+    for _ in range(args.queries):
+        if rng.random() < 0.5:
+            i = rng.randrange(len(ads))
+            queries.append((channels[i % len(channels)], index.fingerprint(repost(rng, ads[i])), True))
+        else:
+            queries.append((rng.choice(channels), index.fingerprint(synthetic_ad(rng)), False))
+
+    timings = []
+    found = false_matches = 0
+    for channel_id, fingerprint, known in queries:
+        started = time.perf_counter()
+        match = index.find(channel_id, fingerprint)
+        timings.append((time.perf_counter() - started) * 1e6)
+        if known:
+            found += match is not None
+        else:
+            false_matches += match is not None
+    timings.sort()
+
+    pairs = same_model_pairs(rng, args.pairs)
+    twins = same_model_pairs(rng, args.pairs, twins=True)
+    reposts = sum(1 for _, _, known in queries if known)
+    return {
+        'entries': args.entries,
+        'queries': args.queries,
+        'query_p50_us': round(timings[len(timings) // 2], 1),
+        'query_p99_us': round(timings[int(len(timings) * 0.99) - 1], 1),
+        'query_max_us': round(timings[-1], 1),
+        'repost_recall': round(found / reposts, 3) if reposts else None,
+        'new_ad_false_matches': false_matches,
+        'same_model_pairs': args.pairs,
+        'same_model_close_detail': close_pairs(index, pairs),
+        'same_params_close': close_pairs(index, twins),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SimHash takror indeksining so'rov tezligi va aniqligini o'lchash")
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--channels', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--pairs', type=int, default=2000, help="bir xil modeldagi turli e'lon juftlari")
+    parser.add_argument('--max-query-us', type=float, default=1000.0, help="p99 so'rov vaqti chegarasi (mikrosekund)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    report = run(args)
+    failed = report['query_p99_us'] > args.max_query_us or report['same_model_close_detail'] > 0
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['entries']} yozuv, {report['queries']} so'rov: p50 {report['query_p50_us']} µs, "
+              f"p99 {report['query_p99_us']} µs, max {report['query_max_us']} µs")
+        print(f"qayta joylash topildi: {report['repost_recall']:.1%}, yangi e'lon noto'g'ri mos: {report['new_ad_false_matches']}")
+        print(f"bir xil model, turli e'lon (masofa ≤ {FingerprintIndex().max_distance}): "
+              f"{report['same_model_close_detail']}/{report['same_model_pairs']}, "
+              f"parametrlari ham bir xil {report['same_params_close']}/{report['same_model_pairs']}")
+        if not failed:
+            print("✅ Chegaralar ichida")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
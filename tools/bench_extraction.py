@@ -0,0 +1,554 @@
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+
+from services.logging_service import get_event_logger
+from services.parser_service import ParserService
+
+events = get_event_logger('tools.bench_extraction')
+
+
+def legacy_olx_details(soup: BeautifulSoup, html: str, href: str) -> Optional[Dict]:
+    try:
+        full_url = ParserService.ad_url(href, 'olx')
+
+        details = {'url': full_url, 'href': href}
+
+        aside_div = soup.find('div', {'data-testid': 'aside', 'class': 'css-6u8zs6'})
+
+        if aside_div:
+            title_h4 = aside_div.find('h4', class_='css-1au435n')
+            if title_h4:
+                details['title'] = title_h4.get_text(strip=True)
+            else:
+                title_div = aside_div.find('div', {'data-cy': 'offer_title'})
+                if title_div:
+                    title_h4 = title_div.find('h4')
+                    if title_h4:
+                        details['title'] = title_h4.get_text(strip=True)
+
+            prices_wrapper = aside_div.find('div', {'data-testid': 'prices-wrapper'})
+            if prices_wrapper:
+                price_container = prices_wrapper.find('div', {'data-testid': 'ad-price-container'})
+                if price_container:
+                    price_h3 = price_container.find('h3')
+                    if price_h3:
+                        details['price'] = price_h3.get_text(strip=True)
+
+            if 'price' not in details:
+                price_h3 = aside_div.find('h3', class_='css-yauxmy')
+                if price_h3:
+                    details['price'] = price_h3.get_text(strip=True)
+
+            if 'price' not in details:
+                price_h3 = aside_div.find('h3', class_='css-90xrc0')
+                if price_h3:
+                    details['price'] = price_h3.get_text(strip=True)
+
+            seller_card = aside_div.find('div', {'data-cy': 'seller_card', 'data-testid': 'seller_card'})
+            if seller_card:
+                user_name = seller_card.find('h4', {'data-testid': 'user-profile-user-name'})
+                if user_name:
+                    details['seller_name'] = user_name.get_text(strip=True)
+
+            map_section = aside_div.find('div', {'data-testid': 'map-aside-section'})
+            if map_section:
+                location_found = False
+
+                location_p = map_section.find('p', class_='css-9pna1a')
+                region_p = map_section.find('p', class_='css-3cz5o2')
+
+                if location_p or region_p:
+                    location_parts = []
+                    if location_p:
+                        loc_text = location_p.get_text(strip=True)
+                        if loc_text:
+                            location_parts.append(loc_text)
+                    if region_p:
+                        reg_text = region_p.get_text(strip=True)
+                        if reg_text:
+                            location_parts.append(reg_text)
+
+                    if location_parts:
+                        details['location'] = ', '.join(location_parts)
+                        location_found = True
+                        events.debug('olx.location', "Location (usul 1): {location}", method=1, location=details['location'])
+
+                if not location_found:
+                    map_img = map_section.find('img', alt=True)
+                    if map_img and map_img.get('alt'):
+                        alt_text = map_img['alt'].strip()
+                        if alt_text and alt_text not in ['', 'map', 'static map']:
+                            details['location'] = alt_text
+                            location_found = True
+                            events.debug('olx.location', "Location (usul 2): {location}", method=2, location=alt_text)
+
+                if not location_found:
+                    location_parts = []
+                    for p in map_section.find_all('p'):
+                        text = p.get_text(strip=True)
+                        if text and text not in ['Местоположение', 'Location']:
+                            location_parts.append(text)
+
+                    if location_parts:
+                        details['location'] = ', '.join(location_parts)
+                        location_found = True
+                        events.debug('olx.location', "Location (usul 3): {location}", method=3, location=details['location'])
+            else:
+                events.warning('olx.map_missing', "Map section topilmadi: {href}", href=href)
+
+            if 'location' not in details or not details['location']:
+                params = details.get('params', {})
+                if 'Город' in params:
+                    details['location'] = params['Город']
+                elif 'Местоположение' in params:
+                    details['location'] = params['Местоположение']
+                events.debug('olx.location', "Location (params): {location}", method='params',
+                             location=details.get('location'))
+
+            posted_wrapper = aside_div.find('div', class_='css-12kclhg')
+            if posted_wrapper:
+                outer_span = posted_wrapper.find('span', class_='css-1br3d2a')
+                if outer_span:
+                    posted_date = outer_span.find('span', {'data-cy': 'ad-posted-at', 'data-testid': 'ad-posted-at'})
+                    if posted_date:
+                        details['posted_time'] = posted_date.get_text(strip=True)
+                    else:
+                        details['posted_time'] = outer_span.get_text(strip=True).replace('Опубликовано ', '').strip()
+                else:
+                    posted_date = posted_wrapper.find('span', {'data-cy': 'ad-posted-at'})
+                    if posted_date:
+                        details['posted_time'] = posted_date.get_text(strip=True)
+            else:
+                posted_date = soup.find('span', {'data-cy': 'ad-posted-at', 'data-testid': 'ad-posted-at'})
+                if posted_date:
+                    details['posted_time'] = posted_date.get_text(strip=True)
+        else:
+            title = soup.find('h1', class_='css-1kc83jo')
+            if not title:
+                title = soup.find('h4', class_='css-1kc83jo')
+            if title:
+                details['title'] = title.get_text(strip=True)
+
+            price = soup.find('h3', class_='css-90xrc0')
+            if price:
+                details['price'] = price.get_text(strip=True)
+
+        images = []
+
+        gallery = soup.find('div', class_='css-1uilkl7')
+        if gallery:
+            img_tags = gallery.find_all('img', src=True)
+            for img in img_tags[:10]:
+                src = img.get('src', '')
+                if 'apollo.olxcdn.com' in src:
+                    if 's=' in src:
+                        src = re.sub(r's=\d+x\d+', 's=1280x1024', src)
+                    images.append(src)
+
+        if not images:
+            all_imgs = soup.find_all('img', src=True)
+            for img in all_imgs:
+                src = img.get('src', '')
+                if 'apollo.olxcdn.com' in src and 'static' not in src:
+                    if 's=' in src:
+                        src = re.sub(r's=\d+x\d+', 's=1280x1024', src)
+                    if src not in images:
+                        images.append(src)
+
+        if not images:
+            data_src_imgs = soup.find_all('img', attrs={'data-src': True})
+            for img in data_src_imgs:
+                src = img.get('data-src', '')
+                if 'apollo.olxcdn.com' in src:
+                    if 's=' in src:
+                        src = re.sub(r's=\d+x\d+', 's=1280x1024', src)
+                    if src not in images:
+                        images.append(src)
+
+        if images:
+            details['images'] = images[:10]
+
+        params_div = soup.find('div', {'data-testid': 'ad-parameters-container'})
+        if params_div:
+            params = {}
+            for p in params_div.find_all('p', class_='css-13x8d99'):
+                text = p.get_text(strip=True)
+                if ':' in text:
+                    key, value = text.split(':', 1)
+                    params[key.strip()] = value.strip()
+            details['params'] = params
+
+        phone_link = soup.find('a', href=re.compile(r'tel:'))
+        if phone_link:
+            phone = phone_link['href'].replace('tel:', '').strip()
+            details['phone'] = phone
+        else:
+            phone_button = soup.find('button', {'data-testid': 'ad-contact-phone'})
+            if phone_button:
+                phone_text = phone_button.get_text(strip=True)
+                if phone_text and phone_text != 'Показать телефон':
+                    details['phone'] = phone_text
+            else:
+                phone_pattern = re.compile(r'\+?\d{1,3}[\s-]?\(?\d{2,3}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}')
+                phone_matches = phone_pattern.findall(html)
+                if phone_matches:
+                    details['phone'] = phone_matches[0]
+
+        desc_div = soup.find('div', {'data-cy': 'ad_description'})
+        if desc_div:
+            desc_content = desc_div.find('div', class_='css-19duwlz')
+            if desc_content:
+                details['description'] = desc_content.get_text()
+
+        return details
+    except Exception as e:
+        return None
+
+
+def legacy_avtoelon_details(soup: BeautifulSoup, html: str, href: str) -> Optional[Dict]:
+    try:
+        full_url = ParserService.ad_url(href, 'avtoelon')
+
+        details = {'url': full_url, 'href': href}
+
+        product_div = soup.find('div', {'itemscope': '', 'itemtype': 'http://schema.org/Product'})
+        if not product_div:
+            product_div = soup.find('div', class_='item product')
+
+        if product_div:
+            title_elem = product_div.find('h1', class_='a-title__text') or product_div.find('h1')
+            if title_elem:
+                title_text = title_elem.get_text()
+                title_text = re.sub(r'\s+', ' ', title_text)
+                details['title'] = title_text
+
+            price_span = product_div.find('span', class_='a-price__text') or product_div.find('div', class_='a-price')
+            if price_span:
+                details['price'] = price_span.get_text(strip=True)
+
+            posted_div = soup.find('div', class_='f-line')
+            if posted_div:
+                posted_col = posted_div.find('div', class_='col-sm-4')
+                if posted_col:
+                    posted_text = posted_col.get_text(strip=True)
+                    if 'Опубликовано' in posted_text:
+                        details['posted_time'] = posted_text
+
+            params = {}
+            dl_params = product_div.find('dl', class_='description-params') or product_div.find('dl', class_='clearfix dl-horizontal description-params')
+            if dl_params:
+                dts = dl_params.find_all('dt')
+                dds = dl_params.find_all('dd')
+                for dt, dd in zip(dts[:len(dds)], dds):
+                    key = dt.get_text(strip=True)
+                    value = dd.get_text(strip=True)
+                    params[key] = value
+
+            params_block = product_div.find('ul', class_='params-block__list')
+            if params_block:
+                for li in params_block.find_all('li', class_='params-block__list-item'):
+                    heading_h4 = li.find('h4', class_='item__heading')
+                    if heading_h4:
+                        heading = heading_h4.get_text(strip=True)
+                        span = li.find('span')
+                        if span:
+                            span_text = span.get_text(strip=True)
+                            params[heading] = span_text
+
+            details['params'] = params
+
+            desc_div = product_div.find('div', class_='description-text')
+            if desc_div:
+                details['description'] = desc_div.get_text()
+
+            simple_phone_pattern = re.compile(r'\+?998\s*\d{2}\s*\d{3}\s*\d{2}\s*\d{2}')
+            phone_match = simple_phone_pattern.search(html)
+            if phone_match:
+                details['phone'] = re.sub(r'\s+', ' ', phone_match.group(0)).strip()
+
+            if 'Город' in params:
+                details['location'] = params['Город']
+
+            images = []
+            main_div = product_div.find('div', class_='main-photo')
+            if main_div:
+                main_a = main_div.find('a')
+                if main_a and main_a.get('href'):
+                    images.append(main_a['href'])
+                else:
+                    img = main_div.find('img')
+                    if img and img.get('src'):
+                        src = img['src']
+                        src = re.sub(r'-408x306\.webp', '-full.webp', src)
+                        images.append(src)
+
+            photo_links = product_div.find_all('a', class_='small-thumb')
+            for a in photo_links:
+                href_attr = a.get('href', '')
+                if href_attr and '-full.webp' in href_attr:
+                    images.append(href_attr)
+
+            details['images'] = list(dict.fromkeys(images))[:10]
+
+        return details
+    except Exception as e:
+        return None
+
+
+def noise(rng: random.Random, blocks: int) -> str:
+    parts = []
+    for i in range(blocks):
+        parts.append(
+            f"<div class='css-{rng.randrange(10 ** 6):x} block-{i}'><ul>"
+            + ''.join(
+                f"<li><a href='/d/{i}-{j}'><span>Havola {j}</span></a><p class='muted'>Matn {i} {j}</p>"
+                f"<img src='https://static.example.uz/{i}-{j}.png' alt='icon'></li>"
+                for j in range(rng.randint(3, 8))
+            )
+            + "</ul></div>"
+        )
+    return ''.join(parts)
+
+
+def olx_page(rng: random.Random, blocks: int) -> str:
+    def pick(*options):
+        return rng.choice(options)
+
+    apollo = lambda n, size='s=640x480': f"https://frankfurt.apollo.olxcdn.com/v1/files/{n}/image;{size}"
+    aside = ''
+    if rng.random() < 0.85:
+        title = pick(
+            "<h4 class='css-1au435n'>Chevrolet Cobalt 2021</h4>",
+            "<div data-cy='offer_title'><h4 class='x'>Cobalt, 4 pozitsiya</h4></div>",
+            ''
+        )
+        price = pick(
+            "<div data-testid='prices-wrapper'><div data-testid='ad-price-container'><h3>10 500 y.e.</h3></div></div>",
+            "<h3 class='css-yauxmy'>11 000 у.е.</h3>",
+            "<h3 class='abc css-90xrc0'>9 900 у.е.</h3>",
+            "<div data-testid='prices-wrapper'><h3>bo'sh</h3></div>"
+        )
+        seller = pick(
+            "<div data-cy='seller_card' data-testid='seller_card'><h4 data-testid='user-profile-user-name'>Aziz</h4></div>",
+            ''
+        )
+        location = pick(
+            "<div data-testid='map-aside-section'><p class='css-9pna1a'>Чиланзарский район</p><p class='css-3cz5o2'>Ташкент</p></div>",
+            "<div data-testid='map-aside-section'><p class='css-3cz5o2'>Самарканд</p></div>",
+            "<div data-testid='map-aside-section'><img alt='Бухара' src='https://maps.example/x.png'></div>",
+            "<div data-testid='map-aside-section'><img alt='map'><p>Местоположение</p><p>Андижан</p></div>",
+            "<div data-testid='map-aside-section'><p class='css-9pna1a'> </p></div>",
+            ''
+        )
+        posted = pick(
+            "<div class='css-12kclhg'><span class='css-1br3d2a'>Опубликовано <span data-cy='ad-posted-at' data-testid='ad-posted-at'>Сегодня в 10:15</span></span></div>",
+            "<div class='css-12kclhg'><span class='css-1br3d2a'>Опубликовано 12 мая 2024 г.</span></div>",
+            "<div class='css-12kclhg'><span data-cy='ad-posted-at'>Вчера</span></div>",
+            ''
+        )
+        aside = f"<div data-testid='aside' class='css-6u8zs6'>{title}{price}{seller}{location}{posted}</div>"
+        if not posted and rng.random() < 0.5:
+            aside += "<span data-cy='ad-posted-at' data-testid='ad-posted-at'>Сегодня в 08:00</span>"
+    else:
+        aside = pick(
+            "<h1 class='css-1kc83jo'>Nexia 3</h1><h3 class='css-90xrc0'>8 000 у.е.</h3>",
+            "<h4 class='css-1kc83jo'>Spark</h4>",
+            ''
+        )
+
+    images = ''
+    gallery_count = pick(0, 2, 12)
+    if gallery_count:
+        images += "<div class='swiper css-1uilkl7'>" + ''.join(
+            f"<img src='{apollo(rng.randrange(50)) if rng.random() < 0.8 else 'https://ads.example/banner.png'}'>"
+            for _ in range(gallery_count)
+        ) + "</div>"
+    images += ''.join(f"<img src='{apollo(rng.randrange(50))}'>" for _ in range(pick(0, 3)))
+    images += pick("<img src='https://apollo.olxcdn.com/static/logo.svg'>", '')
+    images += ''.join(f"<img data-src='{apollo(rng.randrange(50), 's=100x100')}'>" for _ in range(pick(0, 4)))
+
+    params = pick(
+        "<div data-testid='ad-parameters-container'>"
+        "<p class='css-13x8d99'>Частное лицо</p><p class='css-13x8d99'>Год выпуска: 2019</p>"
+        "<p class='css-13x8d99'>Пробег: 85 000 км</p><p class='css-13x8d99'>Коробка передач: Автоматическая</p>"
+        "<p class='css-13x8d99'>Цвет: Белый</p><p class='css-13x8d99'>Город: Ташкент</p></div>",
+        "<div data-testid='ad-parameters-container'></div>",
+        ''
+    )
+    phone = pick(
+        "<a href='tel:+998901234567'>Qo'ng'iroq</a>",
+        "<button data-testid='ad-contact-phone'>Показать телефон</button>",
+        "<button data-testid='ad-contact-phone'>+998 90 765 43 21</button>",
+        "<p>Telefon: +998 (93) 555-44-33</p>",
+        ''
+    )
+    description = pick(
+        "<div data-cy='ad_description'><h3>Описание</h3><div class='css-19duwlz'>Mashina <b>ideal</b> holatda.\nKraska toza.</div></div>",
+        "<div data-cy='ad_description'></div>",
+        ''
+    )
+    sections = [aside, images, params, phone, description]
+    rng.shuffle(sections)
+    return f"<html><body>{noise(rng, blocks)}{''.join(sections)}{noise(rng, blocks)}</body></html>"
+
+
+def avtoelon_page(rng: random.Random, blocks: int) -> str:
+    def pick(*options):
+        return rng.choice(options)
+
+    photo = lambda n, size='full': f"https://avtoelon.uz/img/{n}-{size}.webp"
+    opening = pick(
+        "<div class='item product' itemscope itemtype='http://schema.org/Product'>",
+        "<div itemscope itemtype='http://schema.org/Product'>",
+        "<div class='item  product'>",
+        None
+    )
+    if opening is None:
+        return f"<html><body>{noise(rng, blocks)}</body></html>"
+
+    title = pick(
+        "<h1 class='a-title__text'>  Chevrolet\n  Cobalt,   4 позиция </h1>",
+        "<h1>Lacetti</h1>",
+        ''
+    )
+    price = pick(
+        "<span class='a-price__text'>10 500 y.e.</span>",
+        "<div class='a-price'>9 000 y.e.</div>",
+        ''
+    )
+    dl = pick(
+        "<dl class='clearfix dl-horizontal description-params'><dt>Город</dt><dd>Самарканд</dd>"
+        "<dt>Год</dt><dd>2018</dd><dt>Пробег</dt><dd>120 000 км</dd><dt>Лишний</dt></dl>",
+        "<dl class='description-params'><dt>Цвет</dt><dd>Белый</dd></dl>",
+        ''
+    )
+    block = pick(
+        "<ul class='params-block__list'>"
+        "<li class='params-block__list-item'><h4 class='item__heading'>Коробка передач</h4><span>Механика</span></li>"
+        "<li class='params-block__list-item'><h4 class='item__heading'>Цвет</h4><p>yo'q</p></li>"
+        "<li class='params-block__list-item'><span>sarlavhasiz</span></li></ul>",
+        ''
+    )
+    description = pick("<div class='description-text'>Sotiladi.\n <i>Kelishamiz</i></div>", '')
+    phone = pick("<span class='phone'>+998 90 123 45 67</span>", "<span>998  93 111 22 33</span>", '')
+    thumbs = ''.join(
+        f"<a class='small-thumb' href='{photo(rng.randrange(20), pick('full', '408x306'))}'></a>"
+        for _ in range(pick(0, 3, 12))
+    )
+    main = pick(
+        f"<div class='main-photo'><a href='{photo(rng.randrange(20))}'><img src='{photo(1, '408x306')}'></a></div>",
+        f"<div class='main-photo'><img src='{photo(rng.randrange(20), '408x306')}'></div>",
+        "<div class='main-photo'><a>rasm yo'q</a></div>",
+        ''
+    )
+    posted = pick(
+        "<div class='f-line'><div class='col-sm-4'>Опубликовано 14 мая</div></div>",
+        "<div class='f-line'><div class='col-sm-4'>Просмотров: 120</div></div>",
+        ''
+    )
+    sections = [title, price, dl, block, description, phone, main, thumbs]
+    rng.shuffle(sections)
+    return (
+        f"<html><body>{noise(rng, blocks)}{posted}{opening}{''.join(sections)}</div>"
+        f"{noise(rng, blocks)}</body></html>"
+    )
+
+
+SITES = {
+    'olx': (olx_page, legacy_olx_details, ParserService._parse_olx_ad_details),
+    'avtoelon': (avtoelon_page, legacy_avtoelon_details, ParserService._parse_avtoelon_ad_details),
+}
+
+
+def timed(extract: Callable, pages: List[Dict], rounds: int) -> float:
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for page in pages:
+            extract(page['soup'], page['html'], page['href'])
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000 / len(pages)
+
+
+def load_pages(args, site: str) -> List[Dict]:
+    generate = SITES[site][0]
+    rng = random.Random(args.seed)
+    sources = [open(path, encoding='utf-8').read() for path in getattr(args, site)]
+    sources += [generate(rng, args.noise) for _ in range(args.pages)]
+    return [
+        {'html': html, 'soup': BeautifulSoup(html, 'html.parser'), 'href': f"/a/show/{i}" if site == 'avtoelon' else f"/d/obyavlenie/x-ID{i}.html"}
+        for i, html in enumerate(sources)
+    ]
+
+
+def run(args) -> Dict:
+    report = {}
+    for site in args.site:
+        _, legacy, plan = SITES[site]
+        pages = load_pages(args, site)
+        mismatches = []
+        for i, page in enumerate(pages):
+            expected = legacy(page['soup'], page['html'], page['href'])
+            actual = plan(page['soup'], page['html'], page['href'])
+            if expected != actual:
+                mismatches.append({'page': i, 'legacy': expected, 'plan': actual})
+
+        legacy_ms = timed(legacy, pages, args.rounds)
+        plan_ms = timed(plan, pages, args.rounds)
+        report[site] = {
+            'pages': len(pages),
+            'legacy_ms': round(legacy_ms, 3),
+            'plan_ms': round(plan_ms, 3),
+            'speedup': round(legacy_ms / plan_ms, 2) if plan_ms else None,
+            'mismatches': len(mismatches),
+            'examples': mismatches[:3]
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bir o'tishli ajratish rejasini eski ajratuvchilar bilan natija va tezlik bo'yicha solishtirish"
+    )
+    parser.add_argument('--site', action='append', choices=tuple(SITES))
+    parser.add_argument('--olx', action='append', default=[], help="haqiqiy OLX e'lon sahifasi (HTML fayl)")
+    parser.add_argument('--avtoelon', action='append', default=[], help="haqiqiy Avtoelon e'lon sahifasi (HTML fayl)")
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--noise', type=int, default=40, help="har bir sahifadagi ortiqcha bloklar soni")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    args.site = args.site or list(SITES)
+    logging.disable(logging.WARNING)
+
+    report = run(args)
+    failed = any(result['mismatches'] for result in report.values())
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        for site, result in report.items():
+            print(f"{site:9} {result['pages']:>5} sahifa  eski {result['legacy_ms']:>8} ms  "
+                  f"reja {result['plan_ms']:>8} ms  x{result['speedup']}  farq: {result['mismatches']}")
+            for example in result['examples']:
+                print(f"  ❌ sahifa {example['page']}:\n    eski: {example['legacy']}\n    reja: {example['plan']}")
+        if not failed:
+            print("✅ Natijalar bir xil")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
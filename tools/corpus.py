@@ -0,0 +1,123 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.corpus_service import CorpusStore
+
+DEFAULT_FIELDS = ('ad_id', 'site', 'scraped_at', 'title', 'price', 'location', 'posted_time', 'url')
+
+
+def parse_time(value: str) -> float:
+    units = {'m': 60, 'h': 3600, 'd': 86400}
+    if value[-1:] in units and value[:-1].isdigit():
+        return time.time() - int(value[:-1]) * units[value[-1]]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def pick(record: Dict, fields: Optional[List[str]]) -> Dict:
+    if not fields:
+        return record
+    return {field: record.get(field) for field in fields}
+
+
+def cell(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def limited(records: Iterator[Dict], limit: Optional[int]) -> Iterator[Dict]:
+    for count, record in enumerate(records, 1):
+        yield record
+        if limit and count >= limit:
+            return
+
+
+def export(args, store: CorpusStore) -> int:
+    records = limited(store.scan(
+        since=parse_time(args.since) if args.since else None,
+        until=parse_time(args.until) if args.until else None,
+        ad_ids=args.ad_id,
+        site=args.site,
+        parser_id=args.parser
+    ), args.limit)
+    fields = args.fields.split(',') if args.fields else None
+
+    count = 0
+    if args.format == 'csv':
+        writer = csv.writer(sys.stdout)
+        fields = fields or list(DEFAULT_FIELDS)
+        writer.writerow(fields)
+        for record in records:
+            writer.writerow([cell(record.get(field)) for field in fields])
+            count += 1
+    else:
+        for record in records:
+            sys.stdout.write(json.dumps(pick(record, fields), ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def stats(store: CorpusStore) -> Dict:
+    segments = []
+    for number in store.segments():
+        index = store.load_index(number)
+        segments.append({
+            'segment': number,
+            'records': index['count'],
+            'bytes': index['bytes'],
+            'members': len(index['members']),
+            'sites': index['sites'],
+            'from': datetime.fromtimestamp(index['min_time']).isoformat(timespec='seconds') if index['min_time'] else None,
+            'to': datetime.fromtimestamp(index['max_time']).isoformat(timespec='seconds') if index['max_time'] else None,
+        })
+    return {
+        'path': store.path,
+        'records': sum(segment['records'] for segment in segments),
+        'bytes': sum(segment['bytes'] for segment in segments),
+        'segments': segments
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="E'lonlar korpusini ko'rish va oqim bilan eksport qilish")
+    parser.add_argument('command', choices=('stats', 'export'))
+    parser.add_argument('--dir', default=Config.CORPUS_DIR)
+    parser.add_argument('--since', help="boshlanish vaqti: ISO sana, epoch yoki 7d/12h/30m")
+    parser.add_argument('--until', help="tugash vaqti: ISO sana, epoch yoki 7d/12h/30m")
+    parser.add_argument('--site', choices=('olx', 'avtoelon'))
+    parser.add_argument('--parser', type=int)
+    parser.add_argument('--ad-id', type=int, action='append')
+    parser.add_argument('--fields', help="vergul bilan ajratilgan maydonlar, masalan ad_id,price,params")
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    parser.add_argument('--limit', type=int)
+    args = parser.parse_args()
+
+    store = CorpusStore(args.dir)
+    try:
+        if args.command == 'stats':
+            print(json.dumps(stats(store), indent=2, ensure_ascii=False))
+            return
+        started = time.monotonic()
+        count = export(args, store)
+        sys.stdout.flush()
+        print(f"{count} ta yozuv eksport qilindi ({time.monotonic() - started:.1f}s)", file=sys.stderr)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+if __name__ == '__main__':
+    main()
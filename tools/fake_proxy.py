@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BEHAVIOURS = ('ok', 'blocked', 'auth', 'slow')
+
+
+class FakeProxy:
+
+    def __init__(self, behaviour: str = 'ok', delay: float = 0.0):
+        self.behaviour = behaviour
+        self.delay = delay
+        self.calls: List[Dict] = []
+        self.runner: Optional[web.AppRunner] = None
+        self.url = ''
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.calls.append({'url': str(request.url), 'headers': dict(request.headers), 'at': time.monotonic()})
+        if self.behaviour == 'blocked':
+            return web.Response(status=403, text='blocked')
+        if self.behaviour == 'auth':
+            return web.Response(status=407, text='proxy auth required')
+        if self.behaviour == 'slow' or self.delay:
+            await asyncio.sleep(self.delay or 5.0)
+        return web.Response(text=f"<html><body>{self.behaviour} {request.url}</body></html>", content_type='text/html')
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        return app
+
+    async def start(self, port: int = 0) -> str:
+        self.runner = web.AppRunner(self.app(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', port).start()
+        self.url = f"http://127.0.0.1:{self.runner.addresses[0][1]}"
+        return self.url
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+async def run(args):
+    proxies = [FakeProxy(behaviour) for behaviour in args.behaviour]
+    urls = [await proxy.start(args.port + i if args.port else 0) for i, proxy in enumerate(proxies)]
+    print(f"Soxta proxylar (PROXIES sifatida bering): {','.join(urls)}")
+    try:
+        while True:
+            await asyncio.sleep(args.report)
+            print(json.dumps({url: len(proxy.calls) for url, proxy in zip(urls, proxies)}))
+    finally:
+        for proxy in proxies:
+            await proxy.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Egress pool'ni lokal sinash uchun soxta HTTP proxylar")
+    parser.add_argument('behaviour', nargs='+', choices=BEHAVIOURS)
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--report', type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
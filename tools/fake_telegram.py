@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+class FakeBotApi:
+
+    def __init__(self):
+        self.calls: List[Dict] = []
+        self.replies = asyncio.Queue()
+        self._message_id = 0
+
+    def message(self, payload: Dict) -> Dict:
+        self._message_id += 1
+        return {
+            'message_id': self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(payload.get('chat_id', 0)), 'type': 'private'},
+            'text': payload.get('text', '')
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        if request.content_type == 'application/json':
+            payload = await request.json()
+        else:
+            payload = dict(await request.post())
+        self.calls.append({'method': method, 'payload': payload, 'at': time.monotonic()})
+
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'}
+        elif method in ('sendMessage', 'editMessageText'):
+            result = self.message(payload)
+            await self.replies.put(self.calls[-1])
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route('*', '/bot{token}/{method}', self.handle)
+        return app
+
+
+def message_update(update_id: int, user_id: int, text: str) -> Dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Admin'},
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}] if text.startswith('/') else []
+        }
+    }
+
+
+async def post_updates(args, api: FakeBotApi) -> List[Dict]:
+    headers = {'X-Telegram-Bot-Api-Secret-Token': args.secret} if args.secret else {}
+    results = []
+    async with ClientSession() as session:
+        for i in range(args.count):
+            started = time.monotonic()
+            update = message_update(int(time.time() * 1000) % 10 ** 9 + i, args.user_id, args.text)
+            async with session.post(args.url, json=update, headers=headers) as response:
+                status = response.status
+            accepted = time.monotonic() - started
+            try:
+                reply = await asyncio.wait_for(api.replies.get(), args.timeout)
+                replied = reply['at'] - started
+            except asyncio.TimeoutError:
+                reply, replied = None, None
+            results.append({
+                'status': status,
+                'accepted_ms': round(accepted * 1000, 1),
+                'reply_ms': round(replied * 1000, 1) if replied is not None else None,
+                'reply': (reply['payload'].get('text') or '')[:80] if reply else None
+            })
+    return results
+
+
+async def run(args):
+    api = FakeBotApi()
+    runner = web.AppRunner(api.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', args.api_port).start()
+    print(f"Soxta Bot API: http://127.0.0.1:{args.api_port} (TELEGRAM_API_URL sifatida bering)")
+
+    try:
+        if args.command == 'api':
+            while True:
+                call = await api.replies.get()
+                print(json.dumps({'method': call['method'], 'payload': call['payload']}, ensure_ascii=False))
+        else:
+            results = await post_updates(args, api)
+            print(json.dumps({
+                'updates': results,
+                'api_calls': [call['method'] for call in api.calls]
+            }, indent=2, ensure_ascii=False))
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook rejimini lokal sinash uchun soxta Telegram mijozi")
+    parser.add_argument('command', choices=('api', 'post'))
+    parser.add_argument('--api-port', type=int, default=8081)
+    parser.add_argument('--url', default=f"http://{Config.WEB_HOST}:{Config.WEB_PORT}"
+                                         f"{Config.WEBHOOK_PATH.rstrip('/')}/{Config.WEBHOOK_SECRET}".rstrip('/'))
+    parser.add_argument('--secret', default=Config.WEBHOOK_SECRET)
+    parser.add_argument('--user-id', type=int, default=Config.ADMIN_IDS[0])
+    parser.add_argument('--text', default='/start')
+    parser.add_argument('--count', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
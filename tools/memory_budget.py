@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Config
+
+STAGES = ('fetch', 'listing_parse', 'detail_parse', 'format', 'send')
+DETAIL_FIXTURE = os.path.join(ROOT, 'tests', 'fixtures', 'avtoelon_detail.html')
+LISTING_URL = 'https://avtoelon.uz/avto/memory-budget/'
+DETAIL_URL = 'https://avtoelon.uz/a/show/memory-budget'
+
+
+def kb(size: int) -> float:
+    return round(size / 1024, 1)
+
+
+class StageMeter:
+
+    def __init__(self):
+        self.results: Dict[str, Dict[str, List[float]]] = {stage: {'peak': [], 'retained': []} for stage in STAGES}
+
+    async def measure(self, stage: str, call):
+        await asyncio.sleep(0)
+        gc.collect()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = call()
+        if asyncio.iscoroutine(result):
+            result = await result
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        self.results[stage]['peak'].append(kb(peak))
+        return result, baseline
+
+    async def retained(self, stage: str, baseline: int):
+        await asyncio.sleep(0)
+        self.results[stage]['retained'].append(kb(max(0, tracemalloc.get_traced_memory()[0] - baseline)))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                'peak_kb': max(values['peak']),
+                'retained_kb': max(values['retained']),
+                'retained_last_kb': values['retained'][-1]
+            }
+            for stage, values in self.results.items() if values['peak']
+        }
+
+
+async def run(args) -> Dict:
+    Config.HTTP_MODE = 'replay'
+    Config.DB_NAME = tempfile.mktemp(suffix='.db')
+    Config.SEND_DELAY = 0
+
+    from database.db import Database
+    from services.cassette_service import CassetteStore, ReplayClient
+    from services.parser_service import ParserService
+    from services.scheduler_service import SchedulerService
+    from tools.replay import DryRunBot
+
+    with open(args.listing, 'rb') as f:
+        listing_body = f.read()
+    with open(args.detail, 'rb') as f:
+        detail_body = f.read()
+
+    cassette_dir = tempfile.mkdtemp(prefix='memory-budget-')
+    store = CassetteStore(cassette_dir)
+    store.record(LISTING_URL, 200, {'Content-Type': 'text/html; charset=utf-8'}, listing_body, 0.0)
+    store.record(DETAIL_URL, 200, {'Content-Type': 'text/html; charset=utf-8'}, detail_body, 0.0)
+    del listing_body, detail_body
+
+    db = Database()
+    await db.create_tables()
+    client = ReplayClient(store)
+    scheduler = SchedulerService(DryRunBot(), db)
+
+    meter = StageMeter()
+    growth = []
+    detail_fields = set()
+    tracemalloc.start(args.frames)
+    gc.collect()
+    cycle_baseline = tracemalloc.get_traced_memory()[0]
+
+    for cycle in range(args.warmup + args.cycles):
+        response, fetch_baseline = await meter.measure('fetch', lambda: client.fetch(LISTING_URL))
+        html = response['text']
+        del response
+
+        cards, baseline = await meter.measure('listing_parse', lambda: ParserService.parse_listing_cards(html, args.site))
+        del cards
+        await meter.retained('listing_parse', baseline)
+        del html
+        await meter.retained('fetch', fetch_baseline)
+
+        detail_html = (await client.fetch(DETAIL_URL))['text']
+        details, baseline = await meter.measure(
+            'detail_parse', lambda: ParserService.parse_ad_details(detail_html, DETAIL_URL, args.site)
+        )
+        del detail_html
+        detail_fields.update(details or ())
+        details = details or {'url': DETAIL_URL, 'href': DETAIL_URL}
+        await meter.retained('detail_parse', baseline)
+
+        message, baseline = await meter.measure('format', lambda: ParserService.format_message(details, args.site))
+        await meter.retained('format', baseline)
+
+        sent, baseline = await meter.measure(
+            'send', lambda: scheduler.send_to_channel('-100', details, args.site, message)
+        )
+        del details, message, sent
+        await meter.retained('send', baseline)
+
+        client.store.rewind()
+        gc.collect()
+        if cycle < args.warmup:
+            meter = StageMeter()
+            cycle_baseline = tracemalloc.get_traced_memory()[0]
+            continue
+        growth.append(kb(tracemalloc.get_traced_memory()[0] - cycle_baseline))
+
+    top = tracemalloc.take_snapshot().statistics('lineno')[:args.top] if args.top else []
+    tracemalloc.stop()
+    await db.close()
+    os.remove(Config.DB_NAME)
+
+    return {
+        'cycles': args.cycles,
+        'detail_fields': sorted(detail_fields),
+        'stages': meter.summary(),
+        'growth_kb': {'first': growth[0], 'last': growth[-1], 'per_cycle': round((growth[-1] - growth[0]) / max(1, len(growth) - 1), 2)},
+        'top': [str(stat) for stat in top]
+    }
+
+
+def parse_budget(value: str):
+    stage, limits = value.split('=', 1)
+    peak, retained = limits.split(':', 1)
+    if stage not in STAGES:
+        raise argparse.ArgumentTypeError(f"Noma'lum bosqich: {stage}")
+    return stage, (float(peak), float(retained))
+
+
+def check(report: Dict, budgets: Dict, growth_budget: float) -> List[str]:
+    failures = []
+    for stage, (peak, retained) in budgets.items():
+        measured = report['stages'].get(stage)
+        if not measured:
+            continue
+        if measured['peak_kb'] > peak:
+            failures.append(f"{stage}: cho'qqi {measured['peak_kb']} KB > {peak} KB")
+        if measured['retained_kb'] > retained:
+            failures.append(f"{stage}: qolgan xotira {measured['retained_kb']} KB > {retained} KB")
+    if report['cycles'] > 1 and report['growth_kb']['per_cycle'] > growth_budget:
+        failures.append(f"sikl o'sishi {report['growth_kb']['per_cycle']} KB > {growth_budget} KB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Har bir bosqich uchun xotira byudjetini tracemalloc bilan tekshirish")
+    parser.add_argument('--listing', default=os.path.join(ROOT, 'search.html'))
+    parser.add_argument('--detail', default=DETAIL_FIXTURE)
+    parser.add_argument('--site', default='avtoelon', choices=('olx', 'avtoelon'))
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--frames', type=int, default=1)
+    parser.add_argument('--top', type=int, default=0)
+    parser.add_argument('--budget', type=parse_budget, action='append', default=[],
+                        help="bosqich=cho'qqi_kb:qolgan_kb, masalan listing_parse=20000:64")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    budgets = dict(Config.MEMORY_BUDGETS)
+    budgets.update(dict(args.budget))
+    report = asyncio.run(run(args))
+    failures = check(report, budgets, Config.MEMORY_GROWTH_BUDGET)
+    report['budgets'] = budgets
+    report['failures'] = failures
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        for stage, measured in report['stages'].items():
+            peak, retained = budgets.get(stage, (None, None))
+            print(f"{stage:14} cho'qqi {measured['peak_kb']:>10} KB (byudjet {peak})  "
+                  f"qolgan {measured['retained_kb']:>8} KB (byudjet {retained})")
+        print(f"sikl o'sishi: {report['growth_kb']}")
+        for line in report['top']:
+            print(line)
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print("✅ Barcha byudjetlar bajarildi")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+class DryRunBot:
+
+    def __init__(self):
+        self.sent = 0
+        self._message_id = 0
+
+    def _message(self, photo=None) -> SimpleNamespace:
+        self._message_id += 1
+        return SimpleNamespace(
+            message_id=self._message_id,
+            photo=[SimpleNamespace(file_id=f"replay-{self._message_id}")] if photo else None
+        )
+
+    async def send_message(self, **kwargs):
+        self.sent += 1
+        return self._message()
+
+    async def send_photo(self, **kwargs):
+        self.sent += 1
+        return self._message(photo=True)
+
+    async def send_media_group(self, **kwargs):
+        self.sent += 1
+        return [self._message(photo=True) for _ in kwargs['media']]
+
+    async def edit_message_caption(self, **kwargs):
+        return True
+
+    async def edit_message_text(self, **kwargs):
+        return True
+
+
+def load_parsers(source_db: str, parser_ids) -> list:
+    connection = sqlite3.connect(source_db)
+    connection.row_factory = sqlite3.Row
+    rows = connection.execute("SELECT * FROM parsers WHERE status = 'active'").fetchall()
+    connection.close()
+    return [dict(row) for row in rows if not parser_ids or row['id'] in parser_ids]
+
+
+async def run(args):
+    source_db = Config.DB_NAME
+    Config.HTTP_MODE = 'replay'
+    Config.CASSETTE_DIR = args.cassettes
+    Config.REPLAY_TIMING = args.timing
+    Config.REPLAY_SPEED = args.speed
+    Config.DB_NAME = tempfile.mktemp(suffix='.db')
+    Config.SNAPSHOT_PATH = tempfile.mktemp(suffix='.snapshot')
+    Config.CORPUS_ENABLED = False
+    Config.LISTING_DELAY = 0
+    Config.SEND_DELAY = 0
+
+    from database.db import Database
+    from services.metrics_service import metrics
+    from services.parser_registry import registry
+    from services.scheduler_service import SchedulerService
+
+    db = Database()
+    await db.create_tables()
+    for parser in load_parsers(source_db, args.parser):
+        await db.import_parser(parser)
+    await registry.load(db)
+
+    bot = DryRunBot()
+    scheduler = SchedulerService(bot, db)
+    scheduler.pipeline.start()
+    scheduler.enrich_pipeline.start()
+    scheduler.revalidate_pipeline.start()
+
+    results = []
+    for cycle in range(args.cycles):
+        started = time.monotonic()
+        sent_before = bot.sent
+        await scheduler.check_all_parsers()
+        results.append({'cycle': cycle + 1, 'seconds': round(time.monotonic() - started, 3), 'sent': bot.sent - sent_before})
+
+    await scheduler.pipeline.stop()
+    await scheduler.enrich_pipeline.stop()
+    await scheduler.revalidate_pipeline.stop()
+    await db.close()
+    os.remove(Config.DB_NAME)
+    if os.path.exists(Config.SNAPSHOT_PATH):
+        os.remove(Config.SNAPSHOT_PATH)
+
+    print(json.dumps({
+        'parsers': len(registry.all()),
+        'cycles': results,
+        'cassette': {key: metrics.counters.get(f"cassette.{key}", 0) for key in ('hit', 'miss')},
+        'stages': scheduler.pipeline_stats()
+    }, indent=2, ensure_ascii=False, default=str))
+
+
+def import_file(args):
+    from services.cassette_service import CassetteStore
+    store = CassetteStore(args.cassettes)
+    store.load()
+    with open(args.file, 'rb') as f:
+        body = f.read()
+    entry = store.record(args.url, args.status, {'Content-Type': 'text/html; charset=utf-8'}, body, args.elapsed)
+    print(json.dumps(entry, indent=2, ensure_ascii=False))
+
+
+def stats(args):
+    from services.cassette_service import CassetteStore
+    store = CassetteStore(args.cassettes)
+    store.load()
+    print(json.dumps(store.stats(), indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP kassetalarini boshqarish va scheduler siklini oflayn qayta o'ynash")
+    parser.add_argument('--cassettes', default=Config.CASSETTE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('--cycles', type=int, default=2)
+    run_parser.add_argument('--parser', type=int, action='append')
+    run_parser.add_argument('--timing', action='store_true')
+    run_parser.add_argument('--speed', type=float, default=1.0)
+
+    import_parser = commands.add_parser('import')
+    import_parser.add_argument('url')
+    import_parser.add_argument('file')
+    import_parser.add_argument('--status', type=int, default=200)
+    import_parser.add_argument('--elapsed', type=float, default=0.0)
+
+    commands.add_parser('stats')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.command == 'run':
+        asyncio.run(run(args))
+    elif args.command == 'import':
+        import_file(args)
+    else:
+        stats(args)
+
+
+if __name__ == '__main__':
+    main()